@@ -1,9 +1,10 @@
 from django.contrib import admin
-from .models import Player, Game, Round
+from .models import ArchivedGame, MoveEvent, Player, PlayerStats, Game, Round
 
 @admin.register(Player)
 class PlayerAdmin(admin.ModelAdmin):
-    list_display = ('id', 'name', 'created_at')
+    list_display = ('id', 'name', 'handle', 'created_at')
+    # name__icontains usa el índice de trigramas en PostgreSQL
     search_fields = ('name',)
 
 @admin.register(Game)
@@ -15,3 +16,24 @@ class GameAdmin(admin.ModelAdmin):
 class RoundAdmin(admin.ModelAdmin):
     list_display = ('id', 'game', 'player1_move', 'player2_move', 'winner', 'created_at')
     list_filter = ('game',)
+
+@admin.register(PlayerStats)
+class PlayerStatsAdmin(admin.ModelAdmin):
+    list_display = ('player', 'games_played', 'wins', 'losses', 'round_wins', 'best_streak', 'updated_at')
+    ordering = ('-wins', '-round_wins', 'player')
+
+@admin.register(ArchivedGame)
+class ArchivedGameAdmin(admin.ModelAdmin):
+    list_display = ('id', 'player1', 'player2', 'player1_score', 'player2_score', 'winner', 'finished_at', 'archived_at')
+
+@admin.register(MoveEvent)
+class MoveEventAdmin(admin.ModelAdmin):
+    list_display = ('game_id', 'seq', 'seat', 'move', 'created_at')
+    ordering = ('game_id', 'seq')
+
+    # Registro de solo inserción
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
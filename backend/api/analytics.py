@@ -0,0 +1,274 @@
+"""
+Análisis vectorizado de los patrones de juego.
+
+Las rondas completas se cargan en arrays de NumPy, con los movimientos como
+enteros pequeños: el código con el que se guardan (api.rules) menos uno.
+Cada ronda se ve desde los dos jugadores: una fila con su movimiento, el del
+rival y el resultado. Con esas filas ordenadas por jugador, juego y orden de
+la ronda, las métricas de todos los jugadores salen de unos pocos
+np.bincount, sin bucles de Python por ronda. Las rondas archivadas (ver
+api.archive) se leen igual que las de Round.
+
+Cada análisis recorre todo el historial, así que las vistas lo sirven desde
+la caché con cached(): el resultado se guarda junto a una marca del
+historial (watermark) y se recalcula solo cuando la marca cambia o caduca
+ANALYTICS_CACHE_TIMEOUT.
+"""
+from itertools import chain
+
+import numpy as np
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import ExpressionWrapper, F, IntegerField, Max, Q
+
+from . import rules
+from .models import ArchivedRound, MoveEvent, Round
+
+# Movimientos de todas las variantes; su posición es su código en los arrays
+MOVES = rules.ALL_MOVES
+N_MOVES = len(MOVES)
+
+# Resultado de una ronda para el jugador que se analiza
+LOSS, TIE, WIN = -1, 0, 1
+
+# Filas leídas del cursor por bloque
+CHUNK_SIZE = 50000
+
+ROUND_COLUMNS = ['game', 'player1', 'player2', 'move1', 'move2', 'winner']
+
+
+def encode_move(field):
+    # El código guardado tal cual, sin pasar por el nombre del movimiento
+    return ExpressionWrapper(F(field) - 1, output_field=IntegerField())
+
+
+def load_rounds(player_id=None, chunk_size=CHUNK_SIZE):
+    """
+    Carga las rondas completas, archivadas o no, en arrays, con las rondas
+    de cada juego juntas y en orden. Los movimientos llegan ya como enteros
+    y las filas se leen por bloques de un cursor del servidor.
+
+    Args:
+        player_id: Solo las rondas de los juegos de este jugador (None: todas)
+
+    Returns:
+        dict: Un array por columna de ROUND_COLUMNS; winner es 0 en los empates
+    """
+    def rows_of(model):
+        rounds = model.objects.filter(player1_move__isnull=False, player2_move__isnull=False)
+        if player_id is not None:
+            rounds = rounds.filter(Q(game__player1_id=player_id) | Q(game__player2_id=player_id))
+        return rounds.annotate(
+            move1=encode_move('player1_move'),
+            move2=encode_move('player2_move')
+        ).order_by('game_id', 'created_at', 'id').values_list(
+            'game_id', 'game__player1_id', 'game__player2_id', 'move1', 'move2', 'winner_id'
+        ).iterator(chunk_size=chunk_size)
+
+    # Un juego está entero en una de las dos tablas: cada juego sigue con
+    # sus rondas en orden
+    rows = chain(rows_of(ArchivedRound), rows_of(Round))
+
+    chunks = []
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= chunk_size:
+            chunks.append(np.array(chunk, dtype=np.float64))
+            chunk = []
+    if chunk:
+        chunks.append(np.array(chunk, dtype=np.float64))
+    # float64 admite los None de winner como NaN; después se pasa a enteros
+    table = np.concatenate(chunks) if chunks else np.empty((0, len(ROUND_COLUMNS)))
+    table = np.nan_to_num(table, nan=0).astype(np.int64)
+
+    return {
+        'game': table[:, 0],
+        'player1': table[:, 1],
+        'player2': table[:, 2],
+        'move1': table[:, 3].astype(np.int8),
+        'move2': table[:, 4].astype(np.int8),
+        'winner': table[:, 5],
+    }
+
+
+def perspectives(rounds):
+    """
+    Duplica cada ronda, una vez por jugador, y ordena las filas por jugador,
+    juego y orden de la ronda
+
+    Returns:
+        dict: Arrays player, game, own (movimiento propio), opponent y
+        outcome (WIN, TIE o LOSS)
+    """
+    count = len(rounds['game'])
+    player = np.concatenate([rounds['player1'], rounds['player2']])
+    opponent_id = np.concatenate([rounds['player2'], rounds['player1']])
+    winner = np.concatenate([rounds['winner'], rounds['winner']])
+    outcome = np.where(winner == player, WIN, np.where(winner == opponent_id, LOSS, TIE)).astype(np.int8)
+
+    view = {
+        'player': player,
+        'game': np.concatenate([rounds['game'], rounds['game']]),
+        'own': np.concatenate([rounds['move1'], rounds['move2']]),
+        'opponent': np.concatenate([rounds['move2'], rounds['move1']]),
+        'outcome': outcome,
+    }
+    # Las rondas ya vienen en orden; la posición original desempata
+    sequence = np.concatenate([np.arange(count), np.arange(count)])
+    order = np.lexsort((sequence, view['game'], view['player']))
+    return {name: values[order] for name, values in view.items()}
+
+
+def player_metrics(view):
+    """
+    Cuenta, para todos los jugadores a la vez, movimientos, transiciones
+    entre rondas consecutivas de un mismo juego y victorias según el
+    movimiento anterior
+
+    Returns:
+        dict: players (IDs), rounds (n), distribution (n, N_MOVES),
+        transitions (n, N_MOVES, N_MOVES: anterior x siguiente), after
+        (n, N_MOVES: rondas tras cada movimiento) y wins_after (de ellas,
+        ganadas)
+    """
+    players, index = np.unique(view['player'], return_inverse=True)
+    n = len(players)
+    own = view['own'].astype(np.int64)
+
+    distribution = np.bincount(index * N_MOVES + own, minlength=n * N_MOVES).reshape(n, N_MOVES)
+
+    # Pares de rondas consecutivas del mismo jugador en el mismo juego
+    same = (view['player'][1:] == view['player'][:-1]) & (view['game'][1:] == view['game'][:-1])
+    pair_index = index[1:][same]
+    previous = own[:-1][same]
+    following = own[1:][same]
+
+    transitions = np.bincount(
+        (pair_index * N_MOVES + previous) * N_MOVES + following,
+        minlength=n * N_MOVES * N_MOVES
+    ).reshape(n, N_MOVES, N_MOVES)
+    after_keys = pair_index * N_MOVES + previous
+    after = np.bincount(after_keys, minlength=n * N_MOVES).reshape(n, N_MOVES)
+    wins_after = np.bincount(
+        after_keys,
+        weights=(view['outcome'][1:][same] == WIN),
+        minlength=n * N_MOVES
+    ).reshape(n, N_MOVES).astype(np.int64)
+
+    return {
+        'players': players,
+        'rounds': np.bincount(index, minlength=n),
+        'distribution': distribution,
+        'transitions': transitions,
+        'after': after,
+        'wins_after': wins_after,
+    }
+
+
+def ratios(counts, totals):
+    """
+    Divide sin avisos por cero: una fila sin datos queda a 0
+    """
+    counts = np.asarray(counts, dtype=np.float64)
+    totals = np.asarray(totals, dtype=np.float64)
+    return np.divide(counts, totals, out=np.zeros_like(counts), where=totals > 0)
+
+
+def summarize(rounds, distribution, transitions, after, wins_after):
+    """
+    Convierte los contadores de un jugador (o la suma de todos) en la
+    respuesta de la API: frecuencias y tasas redondeadas por movimiento
+    """
+    distribution_rates = ratios(distribution, distribution.sum())
+    transition_rates = ratios(transitions, transitions.sum(axis=1, keepdims=True))
+    win_rates = ratios(wins_after, after)
+    return {
+        'rounds': int(rounds),
+        'distribution': {
+            move: round(float(distribution_rates[code]), 4) for code, move in enumerate(MOVES)
+        },
+        'transitions': {
+            previous: {
+                move: round(float(transition_rates[p, code]), 4) for code, move in enumerate(MOVES)
+            }
+            for p, previous in enumerate(MOVES)
+        },
+        'win_rate_by_previous_move': {
+            move: round(float(win_rates[code]), 4) for code, move in enumerate(MOVES)
+        },
+    }
+
+
+def analyze_player(player_id):
+    """
+    Patrones de juego de un jugador
+
+    Returns:
+        dict: Métricas resumidas (ver summarize)
+    """
+    metrics = player_metrics(perspectives(load_rounds(player_id)))
+    position = np.searchsorted(metrics['players'], player_id)
+    if position == len(metrics['players']) or metrics['players'][position] != player_id:
+        return summarize(0, np.zeros(N_MOVES), np.zeros((N_MOVES, N_MOVES)), np.zeros(N_MOVES), np.zeros(N_MOVES))
+    return summarize(*(
+        metrics[name][position]
+        for name in ('rounds', 'distribution', 'transitions', 'after', 'wins_after')
+    ))
+
+
+def analyze_all():
+    """
+    Patrones de juego agregados de todos los jugadores
+
+    Returns:
+        dict: Métricas resumidas (ver summarize) y número de jugadores
+    """
+    metrics = player_metrics(perspectives(load_rounds()))
+    summary = summarize(*(
+        metrics[name].sum(axis=0)
+        for name in ('rounds', 'distribution', 'transitions', 'after', 'wins_after')
+    ))
+    # Cada ronda aparece una vez por jugador
+    summary['rounds'] //= 2
+    summary['players'] = len(metrics['players'])
+    return summary
+
+
+def watermark():
+    """
+    Marca barata del estado del historial: el último evento (cada movimiento
+    añade uno) y la última ronda (también las creadas sin eventos, como las
+    de seed_data). Ambas son un MAX sobre la clave primaria.
+
+    Los cambios que no añaden eventos ni rondas (borrar un juego, fusionar
+    jugadores) se ven al caducar la entrada.
+    """
+    return (
+        MoveEvent.objects.aggregate(last=Max('id'))['last'],
+        Round.objects.aggregate(last=Max('id'))['last'],
+    )
+
+
+def cached(name, compute, *args):
+    """
+    Devuelve un análisis desde la caché mientras el historial no cambie
+
+    Args:
+        name: Nombre del análisis en la clave de caché
+        compute: Función que lo calcula (analyze_all, analyze_player)
+        *args: Argumentos de compute
+
+    Returns:
+        dict: Resultado de compute
+    """
+    key = f'analytics:{name}'
+    # La marca se lee antes de calcular: si el historial cambia mientras
+    # tanto, la siguiente petición recalcula
+    mark = watermark()
+    entry = cache.get(key)
+    if entry is not None and entry[0] == mark:
+        return entry[1]
+    result = compute(*args)
+    cache.set(key, (mark, result), settings.ANALYTICS_CACHE_TIMEOUT)
+    return result
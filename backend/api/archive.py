@@ -0,0 +1,127 @@
+"""
+Archivo de los juegos terminados.
+
+Las tablas Game y Round solo deberían contener los juegos en curso y los
+terminados recientemente: son las que leen y bloquean los movimientos y los
+listados. archive_games() mueve los juegos terminados hace más de un tiempo
+a ArchivedGame y ArchivedRound, conservando sus IDs, por lotes y con una
+transacción por lote. Las lecturas de un juego (GET /api/games/{id}/), las
+estadísticas, el análisis de patrones y la exportación consultan también el
+archivo, así mover un juego no cambia ninguna respuesta de la API.
+"""
+import logging
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import F
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import ArchivedGame, ArchivedRound, Game, Round
+
+logger = logging.getLogger(__name__)
+
+# Días que un juego terminado sigue en las tablas de juegos en curso
+ARCHIVE_AFTER_DAYS = 30
+
+# Juegos movidos por transacción
+BATCH_SIZE = 500
+
+
+def archivable_games(older_than):
+    """
+    Juegos terminados cuya última ronda (o su creación, si no tiene rondas)
+    es anterior a older_than, en orden de ID
+    """
+    return Game.objects.filter(is_active=False).annotate(
+        finished_at=Coalesce(F('current_round__created_at'), F('created_at'))
+    ).filter(finished_at__lt=older_than).order_by('id')
+
+
+def archive_batch(game_ids):
+    """
+    Mueve un lote de juegos y sus rondas al archivo en una transacción. Los
+    juegos se bloquean y se vuelven a filtrar por is_active, por si alguno
+    se reinició mientras tanto.
+
+    Returns:
+        int: Juegos movidos
+    """
+    with transaction.atomic():
+        games = list(
+            Game.objects.select_for_update(of=('self',)).filter(id__in=game_ids, is_active=False).annotate(
+                finished_at=Coalesce(F('current_round__created_at'), F('created_at'))
+            ).order_by('id')
+        )
+        if not games:
+            return 0
+        ids = [game.pk for game in games]
+        rounds = Round.objects.filter(game_id__in=ids).order_by('id')
+
+        ArchivedGame.objects.bulk_create([
+            ArchivedGame(
+                id=game.pk,
+                player1_id=game.player1_id,
+                player2_id=game.player2_id,
+                player1_score=game.player1_score,
+                player2_score=game.player2_score,
+                winner_id=game.winner_id,
+                created_at=game.created_at,
+                finished_at=game.finished_at,
+                round_count=game.round_count,
+                version=game.version,
+                bot_strategy=game.bot_strategy,
+                rule_set=game.rule_set,
+            )
+            for game in games
+        ], batch_size=BATCH_SIZE)
+        ArchivedRound.objects.bulk_create([
+            ArchivedRound(
+                id=round_obj.pk,
+                game_id=round_obj.game_id,
+                player1_move=round_obj.player1_move,
+                player2_move=round_obj.player2_move,
+                winner_id=round_obj.winner_id,
+                created_at=round_obj.created_at,
+            )
+            for round_obj in rounds.iterator(chunk_size=2000)
+        ], batch_size=2000)
+
+        # current_round apunta a una ronda del propio juego: se suelta antes
+        # de borrar para no depender del orden de los borrados en cascada
+        Game.objects.filter(id__in=ids).update(current_round=None)
+        rounds.delete()
+        Game.objects.filter(id__in=ids).delete()
+    return len(ids)
+
+
+def archive_games(older_than=None, batch_size=BATCH_SIZE, dry_run=False):
+    """
+    Mueve al archivo los juegos terminados antes de older_than
+
+    Args:
+        older_than: Momento límite (por defecto, hace ARCHIVE_AFTER_DAYS días)
+        batch_size: Juegos movidos por transacción
+        dry_run: Solo contar los juegos que se moverían
+
+    Returns:
+        int: Juegos movidos (o que se moverían)
+    """
+    if older_than is None:
+        older_than = timezone.now() - timedelta(days=ARCHIVE_AFTER_DAYS)
+    candidates = archivable_games(older_than)
+    if dry_run:
+        return candidates.count()
+
+    # Recorrido por ID: cada lote empieza después del último leído, así
+    # los juegos ya movidos no vuelven a leerse
+    moved = 0
+    last_id = 0
+    while True:
+        game_ids = list(candidates.filter(id__gt=last_id).values_list('id', flat=True)[:batch_size])
+        if not game_ids:
+            break
+        moved += archive_batch(game_ids)
+        last_id = game_ids[-1]
+    logger.info("%s juegos terminados movidos al archivo", moved)
+    return moved
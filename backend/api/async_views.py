@@ -0,0 +1,216 @@
+"""
+Variantes asíncronas de los endpoints más usados, pensadas para servirse
+desde backend/asgi.py.
+
+Mientras un movimiento espera a PostgreSQL, la petición no ocupa un hilo
+del servidor. Las lecturas y escrituras simples usan el ORM asíncrono
+(aget, acreate) y la caché asíncrona. Las transacciones y los serializers
+de DRF siguen siendo síncronos en Django y se ejecutan con sync_to_async.
+"""
+import functools
+import json
+import logging
+
+from asgiref.sync import sync_to_async
+from django.http import HttpResponse, HttpResponseNotAllowed, HttpResponseNotModified, JsonResponse
+
+from . import matchmaking, services
+from .throttling import athrottle_wait
+from .cache import aget_cached_game, etag_matches, game_etag
+from .models import ArchivedGame, Game
+from .realtime import abroadcast_game
+from .views import serialize_game, serialize_move_delta, wants_delta
+
+logger = logging.getLogger(__name__)
+
+
+def async_endpoint(*methods):
+    """
+    Restringe los métodos HTTP de una vista asíncrona y la exime de CSRF,
+    igual que hace DRF con sus vistas. Los decoradores equivalentes de
+    Django no admiten vistas asíncronas en la versión 4.2.
+    """
+    def decorator(view):
+        @functools.wraps(view)
+        async def wrapper(request, *args, **kwargs):
+            if request.method not in methods:
+                return HttpResponseNotAllowed(methods)
+            return await view(request, *args, **kwargs)
+        wrapper.csrf_exempt = True
+        return wrapper
+    return decorator
+
+
+def error_response(message, status):
+    return JsonResponse({"error": message}, status=status)
+
+
+def throttled_response(wait):
+    response = error_response("Demasiadas peticiones, reintenta más tarde", 429)
+    response['Retry-After'] = str(wait)
+    return response
+
+
+def parse_body(request):
+    """
+    Returns:
+        dict | None: Cuerpo JSON de la petición, o None si no es válido
+    """
+    try:
+        data = json.loads(request.body or b'{}')
+    except ValueError:
+        return None
+    return data if isinstance(data, dict) else None
+
+
+@async_endpoint('GET')
+async def game_detail(request, game_id):
+    """
+    Endpoint asíncrono para consultar el estado de un juego, con el mismo
+    ETag e If-None-Match que GET /api/games/{id}/
+    """
+    cached = await aget_cached_game(game_id)
+    if cached is None:
+        game = await Game.objects.only('version').filter(pk=game_id).afirst()
+        if game is None:
+            game = await ArchivedGame.objects.only('version').filter(pk=game_id).afirst()
+        if game is None:
+            return error_response("Juego no encontrado", 404)
+        payload = await sync_to_async(serialize_game)(game_id)
+        version = game.version
+    else:
+        version, payload = cached
+
+    etag = game_etag(game_id, version)
+    if etag_matches(request, etag):
+        response = HttpResponseNotModified()
+    else:
+        response = JsonResponse(payload)
+    response['ETag'] = etag
+    return response
+
+
+@async_endpoint('POST')
+async def make_move(request, game_id):
+    """
+    Endpoint asíncrono para procesar un movimiento, equivalente a
+    POST /api/games/{id}/make_move/
+    """
+    data = parse_body(request)
+    if data is None:
+        return error_response("Cuerpo JSON inválido", 400)
+
+    player_id = data.get('player_id')
+    movement = data.get('movement')
+
+    # Validar el movimiento (las reglas del juego lo validan al aplicarlo)
+    if not isinstance(movement, str):
+        logger.error("Movimiento inválido: %s", movement)
+        return error_response("Se requiere el movimiento", 400)
+
+    # Validar que se proporcionó el ID del jugador
+    if not player_id:
+        logger.error("ID de jugador no proporcionado")
+        return error_response("Se requiere el ID del jugador", 400)
+
+    wait = await athrottle_wait(request, player_id)
+    if wait:
+        return throttled_response(wait)
+
+    # La transacción con bloqueo de fila es síncrona; corre en el hilo de
+    # base de datos mientras el bucle de eventos atiende otras peticiones
+    try:
+        game = await sync_to_async(services.apply_move)(game_id, player_id, movement)
+
+        if wants_delta(request):
+            payload = await sync_to_async(serialize_move_delta)(game)
+            await abroadcast_game(game.pk, 'game.delta', payload)
+        else:
+            payload = await sync_to_async(serialize_game)(game.pk)
+            await abroadcast_game(game.pk, 'game.update', payload)
+    except Game.DoesNotExist:
+        logger.error("Juego no encontrado: %s", game_id)
+        return error_response("Juego no encontrado", 404)
+    except services.MoveError as e:
+        return error_response(str(e), 400)
+    except Exception as e:
+        logger.critical("Error inesperado: %s", e, exc_info=True)
+        return error_response("Error interno del servidor", 500)
+
+    response = JsonResponse(payload)
+    response['ETag'] = game_etag(game.pk, game.version)
+    return response
+
+
+@async_endpoint('POST')
+async def create_game(request):
+    """
+    Endpoint asíncrono para crear un nuevo juego, equivalente a
+    POST /api/create-game/
+    """
+    data = parse_body(request)
+    if data is None:
+        return error_response("Cuerpo JSON inválido", 400)
+
+    wait = await athrottle_wait(request)
+    if wait:
+        return throttled_response(wait)
+
+    # Reutilizar jugadores existentes (por ID o por nombre normalizado) y
+    # crear el juego; la transacción es síncrona
+    try:
+        game = await sync_to_async(services.create_game)(data)
+    except services.PlayerError as e:
+        return error_response(str(e), 400)
+
+    payload = await sync_to_async(serialize_game)(game.pk)
+    return JsonResponse(payload)
+
+
+@async_endpoint('POST')
+async def matchmaking_enqueue(request):
+    """
+    Endpoint de entrada en la cola de emparejamiento
+
+    Args:
+        request: Petición con player_id, un jugador humano existente
+
+    Returns:
+        JsonResponse: Estado del jugador en la cola (ver
+        matchmaking.ticket_status): 202 si acaba de entrar, 200 si ya estaba
+    """
+    data = parse_body(request)
+    if data is None:
+        return error_response("Cuerpo JSON inválido", 400)
+    try:
+        player_id = int(data.get('player_id'))
+    except (TypeError, ValueError):
+        return error_response("Se requiere el ID del jugador", 400)
+
+    wait = await athrottle_wait(request, player_id)
+    if wait:
+        return throttled_response(wait)
+
+    added = await matchmaking.enqueue(player_id)
+    if added is None:
+        return error_response("Jugador no encontrado", 404)
+    payload = await matchmaking.ticket_status(player_id)
+    return JsonResponse(payload, status=202 if added else 200)
+
+
+@async_endpoint('GET', 'DELETE')
+async def matchmaking_ticket(request, player_id):
+    """
+    Endpoint del ticket de un jugador: GET consulta su estado (el cliente
+    sondea hasta recibir 'matched' con el ID del juego) y DELETE lo saca de
+    la cola si sigue esperando
+    """
+    if request.method == 'DELETE':
+        if await matchmaking.queue.remove(player_id):
+            return HttpResponse(status=204)
+        return error_response("El jugador no está esperando en la cola", 404)
+
+    payload = await matchmaking.ticket_status(player_id)
+    if payload is None:
+        return error_response("El jugador no está en la cola", 404)
+    return JsonResponse(payload)
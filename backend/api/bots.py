@@ -0,0 +1,201 @@
+"""
+Oponente CPU.
+
+En un juego contra la CPU el jugador 2 es un Player con is_bot y el juego
+guarda la estrategia en Game.bot_strategy. services.play_turn calcula el
+movimiento de la CPU justo después del movimiento del jugador 1, en la misma
+petición y transacción.
+
+Las estrategias que predicen usan un modelo por jugador (frecuencia de sus
+movimientos y transiciones entre rondas consecutivas) que se construye una
+vez desde su historial de rondas y se guarda en una caché LRU en memoria del
+proceso. Después se actualiza con cada movimiento, así predecir es consultar
+unos contadores y no toca la base de datos.
+"""
+import random
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.db.models import Q
+
+from . import rules
+from .models import Player, Round
+
+STRATEGIES = {}
+
+
+def register_strategy(name):
+    """
+    Registra una clase de estrategia con el nombre que se usa en
+    Game.bot_strategy y en POST /api/create-game/
+    """
+    def decorator(cls):
+        cls.name = name
+        STRATEGIES[name] = cls()
+        return cls
+    return decorator
+
+
+class PlayerModel:
+    """
+    Contadores del juego de un jugador: cuántas veces usa cada movimiento y
+    qué movimiento sigue a cada uno dentro de un mismo juego
+    """
+    __slots__ = ('counts', 'transitions', 'built_at')
+
+    def __init__(self):
+        self.counts = dict.fromkeys(rules.ALL_MOVES, 0)
+        self.transitions = {move: dict.fromkeys(rules.ALL_MOVES, 0) for move in rules.ALL_MOVES}
+        self.built_at = time.monotonic()
+
+    def observe(self, previous_move, move):
+        self.counts[move] += 1
+        if previous_move is not None:
+            self.transitions[previous_move][move] += 1
+
+
+class ModelCache:
+    """
+    Caché LRU de PlayerModel por ID de jugador, segura entre hilos. Un modelo
+    con más de ttl segundos se reconstruye desde la base de datos para
+    recoger los movimientos aplicados por otros procesos.
+    """
+    def __init__(self, maxsize, ttl):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.models = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, player_id, build):
+        with self.lock:
+            model = self.models.get(player_id)
+            if model is not None and time.monotonic() - model.built_at < self.ttl:
+                self.models.move_to_end(player_id)
+                return model
+
+        # Se construye fuera del lock para no frenar a los demás jugadores
+        model = build(player_id)
+        with self.lock:
+            self.models[player_id] = model
+            self.models.move_to_end(player_id)
+            while len(self.models) > self.maxsize:
+                self.models.popitem(last=False)
+        return model
+
+    def clear(self):
+        with self.lock:
+            self.models.clear()
+
+
+def build_model(player_id):
+    """
+    Construye el modelo de un jugador con sus últimas
+    settings.BOT_HISTORY_ROUNDS rondas completas (una consulta)
+    """
+    rows = Round.objects.filter(
+        Q(game__player1_id=player_id) | Q(game__player2_id=player_id),
+        player1_move__isnull=False,
+        player2_move__isnull=False
+    ).order_by('-created_at', '-id').values_list(
+        'game_id', 'game__player1_id', 'player1_move', 'player2_move'
+    )[:settings.BOT_HISTORY_ROUNDS]
+
+    model = PlayerModel()
+    previous_game = previous_move = None
+    for game_id, player1_id, player1_move, player2_move in reversed(rows):
+        move = player1_move if player1_id == player_id else player2_move
+        model.observe(previous_move if game_id == previous_game else None, move)
+        previous_game, previous_move = game_id, move
+    return model
+
+
+player_models = ModelCache(settings.BOT_MODEL_CACHE_SIZE, settings.BOT_MODEL_TTL)
+
+
+def most_likely(counts, moves):
+    """
+    Movimiento más frecuente según counts entre los de moves (al azar entre
+    empatados), o None si no hay datos
+    """
+    best = max(counts[move] for move in moves)
+    if not best:
+        return None
+    return random.choice([move for move in moves if counts[move] == best])
+
+
+def counter(rule_set, predicted):
+    """
+    Movimiento que gana al previsto (al azar si hay varios), o uno al azar
+    si no hay previsión
+    """
+    if predicted is None:
+        return random.choice(rule_set.moves)
+    return random.choice(rule_set.counters[predicted])
+
+
+@register_strategy('random')
+class RandomStrategy:
+    """
+    Juega al azar: imposible de explotar, pero tampoco aprende
+    """
+    def choose(self, model, previous_move, rule_set):
+        return random.choice(rule_set.moves)
+
+
+@register_strategy('frequency')
+class FrequencyStrategy:
+    """
+    Gana al movimiento que más usa el jugador
+    """
+    def choose(self, model, previous_move, rule_set):
+        return counter(rule_set, most_likely(model.counts, rule_set.moves))
+
+
+@register_strategy('markov')
+class MarkovStrategy:
+    """
+    Gana al movimiento que el jugador suele hacer después del que hizo en la
+    ronda anterior; sin ronda anterior o sin datos, juega como frequency
+    """
+    def choose(self, model, previous_move, rule_set):
+        predicted = None
+        if previous_move is not None:
+            predicted = most_likely(model.transitions[previous_move], rule_set.moves)
+        if predicted is None:
+            predicted = most_likely(model.counts, rule_set.moves)
+        return counter(rule_set, predicted)
+
+
+def choose_move(game, previous_move, move):
+    """
+    Decide el movimiento de la CPU en respuesta al del jugador 1. La
+    estrategia solo ve el historial anterior; el movimiento de esta ronda se
+    añade al modelo después de decidir.
+
+    Args:
+        game: Juego contra la CPU
+        previous_move: Movimiento del jugador 1 en la ronda anterior del
+            juego, o None
+        move: Movimiento del jugador 1 en esta ronda
+
+    Returns:
+        str: Movimiento de la CPU
+    """
+    model = player_models.get(game.player1_id, build_model)
+    rule_set = rules.RULE_SETS[game.rule_set]
+    bot_move = STRATEGIES[game.bot_strategy].choose(model, previous_move, rule_set)
+    model.observe(previous_move, move)
+    return bot_move
+
+
+def bot_player(strategy):
+    """
+    Jugador que representa a la CPU con una estrategia (uno por estrategia)
+    """
+    player, _ = Player.objects.get_or_create(
+        handle=f"cpu ({strategy})",
+        defaults={'name': f"CPU ({strategy})", 'is_bot': True}
+    )
+    return player
@@ -0,0 +1,104 @@
+"""
+Caché de la representación serializada de los juegos.
+
+Cada entrada guarda el payload de GameSerializer junto con Game.version.
+make_move y restart_game escriben en la caché el estado recién serializado
+(write-through), así que los sondeos de GET /api/games/{id}/ se responden
+sin consultar la base de datos, y con un 304 si el ETag no ha cambiado.
+
+Funciona con cualquier backend de caché de Django: LocMemCache en
+desarrollo y tests, o un servidor compatible con el protocolo de Redis
+configurado con REDIS_URL.
+"""
+from django.conf import settings
+from django.core.cache import cache
+
+
+def game_cache_key(game_id):
+    return f'game:{game_id}'
+
+
+def game_etag(game_id, version):
+    return f'"game-{game_id}-v{version}"'
+
+
+def get_cached_game(game_id):
+    """
+    Returns:
+        tuple | None: (version, payload) si el juego está en caché
+    """
+    return cache.get(game_cache_key(game_id))
+
+
+async def aget_cached_game(game_id):
+    """
+    Versión asíncrona de get_cached_game
+    """
+    return await cache.aget(game_cache_key(game_id))
+
+
+def cache_game(game_id, version, payload):
+    """
+    Guarda el payload de un juego salvo que la caché ya tenga una versión
+    igual o más nueva, escrita por una petición concurrente que terminó
+    antes. Entre la lectura y la escritura queda una ventana mínima en la
+    que una versión anterior podría pisar a otra más nueva; el TTL
+    (GAME_CACHE_TIMEOUT) acota cuánto puede durar ese caso.
+    """
+    cached = get_cached_game(game_id)
+    if cached and cached[0] >= version:
+        return
+    cache.set(game_cache_key(game_id), (version, payload), settings.GAME_CACHE_TIMEOUT)
+
+
+def apply_delta(payload, delta):
+    """
+    Aplica a un juego serializado el delta de un movimiento (ver
+    GameDeltaSerializer): marcador, estado y la ronda, que sustituye a la
+    última si es la misma o se añade al final
+
+    Returns:
+        dict: Nuevo payload (el recibido no se modifica)
+    """
+    payload = {**payload, **{key: value for key, value in delta.items() if key != 'round'}}
+    rounds = list(payload['rounds'])
+    if rounds and rounds[-1]['id'] == delta['round']['id']:
+        rounds[-1] = delta['round']
+    else:
+        rounds.append(delta['round'])
+    payload['rounds'] = rounds
+    return payload
+
+
+def update_cached_game(game_id, delta):
+    """
+    Lleva la entrada de la caché de un juego al estado tras un movimiento
+    sin volver a serializarlo, si la caché tiene justo el estado anterior.
+    Si no, la entrada se borra: la siguiente lectura la reconstruye.
+    """
+    cached = get_cached_game(game_id)
+    if cached is None or cached[0] != delta['version'] - 1:
+        invalidate_game(game_id)
+        return
+    cache.set(
+        game_cache_key(game_id),
+        (delta['version'], apply_delta(cached[1], delta)),
+        settings.GAME_CACHE_TIMEOUT
+    )
+
+
+def invalidate_game(game_id):
+    cache.delete(game_cache_key(game_id))
+
+
+def invalidate_games(game_ids):
+    cache.delete_many([game_cache_key(game_id) for game_id in game_ids])
+
+
+def etag_matches(request, etag):
+    """
+    Comprueba si la cabecera If-None-Match del cliente incluye el ETag
+    """
+    header = request.headers.get('If-None-Match', '')
+    candidates = [candidate.strip() for candidate in header.split(',')]
+    return '*' in candidates or etag in candidates
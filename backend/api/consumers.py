@@ -0,0 +1,49 @@
+from channels.db import database_sync_to_async
+from channels.generic.websocket import AsyncJsonWebsocketConsumer
+
+from .cache import get_cached_game
+from .models import Game
+from .realtime import game_group_name
+from .views import serialize_game
+
+
+@database_sync_to_async
+def load_game_state(game_id):
+    """
+    Estado actual del juego, desde la caché si está disponible
+
+    Returns:
+        dict | None: Juego serializado, o None si no existe
+    """
+    cached = get_cached_game(game_id)
+    if cached is not None:
+        return cached[1]
+    try:
+        return serialize_game(game_id)
+    except Game.DoesNotExist:
+        return None
+
+
+class GameConsumer(AsyncJsonWebsocketConsumer):
+    """
+    Canal WebSocket de un juego: al conectarse envía el estado actual y luego
+    reenvía cada evento publicado por realtime.broadcast_game
+    """
+    async def connect(self):
+        self.game_id = self.scope['url_route']['kwargs']['game_id']
+        state = await load_game_state(self.game_id)
+        if state is None:
+            await self.close(code=4404)
+            return
+
+        self.group_name = game_group_name(self.game_id)
+        await self.channel_layer.group_add(self.group_name, self.channel_name)
+        await self.accept()
+        await self.send_json({'event': 'game.update', 'game': state})
+
+    async def disconnect(self, code):
+        if hasattr(self, 'group_name'):
+            await self.channel_layer.group_discard(self.group_name, self.channel_name)
+
+    async def game_event(self, message):
+        await self.send_json({'event': message['event'], 'game': message['game']})
@@ -0,0 +1,324 @@
+"""
+Registro de eventos de movimiento, repetición y snapshots.
+
+Las rondas (Round) son estado mutable: la misma fila recibe el movimiento
+del jugador 2 y su ganador, y restart_game cierra el juego sin dejar rastro.
+Además de actualizar su ronda, cada movimiento añade una fila compacta a
+MoveEvent (juego, número de secuencia, asiento y movimiento) que no se
+modifica nunca; el cierre de un juego en curso por un reinicio es un
+evento más, sin movimiento.
+
+- Los eventos se acumulan en memoria en el juego mientras se aplican los
+  movimientos (record_move, record_close) y se insertan todos juntos con un
+  bulk_create al final de la transacción (save_pending), igual que las
+  rondas en services.apply_moves.
+- Cada SNAPSHOT_EVERY eventos se guarda también un GameSnapshot con el
+  estado del juego en ese punto. rebuild() parte del último snapshot
+  anterior a la secuencia pedida y repite solo los eventos posteriores, así
+  reconstruir un juego largo cuesta O(eventos desde el snapshot).
+- GET /api/games/{id}/events/ envía los eventos de un juego en streaming y
+  GET /api/games/{id}/replay/?seq=N devuelve su estado tras N eventos.
+
+Los eventos no tienen claves foráneas: el registro de un juego sobrevive a
+su archivo (ver api.archive), y los juegos archivados se pueden repetir.
+"""
+import json
+from datetime import datetime
+
+from django.core.handlers.asgi import ASGIRequest
+from django.http import JsonResponse, StreamingHttpResponse
+from django.views.decorators.http import require_GET
+
+from . import rules
+from .export import aiterate
+from .models import ArchivedGame, Game, GameSnapshot, MoveEvent
+
+# Eventos entre dos snapshots de un juego
+SNAPSHOT_EVERY = 50
+
+# Filas por INSERT y filas leídas del cursor por bloque
+BATCH_SIZE = 1000
+
+
+class GameState:
+    """
+    Estado de un juego reconstruido a partir de sus eventos: marcador,
+    ganador, si sigue en curso y los movimientos de la ronda en juego
+    """
+    __slots__ = ('game', 'seq', 'player1_score', 'player2_score', 'winner_id', 'is_active', 'round')
+
+    def __init__(self, game, seq=0, state=None):
+        """
+        Args:
+            game: Dict con player1_id, player2_id y rule_set del juego
+            seq: Eventos ya aplicados
+            state: Estado guardado por as_dict(), o None para un juego nuevo
+        """
+        state = state or {}
+        self.game = game
+        self.seq = seq
+        self.player1_score = state.get('player1_score', 0)
+        self.player2_score = state.get('player2_score', 0)
+        self.winner_id = state.get('winner_id')
+        self.is_active = state.get('is_active', True)
+        self.round = list(state.get('round', [None, None]))
+
+    @classmethod
+    def of(cls, game, current_round):
+        """
+        Estado actual de un juego en memoria, para guardarlo como snapshot
+        """
+        return cls(
+            {'player1_id': game.player1_id, 'player2_id': game.player2_id, 'rule_set': game.rule_set},
+            game.move_count,
+            {
+                'player1_score': game.player1_score,
+                'player2_score': game.player2_score,
+                'winner_id': game.winner_id,
+                'is_active': game.is_active,
+                'round': [current_round.player1_move, current_round.player2_move] if current_round else [None, None],
+            }
+        )
+
+    def apply(self, seat, move):
+        """
+        Aplica el siguiente evento con las mismas reglas que
+        services.play_move. Los eventos ya se validaron al registrarse.
+        """
+        self.seq += 1
+        if seat == MoveEvent.CLOSED:
+            self.is_active = False
+            return
+
+        # Un movimiento tras una ronda completa abre la siguiente
+        if all(self.round):
+            self.round = [None, None]
+        self.round[seat - 1] = move
+        if not all(self.round):
+            return
+
+        outcome = rules.RULE_SETS[self.game['rule_set']].outcome(*self.round)
+        if outcome == rules.PLAYER1:
+            self.player1_score += 1
+        elif outcome == rules.PLAYER2:
+            self.player2_score += 1
+        if self.player1_score >= Game.WINNING_SCORE:
+            self.winner_id = self.game['player1_id']
+            self.is_active = False
+        elif self.player2_score >= Game.WINNING_SCORE:
+            self.winner_id = self.game['player2_id']
+            self.is_active = False
+
+    def as_dict(self):
+        return {
+            'player1_score': self.player1_score,
+            'player2_score': self.player2_score,
+            'winner_id': self.winner_id,
+            'is_active': self.is_active,
+            'round': list(self.round),
+        }
+
+
+def pending(game):
+    """
+    Returns:
+        tuple: Listas de eventos y snapshots del juego pendientes de guardar
+    """
+    if not hasattr(game, 'pending_events'):
+        game.pending_events = []
+        game.pending_snapshots = []
+    return game.pending_events, game.pending_snapshots
+
+
+def record(game, current_round, seat, move=None):
+    """
+    Añade un evento al juego, y un snapshot si toca. No guarda: el llamador
+    persiste el juego y llama a save_pending en la misma transacción.
+
+    Args:
+        game: Juego (bloqueado por el llamador), ya con el evento aplicado
+        current_round: Ronda del juego tras el evento, o None
+        seat: MoveEvent.PLAYER1, MoveEvent.PLAYER2 o MoveEvent.CLOSED
+        move: Movimiento, o None en el cierre
+
+    Returns:
+        list: Campos modificados, para usar con save(update_fields=...)
+    """
+    events, snapshots = pending(game)
+    game.move_count += 1
+    events.append(MoveEvent(game_id=game.pk, seq=game.move_count, seat=seat, move=move))
+    if game.move_count % SNAPSHOT_EVERY == 0:
+        state = GameState.of(game, current_round)
+        snapshots.append(GameSnapshot(game_id=game.pk, seq=state.seq, state=state.as_dict()))
+    return ['move_count']
+
+
+def record_move(game, current_round, player_id, movement):
+    """
+    Registra el movimiento de un jugador (ver record)
+    """
+    seat = MoveEvent.PLAYER1 if player_id == game.player1_id else MoveEvent.PLAYER2
+    return record(game, current_round, seat, movement)
+
+
+def record_close(game):
+    """
+    Registra el cierre de un juego en curso por un reinicio (ver record)
+    """
+    return record(game, None, MoveEvent.CLOSED)
+
+
+def save_pending(games):
+    """
+    Inserta los eventos y snapshots pendientes de los juegos, con un
+    bulk_create por tabla
+    """
+    events = []
+    snapshots = []
+    for game in games:
+        game_events, game_snapshots = pending(game)
+        events.extend(game_events)
+        snapshots.extend(game_snapshots)
+        del game.pending_events, game.pending_snapshots
+    MoveEvent.objects.bulk_create(events, batch_size=BATCH_SIZE)
+    GameSnapshot.objects.bulk_create(snapshots, batch_size=BATCH_SIZE)
+
+
+def game_header(game_id):
+    """
+    Returns:
+        dict | None: player1_id, player2_id y rule_set del juego, en curso o
+        archivado, o None si no existe
+    """
+    fields = ('player1_id', 'player2_id', 'rule_set')
+    return (
+        Game.objects.filter(pk=game_id).values(*fields).first()
+        or ArchivedGame.objects.filter(pk=game_id).values(*fields).first()
+    )
+
+
+def rebuild(game_id, seq=None):
+    """
+    Reconstruye el estado de un juego desde su registro de eventos, a partir
+    del último snapshot anterior a seq
+
+    Args:
+        game_id: ID del juego
+        seq: Eventos a aplicar, o None para todos
+
+    Returns:
+        GameState | None: Estado tras seq eventos (o los que haya), o None
+        si el juego no existe
+    """
+    header = game_header(game_id)
+    if header is None:
+        return None
+
+    snapshots = GameSnapshot.objects.filter(game_id=game_id)
+    events = MoveEvent.objects.filter(game_id=game_id)
+    if seq is not None:
+        snapshots = snapshots.filter(seq__lte=seq)
+        events = events.filter(seq__lte=seq)
+    snapshot = snapshots.order_by('-seq').values('seq', 'state').first()
+    state = GameState(header, **snapshot) if snapshot else GameState(header)
+
+    rows = events.filter(seq__gt=state.seq).order_by('seq').values_list('seat', 'move')
+    for seat, move in rows.iterator(chunk_size=BATCH_SIZE):
+        state.apply(seat, move)
+    return state
+
+
+def event_lines(game_id, header, after):
+    """
+    Returns:
+        iterator: Bloques de texto con un objeto JSON por evento
+    """
+    player_ids = {MoveEvent.PLAYER1: header['player1_id'], MoveEvent.PLAYER2: header['player2_id']}
+    rows = MoveEvent.objects.filter(game_id=game_id, seq__gt=after).order_by('seq').values_list(
+        'seq', 'seat', 'move', 'created_at'
+    )
+    chunk = []
+    for seq, seat, move, created_at in rows.iterator(chunk_size=BATCH_SIZE):
+        chunk.append(json.dumps({
+            'seq': seq,
+            'player_id': player_ids.get(seat),
+            'move': move,
+            'closed': seat == MoveEvent.CLOSED,
+            'created_at': created_at,
+        }, default=datetime.isoformat, separators=(',', ':')) + '\n')
+        if len(chunk) >= BATCH_SIZE:
+            yield ''.join(chunk)
+            chunk = []
+    if chunk:
+        yield ''.join(chunk)
+
+
+def parse_seq(request, name):
+    """
+    Returns:
+        int | None: Parámetro entero y no negativo de la query string
+
+    Raises:
+        ValueError: Si no es un entero no negativo
+    """
+    value = request.GET.get(name)
+    if value is None:
+        return None
+    value = int(value)
+    if value < 0:
+        raise ValueError(value)
+    return value
+
+
+@require_GET
+def game_events(request, game_id):
+    """
+    Endpoint de repetición en streaming: GET /api/games/{id}/events/
+
+    Args:
+        request: Objeto Request; ?after= omite los eventos hasta esa
+            secuencia (para continuar una repetición)
+        game_id: ID del juego, en curso o archivado
+
+    Returns:
+        StreamingHttpResponse: Un objeto JSON por evento (NDJSON), en orden
+    """
+    try:
+        after = parse_seq(request, 'after') or 0
+    except ValueError:
+        return JsonResponse({"error": "after debe ser un entero no negativo"}, status=400)
+    header = game_header(game_id)
+    if header is None:
+        return JsonResponse({"error": "Juego no encontrado"}, status=404)
+
+    chunks = event_lines(game_id, header, after)
+    # Como en la exportación, por ASGI los bloques se envían a medida que
+    # se generan
+    if isinstance(request, ASGIRequest):
+        chunks = aiterate(chunks)
+    return StreamingHttpResponse(chunks, content_type='application/x-ndjson')
+
+
+@require_GET
+def game_replay(request, game_id):
+    """
+    Estado de un juego reconstruido desde sus eventos:
+    GET /api/games/{id}/replay/
+
+    Args:
+        request: Objeto Request; ?seq= indica tras cuántos eventos (por
+            defecto, todos)
+        game_id: ID del juego, en curso o archivado
+
+    Returns:
+        JsonResponse: Secuencia alcanzada y marcador, ganador, si sigue en
+        curso y movimientos de la ronda en juego en ese punto
+    """
+    try:
+        seq = parse_seq(request, 'seq')
+    except ValueError:
+        return JsonResponse({"error": "seq debe ser un entero no negativo"}, status=400)
+    state = rebuild(game_id, seq)
+    if state is None:
+        return JsonResponse({"error": "Juego no encontrado"}, status=404)
+    return JsonResponse({'game_id': game_id, 'seq': state.seq, **state.as_dict()})
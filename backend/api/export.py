@@ -0,0 +1,342 @@
+"""
+Exportación en streaming del historial de juegos y rondas.
+
+Las filas se leen con .iterator(chunk_size=...), que en PostgreSQL usa un
+cursor del servidor, y se escriben por bloques a medida que llegan, así la
+memoria no crece con el tamaño de la tabla. Hay tres formatos:
+
+- ndjson: un objeto JSON por línea.
+- csv: con cabecera.
+- columnar: formato binario compacto para uso offline (ver write_columnar y
+  read_columnar), con una cabecera de esquema y grupos de filas en los que
+  cada columna va comprimida por separado.
+
+Los juegos y rondas archivados (ver api.archive) se exportan junto con los
+de las tablas principales, intercalados en orden de ID.
+"""
+import csv
+import heapq
+import io
+import json
+import struct
+import sys
+import zlib
+from array import array
+from datetime import datetime, timedelta, timezone as dt_timezone
+from itertools import islice
+from operator import itemgetter
+
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIRequest
+from django.db.models import BooleanField, Value
+from django.http import JsonResponse, StreamingHttpResponse
+from django.views.decorators.http import require_GET
+from rest_framework.exceptions import ValidationError
+
+from .filters import parse_moment
+from .models import ArchivedGame, ArchivedRound, Game, Round
+
+# Filas leídas del cursor y escritas por bloque (y filas por grupo en el
+# formato columnar)
+CHUNK_SIZE = 2000
+
+# Columnas exportadas: (nombre, campo del ORM, tipo)
+EXPORTS = {
+    'games': ((Game, ArchivedGame), [
+        ('id', 'id', 'int'),
+        ('player1_id', 'player1_id', 'int'),
+        ('player1_name', 'player1__name', 'str'),
+        ('player2_id', 'player2_id', 'int'),
+        ('player2_name', 'player2__name', 'str'),
+        ('player1_score', 'player1_score', 'int'),
+        ('player2_score', 'player2_score', 'int'),
+        ('winner_id', 'winner_id', 'int'),
+        ('is_active', 'is_active', 'bool'),
+        ('round_count', 'round_count', 'int'),
+        ('created_at', 'created_at', 'datetime'),
+    ]),
+    'rounds': ((Round, ArchivedRound), [
+        ('id', 'id', 'int'),
+        ('game_id', 'game_id', 'int'),
+        ('player1_id', 'game__player1_id', 'int'),
+        ('player2_id', 'game__player2_id', 'int'),
+        ('player1_move', 'player1_move', 'str'),
+        ('player2_move', 'player2_move', 'str'),
+        ('winner_id', 'winner_id', 'int'),
+        ('created_at', 'created_at', 'datetime'),
+    ]),
+}
+
+
+# Columnas que el archivo no guarda, con su valor fijo
+ARCHIVED_VALUES = {
+    'games': {'is_active': Value(False, output_field=BooleanField())},
+}
+
+
+def columns_for(kind):
+    return [(name, column_type) for name, _, column_type in EXPORTS[kind][1]]
+
+
+def export_batches(kind, created_after=None, created_before=None, chunk_size=CHUNK_SIZE):
+    """
+    Recorre la tabla en orden de ID con un cursor del servidor
+
+    Args:
+        kind: 'games' o 'rounds'
+        created_after: Solo filas creadas desde este momento (incluido)
+        created_before: Solo filas creadas antes de este momento
+
+    Returns:
+        iterator: Listas de hasta chunk_size tuplas, en el orden de columns_for
+    """
+    (model, archive), columns = EXPORTS[kind]
+    streams = []
+    for queryset in (model.objects.all(), archive.objects.annotate(**ARCHIVED_VALUES.get(kind, {}))):
+        if created_after is not None:
+            queryset = queryset.filter(created_at__gte=created_after)
+        if created_before is not None:
+            queryset = queryset.filter(created_at__lt=created_before)
+        streams.append(queryset.order_by('id').values_list(
+            *[lookup for _, lookup, _ in columns]
+        ).iterator(chunk_size=chunk_size))
+    # Los IDs del archivo no se repiten en las tablas principales
+    rows = heapq.merge(*streams, key=itemgetter(0))
+
+    while True:
+        batch = list(islice(rows, chunk_size))
+        if not batch:
+            return
+        yield batch
+
+
+def write_ndjson(columns, batches):
+    """
+    Returns:
+        iterator: Bloques de texto con un objeto JSON por fila
+    """
+    names = [name for name, _ in columns]
+    for batch in batches:
+        yield ''.join(
+            json.dumps(dict(zip(names, row)), default=datetime.isoformat, separators=(',', ':')) + '\n'
+            for row in batch
+        )
+
+
+def write_csv(columns, batches):
+    """
+    Returns:
+        iterator: Bloques de texto CSV, el primero con la cabecera
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow([name for name, _ in columns])
+    for batch in batches:
+        writer.writerows(
+            [value.isoformat() if isinstance(value, datetime) else value for value in row]
+            for row in batch
+        )
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+# Formato columnar. Estructura del fichero:
+#   MAGIC
+#   bloque con el esquema: {"columns": [[nombre, tipo], ...]}
+#   por cada grupo de filas: bloque con {"rows": n, "columns": [...]} y, a
+#     continuación, los datos comprimidos de cada columna
+#   bloque vacío como final
+# Un bloque es su longitud (uint32 little-endian) seguida de JSON. Enteros y
+# fechas (microsegundos desde 1970 UTC) van como int64 little-endian, los
+# booleanos como un byte y los textos codificados con un diccionario por
+# grupo. Los nulos de las columnas numéricas se marcan con una máscara.
+MAGIC = b'RPSCOL1\n'
+EPOCH = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+LENGTH = struct.Struct('<I')
+
+
+def pack_block(header):
+    data = json.dumps(header, separators=(',', ':')).encode()
+    return LENGTH.pack(len(data)) + data
+
+
+def to_little_endian(values):
+    if sys.byteorder == 'big':
+        values.byteswap()
+    return values.tobytes()
+
+
+def encode_column(column_type, values):
+    """
+    Returns:
+        tuple: (metadatos de la columna, datos sin comprimir, máscara de nulos
+        o None)
+    """
+    if column_type == 'str':
+        dictionary = {}
+        codes = array('I', (dictionary.setdefault(value, len(dictionary)) for value in values))
+        return {'dictionary': list(dictionary)}, to_little_endian(codes), None
+
+    nulls = None
+    if any(value is None for value in values):
+        nulls = bytes(value is None for value in values)
+    if column_type == 'bool':
+        return {}, bytes(bool(value) for value in values), nulls
+    if column_type == 'datetime':
+        values = [None if value is None else (value - EPOCH) // timedelta(microseconds=1) for value in values]
+    return {}, to_little_endian(array('q', (value or 0 for value in values))), nulls
+
+
+def decode_column(column_type, meta, data, nulls):
+    if column_type == 'str':
+        codes = array('I')
+        codes.frombytes(data)
+        if sys.byteorder == 'big':
+            codes.byteswap()
+        return [meta['dictionary'][code] for code in codes]
+
+    if column_type == 'bool':
+        values = [bool(value) for value in data]
+    else:
+        numbers = array('q')
+        numbers.frombytes(data)
+        if sys.byteorder == 'big':
+            numbers.byteswap()
+        values = list(numbers)
+        if column_type == 'datetime':
+            values = [EPOCH + timedelta(microseconds=value) for value in values]
+    if nulls is not None:
+        values = [None if null else value for value, null in zip(values, nulls)]
+    return values
+
+
+def write_columnar(columns, batches):
+    """
+    Returns:
+        iterator: Bloques de bytes del fichero columnar; cada lote de filas
+        es un grupo
+    """
+    yield MAGIC + pack_block({'columns': [list(column) for column in columns]})
+    for batch in batches:
+        header = {'rows': len(batch), 'columns': []}
+        blobs = []
+        for index, (name, column_type) in enumerate(columns):
+            meta, data, nulls = encode_column(column_type, [row[index] for row in batch])
+            data = zlib.compress(data)
+            meta['size'] = len(data)
+            blobs.append(data)
+            if nulls is not None:
+                nulls = zlib.compress(nulls)
+                meta['nulls'] = len(nulls)
+                blobs.append(nulls)
+            header['columns'].append(meta)
+        yield pack_block(header) + b''.join(blobs)
+    yield LENGTH.pack(0)
+
+
+def read_block(stream):
+    size = LENGTH.unpack(stream.read(LENGTH.size))[0]
+    return json.loads(stream.read(size)) if size else None
+
+
+def read_columnar(stream):
+    """
+    Lee un fichero escrito por write_columnar grupo a grupo
+
+    Args:
+        stream: Fichero binario abierto para lectura
+
+    Returns:
+        iterator: Un dict por grupo de filas con la lista de valores de cada
+        columna
+
+    Raises:
+        ValueError: Si el fichero no tiene el formato columnar
+    """
+    if stream.read(len(MAGIC)) != MAGIC:
+        raise ValueError("El fichero no tiene el formato columnar de exportación")
+    columns = read_block(stream)['columns']
+
+    while True:
+        header = read_block(stream)
+        if header is None:
+            return
+        group = {}
+        for (name, column_type), meta in zip(columns, header['columns']):
+            data = zlib.decompress(stream.read(meta['size']))
+            nulls = zlib.decompress(stream.read(meta['nulls'])) if 'nulls' in meta else None
+            group[name] = decode_column(column_type, meta, data, nulls)
+        yield group
+
+
+# Formato: (escritor, tipo de contenido, extensión)
+FORMATS = {
+    'ndjson': (write_ndjson, 'application/x-ndjson', 'ndjson'),
+    'csv': (write_csv, 'text/csv', 'csv'),
+    'columnar': (write_columnar, 'application/octet-stream', 'rpscol'),
+}
+
+
+def export_chunks(kind, export_format, **options):
+    """
+    Returns:
+        iterator: Bloques (texto o bytes) de la exportación completa
+    """
+    writer = FORMATS[export_format][0]
+    return writer(columns_for(kind), export_batches(kind, **options))
+
+
+async def aiterate(chunks):
+    """
+    Consume un iterador síncrono desde ASGI bloque a bloque. Cada bloque se
+    genera en el hilo síncrono de la petición, el mismo que abrió el cursor.
+    """
+    next_chunk = sync_to_async(next, thread_sensitive=True)
+    while True:
+        chunk = await next_chunk(chunks, None)
+        if chunk is None:
+            return
+        yield chunk
+
+
+@require_GET
+def export_history(request, kind):
+    """
+    Endpoint de exportación en streaming: GET /api/export/{games|rounds}/
+
+    Args:
+        request: Objeto Request; ?format= (ndjson, csv o columnar) y los
+            filtros created_after y created_before de los listados
+
+    Returns:
+        StreamingHttpResponse: Fichero descargable generado por bloques
+    """
+    export_format = request.GET.get('format', 'ndjson')
+    if export_format not in FORMATS:
+        return JsonResponse(
+            {"error": f"Formato no soportado. Debe ser uno de: {', '.join(FORMATS)}"},
+            status=400
+        )
+
+    options = {}
+    try:
+        if 'created_after' in request.GET:
+            options['created_after'] = parse_moment(request.GET['created_after'], 'created_after')
+        if 'created_before' in request.GET:
+            options['created_before'] = parse_moment(request.GET['created_before'], 'created_before', end_of_day=True)
+    except ValidationError as e:
+        return JsonResponse(e.detail, status=400)
+
+    chunks = export_chunks(kind, export_format, **options)
+    # Django 4.2 lee entero un iterador síncrono si sirve la respuesta por
+    # ASGI; uno asíncrono se envía bloque a bloque
+    if isinstance(request, ASGIRequest):
+        chunks = aiterate(chunks)
+
+    _, content_type, extension = FORMATS[export_format]
+    response = StreamingHttpResponse(chunks, content_type=content_type)
+    response['Content-Disposition'] = f'attachment; filename="{kind}.{extension}"'
+    return response
@@ -0,0 +1,120 @@
+"""
+Serialización rápida para los listados.
+
+Construye directamente los dicts de la respuesta a partir de filas de
+.values(), sin instanciar modelos ni recorrer los campos de un
+ModelSerializer por cada objeto. El resultado es idéntico al de
+PlayerSerializer y GameSummarySerializer (mismas claves, en el mismo orden
+y con los mismos valores), así que con el mismo renderer la respuesta es
+la misma byte a byte. Si cambian los campos de esos serializers, hay que
+cambiar también estas funciones; FastSerializationTests lo comprueba.
+"""
+from rest_framework import serializers
+
+from .metrics import timing
+from .serializers import game_status
+
+# Mismo formato de fecha que los serializers de DRF
+datetime_field = serializers.DateTimeField()
+
+PLAYER_VALUES = ['id', 'name', 'is_bot', 'created_at']
+
+GAME_VALUES = [
+    'id', 'player1_score', 'player2_score', 'is_active', 'bot_strategy', 'rule_set', 'version', 'created_at',
+    *(f'{seat}__{field}' for seat in ('player1', 'player2', 'winner') for field in PLAYER_VALUES),
+]
+
+
+def player_values(queryset):
+    """
+    Returns:
+        QuerySet: Filas con las columnas que usa player_rows
+    """
+    return queryset.values(*PLAYER_VALUES)
+
+
+def datetime_formatter():
+    """
+    Formatea fechas como DateTimeField de DRF, recordando las ya
+    formateadas: en un listado las fechas de los jugadores se repiten
+    """
+    formatted = {}
+    to_representation = datetime_field.to_representation
+
+    def format_datetime(value):
+        text = formatted.get(value)
+        if text is None:
+            text = formatted[value] = to_representation(value)
+        return text
+    return format_datetime
+
+
+def player_rows(rows):
+    """
+    Igual que PlayerSerializer(many=True).data, a partir de player_values
+    """
+    format_datetime = datetime_formatter()
+    with timing('serialize'):
+        return [
+            {
+                'id': row['id'],
+                'name': row['name'],
+                'is_bot': row['is_bot'],
+                'created_at': format_datetime(row['created_at']),
+            }
+            for row in rows
+        ]
+
+
+def game_values(queryset):
+    """
+    Returns:
+        QuerySet: Filas con las columnas que usa game_summary_rows; los
+        jugadores y el ganador llegan en el mismo JOIN
+    """
+    return queryset.values(*GAME_VALUES)
+
+
+# Claves de las columnas de cada jugador en las filas de game_values
+SEAT_KEYS = {
+    seat: tuple(f'{seat}__{field}' for field in PLAYER_VALUES)
+    for seat in ('player1', 'player2', 'winner')
+}
+
+
+def game_summary_rows(rows):
+    """
+    Igual que GameSummarySerializer(many=True).data, a partir de game_values
+    """
+    format_datetime = datetime_formatter()
+
+    def seat(row, keys):
+        id_key, name_key, is_bot_key, created_at_key = keys
+        if row[id_key] is None:
+            return None
+        return {
+            'id': row[id_key],
+            'name': row[name_key],
+            'is_bot': row[is_bot_key],
+            'created_at': format_datetime(row[created_at_key]),
+        }
+
+    player1_keys, player2_keys, winner_keys = SEAT_KEYS['player1'], SEAT_KEYS['player2'], SEAT_KEYS['winner']
+    with timing('serialize'):
+        return [
+            {
+                'id': row['id'],
+                'player1': seat(row, player1_keys),
+                'player2': seat(row, player2_keys),
+                'player1_score': row['player1_score'],
+                'player2_score': row['player2_score'],
+                'winner': seat(row, winner_keys),
+                'is_active': row['is_active'],
+                'bot_strategy': row['bot_strategy'],
+                'rule_set': row['rule_set'],
+                'version': row['version'],
+                'created_at': format_datetime(row['created_at']),
+                'status': game_status(row['is_active'], row['winner__name']),
+            }
+            for row in rows
+        ]
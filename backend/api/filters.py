@@ -0,0 +1,90 @@
+from datetime import datetime, time, timedelta
+
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from rest_framework.exceptions import ValidationError
+from rest_framework.filters import BaseFilterBackend
+
+
+def parse_boolean(value, param):
+    """
+    Convierte el valor de un parámetro de consulta en booleano
+    """
+    normalized = value.lower()
+    if normalized in ('true', '1'):
+        return True
+    if normalized in ('false', '0'):
+        return False
+    raise ValidationError({param: "Debe ser true o false"})
+
+
+def parse_id(value, param):
+    """
+    Convierte el valor de un parámetro de consulta en un ID numérico
+    """
+    try:
+        return int(value)
+    except ValueError:
+        raise ValidationError({param: "Debe ser un ID numérico"})
+
+
+def parse_moment(value, param, end_of_day=False):
+    """
+    Acepta una fecha (YYYY-MM-DD) o una fecha y hora ISO 8601 y devuelve un
+    datetime con zona horaria. Una fecha sin hora se interpreta como el
+    inicio del día, o del día siguiente si end_of_day es True, para que el
+    filtro siga siendo una comparación directa sobre el índice de created_at.
+    """
+    try:
+        day = parse_date(value)
+        if day is not None:
+            if end_of_day:
+                day += timedelta(days=1)
+            moment = datetime.combine(day, time.min)
+        else:
+            moment = parse_datetime(value)
+    except ValueError:
+        moment = None
+    if moment is None:
+        raise ValidationError({param: "Debe ser una fecha ISO 8601"})
+    if timezone.is_naive(moment):
+        moment = timezone.make_aware(moment)
+    return moment
+
+
+class CreatedRangeFilter(BaseFilterBackend):
+    """
+    Filtra por rango de creación con created_after y created_before.
+
+    Las fechas sin hora incluyen el día completo en ambos extremos.
+    """
+    def filter_queryset(self, request, queryset, view):
+        params = request.query_params
+
+        if 'created_after' in params:
+            moment = parse_moment(params['created_after'], 'created_after')
+            queryset = queryset.filter(created_at__gte=moment)
+
+        if 'created_before' in params:
+            moment = parse_moment(params['created_before'], 'created_before', end_of_day=True)
+            queryset = queryset.filter(created_at__lt=moment)
+
+        return queryset
+
+
+class GameFilter(BaseFilterBackend):
+    """
+    Filtra juegos por estado (is_active) y por jugador participante (player)
+    """
+    def filter_queryset(self, request, queryset, view):
+        params = request.query_params
+
+        if 'is_active' in params:
+            queryset = queryset.filter(is_active=parse_boolean(params['is_active'], 'is_active'))
+
+        if 'player' in params:
+            player_id = parse_id(params['player'], 'player')
+            queryset = queryset.filter(Q(player1_id=player_id) | Q(player2_id=player_id))
+
+        return queryset
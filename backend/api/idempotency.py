@@ -0,0 +1,217 @@
+"""
+Claves de idempotencia para los endpoints de escritura.
+
+Un cliente que reintenta un POST (p. ej. tras perder la respuesta en una
+red móvil) envía la misma cabecera Idempotency-Key. IdempotencyMiddleware
+guarda en la caché la primera respuesta de cada clave durante
+settings.IDEMPOTENCY_TTL segundos y la devuelve tal cual en los reintentos,
+con la cabecera Idempotent-Replayed, sin volver a ejecutar la vista: un
+movimiento repetido no acaba en "Es el turno del Jugador 2" ni un juego
+repetido crea otro juego.
+
+- La clave se reserva con cache.add, que es atómico: de varios reintentos
+  simultáneos solo uno ejecuta la vista; el resto espera su respuesta hasta
+  settings.IDEMPOTENCY_WAIT segundos y, si no llega, recibe un 409.
+- Cada clave va asociada a la petición (método, ruta, query string y
+  cuerpo): reutilizarla con otra petición devuelve un 422.
+- Las respuestas 5xx no se guardan, ni las que piden reintentar más tarde
+  (409, 429 de los límites por cliente y 503 del descarte de carga): el
+  reintento vuelve a ejecutar la vista.
+
+Solo se aplica a las vistas de settings.IDEMPOTENT_VIEWS. Con varios
+procesos hace falta una caché compartida (REDIS_URL), igual que para la
+caché de juegos.
+"""
+import asyncio
+import hashlib
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse, JsonResponse
+from django.urls import Resolver404, resolve
+
+HEADER = 'Idempotency-Key'
+REPLAYED_HEADER = 'Idempotent-Replayed'
+MAX_KEY_LENGTH = 255
+
+# Segundos que dura la reserva de una clave mientras se ejecuta la vista;
+# si el proceso muere a mitad, la clave se libera sola
+PENDING_TIMEOUT = 30
+
+# Segundos entre consultas mientras otra petición ejecuta la misma clave
+POLL_INTERVAL = 0.05
+
+# Cabeceras de la respuesta original que se repiten en los reintentos
+STORED_HEADERS = ('ETag', 'Retry-After')
+
+# Respuestas transitorias que no se guardan (además de las 5xx)
+RETRYABLE_STATUSES = (409, 429)
+
+
+class Scope:
+    """
+    Clave de caché y huella de una petición con Idempotency-Key
+    """
+    __slots__ = ('cache_key', 'fingerprint')
+
+    def __init__(self, cache_key, fingerprint):
+        self.cache_key = cache_key
+        self.fingerprint = fingerprint
+
+
+def request_scope(request):
+    """
+    Returns:
+        Scope | HttpResponse | None: None si la petición no usa claves de
+        idempotencia (sin cabecera, no es POST o la vista no está en
+        IDEMPOTENT_VIEWS) y un 400 si la clave no es válida
+    """
+    key = request.headers.get(HEADER)
+    if key is None or request.method != 'POST':
+        return None
+    try:
+        view_name = resolve(request.path_info).view_name
+    except Resolver404:
+        return None
+    if view_name not in settings.IDEMPOTENT_VIEWS:
+        return None
+    if not key or len(key) > MAX_KEY_LENGTH:
+        return JsonResponse(
+            {"error": f"{HEADER} debe tener entre 1 y {MAX_KEY_LENGTH} caracteres"}, status=400
+        )
+
+    digest = hashlib.sha256()
+    digest.update(request.get_full_path().encode())
+    digest.update(b'\0')
+    digest.update(request.body)
+    key_digest = hashlib.sha256(key.encode()).hexdigest()
+    return Scope(f'idempotency:{view_name}:{key_digest}', digest.hexdigest())
+
+
+def stored_response(response):
+    """
+    Returns:
+        dict: Lo que se guarda de una respuesta para repetirla
+    """
+    return {
+        'status': response.status_code,
+        'content': response.content,
+        'content_type': response['Content-Type'],
+        'headers': {name: response[name] for name in STORED_HEADERS if response.has_header(name)},
+    }
+
+
+def replay(entry):
+    response = HttpResponse(entry['content'], status=entry['status'], content_type=entry['content_type'])
+    for name, value in entry['headers'].items():
+        response[name] = value
+    response[REPLAYED_HEADER] = 'true'
+    return response
+
+
+def check_entry(scope, entry, waited):
+    """
+    Decide qué hacer con la entrada de otra petición con la misma clave
+
+    Returns:
+        HttpResponse | None: La respuesta para el cliente, o None si hay
+        que seguir esperando
+    """
+    if entry['fingerprint'] != scope.fingerprint:
+        return JsonResponse(
+            {"error": f"{HEADER} ya se usó con una petición distinta"}, status=422
+        )
+    if 'response' in entry:
+        return replay(entry['response'])
+    if waited >= settings.IDEMPOTENCY_WAIT:
+        response = JsonResponse(
+            {"error": f"Ya hay una petición en curso con este {HEADER}"}, status=409
+        )
+        response['Retry-After'] = '1'
+        return response
+    return None
+
+
+def result_entry(scope, response):
+    """
+    Returns:
+        dict | None: Entrada con la respuesta, o None si no se guarda
+        (errores 5xx, respuestas transitorias y respuestas en streaming)
+    """
+    if response.status_code >= 500 or response.status_code in RETRYABLE_STATUSES or response.streaming:
+        return None
+    return {'fingerprint': scope.fingerprint, 'response': stored_response(response)}
+
+
+class IdempotencyMiddleware:
+    """
+    Aplica Idempotency-Key a las vistas de settings.IDEMPOTENT_VIEWS. Va
+    después de CorsMiddleware, para que las respuestas repetidas lleven
+    también sus cabeceras.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        scope = request_scope(request)
+        if not isinstance(scope, Scope):
+            return scope or self.get_response(request)
+
+        pending = {'fingerprint': scope.fingerprint}
+        started = time.monotonic()
+        while not cache.add(scope.cache_key, pending, PENDING_TIMEOUT):
+            entry = cache.get(scope.cache_key)
+            if entry is not None:
+                response = check_entry(scope, entry, time.monotonic() - started)
+                if response is not None:
+                    return response
+                time.sleep(POLL_INTERVAL)
+
+        try:
+            response = self.get_response(request)
+        except BaseException:
+            cache.delete(scope.cache_key)
+            raise
+        entry = result_entry(scope, response)
+        if entry is None:
+            cache.delete(scope.cache_key)
+        else:
+            cache.set(scope.cache_key, entry, settings.IDEMPOTENCY_TTL)
+        return response
+
+    async def __acall__(self, request):
+        scope = request_scope(request)
+        if not isinstance(scope, Scope):
+            return scope or await self.get_response(request)
+
+        pending = {'fingerprint': scope.fingerprint}
+        started = time.monotonic()
+        while not await cache.aadd(scope.cache_key, pending, PENDING_TIMEOUT):
+            entry = await cache.aget(scope.cache_key)
+            if entry is not None:
+                response = check_entry(scope, entry, time.monotonic() - started)
+                if response is not None:
+                    return response
+                await asyncio.sleep(POLL_INTERVAL)
+
+        try:
+            response = await self.get_response(request)
+        except BaseException:
+            await cache.adelete(scope.cache_key)
+            raise
+        entry = result_entry(scope, response)
+        if entry is None:
+            await cache.adelete(scope.cache_key)
+        else:
+            await cache.aset(scope.cache_key, entry, settings.IDEMPOTENCY_TTL)
+        return response
@@ -0,0 +1,104 @@
+"""
+Registro (logging) sin escrituras en el camino de la petición.
+
+- QueuedHandler: envuelve un handler normal (FileHandler, StreamHandler...).
+  El hilo que registra solo deja el LogRecord en una cola; un QueueListener
+  en segundo plano le da formato y lo escribe. Así los hilos de las
+  peticiones no se esperan unos a otros en el lock del fichero.
+- JsonFormatter: un objeto JSON por línea, con los campos pasados en extra.
+- SampleFilter: de los registros marcados con extra={'sampled': True}
+  (logs INFO de mucho volumen, como cada ronda creada) deja pasar uno de
+  cada settings.LOG_SAMPLE_EVERY por mensaje. Los avisos y errores nunca se
+  descartan.
+
+Los mensajes se escriben con argumentos ("Ronda creada: %s", round_id) y no
+con f-strings, así solo se formatean si el registro llega a escribirse.
+"""
+import itertools
+import json
+import logging
+import queue
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+# Atributos propios de LogRecord: el resto son los campos de extra
+RECORD_ATTRIBUTES = set(vars(logging.makeLogRecord({}))) | {'message', 'asctime', 'taskName', 'sampled'}
+
+
+class JsonFormatter(logging.Formatter):
+    """
+    Formatea cada registro como un objeto JSON en una línea
+    """
+    def format(self, record):
+        data = {
+            'time': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        data.update(
+            (key, value) for key, value in vars(record).items() if key not in RECORD_ATTRIBUTES
+        )
+        if record.exc_info:
+            data['exception'] = self.formatException(record.exc_info)
+        return json.dumps(data, default=str, ensure_ascii=False)
+
+
+class SampleFilter(logging.Filter):
+    """
+    Deja pasar uno de cada settings.LOG_SAMPLE_EVERY registros marcados
+    como muestreables, contando por separado cada mensaje
+    """
+    def __init__(self, name=''):
+        super().__init__(name)
+        self.counters = {}
+
+    def filter(self, record):
+        if not getattr(record, 'sampled', False) or record.levelno >= logging.WARNING:
+            return True
+        counter = self.counters.get(record.msg)
+        if counter is None:
+            counter = self.counters.setdefault(record.msg, itertools.count())
+        return next(counter) % settings.LOG_SAMPLE_EVERY == 0
+
+
+class QueuedHandler(QueueHandler):
+    """
+    Handler que encola los registros para que otro hilo los escriba con el
+    handler indicado
+
+    Args:
+        handler_class: Ruta de la clase del handler real, p. ej.
+            'logging.FileHandler'
+        **kwargs: Argumentos del handler real
+    """
+    def __init__(self, handler_class, **kwargs):
+        super().__init__(queue.SimpleQueue())
+        self.target = import_string(handler_class)(**kwargs)
+        self.listener = QueueListener(self.queue, self.target)
+        self.listener.start()
+
+    def setFormatter(self, fmt):
+        # El formato lo aplica el hilo de escritura
+        self.target.setFormatter(fmt)
+
+    def prepare(self, record):
+        """
+        Fija el mensaje (los argumentos podrían cambiar después) sin darle
+        formato; el traceback se formatea en el hilo de escritura
+        """
+        record = logging.makeLogRecord(vars(record))
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+    def close(self):
+        # logging.shutdown() lo llama al salir: se escriben los registros
+        # que queden en la cola antes de cerrar el handler real
+        if self.listener._thread is not None:
+            self.listener.stop()
+        self.target.close()
+        super().close()
@@ -0,0 +1,26 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from api.archive import ARCHIVE_AFTER_DAYS, BATCH_SIZE, archive_games
+
+
+class Command(BaseCommand):
+    help = (
+        "Mueve los juegos terminados hace más de --older-than días, con sus "
+        "rondas, a las tablas de archivo, por lotes"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--older-than', type=int, default=ARCHIVE_AFTER_DAYS, help="Días desde la última ronda del juego")
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE, help="Juegos movidos por transacción")
+        parser.add_argument('--dry-run', action='store_true', help="Mostrar cuántos juegos se moverían sin modificar nada")
+
+    def handle(self, *args, **options):
+        older_than = timezone.now() - timedelta(days=options['older_than'])
+        count = archive_games(older_than, batch_size=options['batch_size'], dry_run=options['dry_run'])
+        if options['dry_run']:
+            self.stdout.write(f"Se moverían {count} juegos terminados al archivo")
+            return
+        self.stdout.write(self.style.SUCCESS(f"{count} juegos terminados movidos al archivo"))
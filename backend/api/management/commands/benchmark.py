@@ -0,0 +1,128 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import setup_test_environment, teardown_test_environment
+
+from benchmarks.data import seed_data
+from benchmarks.matchmaking import run_matchmaking_benchmark
+from benchmarks.serialization import run_serialization_benchmark
+from benchmarks.suite import BASELINE_PATH, compare, load_baseline, run_suite, save_baseline
+
+
+class Command(BaseCommand):
+    help = (
+        "Ejecuta la suite de benchmarks de la API sobre una base de datos de "
+        "pruebas temporal y la compara con benchmarks/baseline.json"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--players', type=int, default=200)
+        parser.add_argument('--games', type=int, default=500)
+        parser.add_argument('--rounds', type=int, default=5, help="Rondas por juego generado")
+        parser.add_argument('--iterations', type=int, default=200, help="Peticiones por escenario")
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--baseline', default=str(BASELINE_PATH))
+        parser.add_argument('--save-baseline', action='store_true', help="Guardar los resultados como nueva referencia")
+        parser.add_argument('--check', action='store_true', help="Fallar si hay regresiones respecto a la referencia")
+        parser.add_argument('--tolerance', type=float, default=0.5, help="Margen de latencia p95 admitido (0.5 = 50 %%)")
+        parser.add_argument('--json', action='store_true', help="Imprimir los resultados en JSON")
+        parser.add_argument(
+            '--serialization', action='store_true',
+            help="Comparar solo la serialización del listado de juegos: DRF frente a api.fast_serializers"
+        )
+        parser.add_argument(
+            '--matchmaking', action='store_true',
+            help="Simular la cola de emparejamiento con los jugadores generados (ver --rate)"
+        )
+        parser.add_argument('--rate', type=int, default=2000, help="Jugadores que entran en la cola por segundo")
+
+    def handle(self, *args, **options):
+        # Base de datos de pruebas desechable: no toca los datos reales
+        setup_test_environment()
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+        try:
+            counts = seed_data(
+                players=options['players'],
+                games=options['games'],
+                rounds_per_game=options['rounds'],
+                seed=options['seed']
+            )
+            if options['serialization']:
+                results = run_serialization_benchmark(limit=options['games'])
+            elif options['matchmaking']:
+                results = run_matchmaking_benchmark(rate=options['rate'], seed=options['seed'])
+            else:
+                results = run_suite(iterations=options['iterations'], seed=options['seed'])
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+
+        if options['serialization']:
+            self.print_serialization(results)
+            return
+        if options['matchmaking']:
+            self.print_matchmaking(results)
+            return
+        if options['json']:
+            self.stdout.write(json.dumps(results, indent=2, sort_keys=True))
+        else:
+            self.print_table(results, counts)
+
+        if options['save_baseline']:
+            save_baseline(
+                results, options['baseline'],
+                vendor=connection.vendor, iterations=options['iterations'], **counts
+            )
+            self.stdout.write(self.style.SUCCESS(f"Referencia guardada en {options['baseline']}"))
+
+        if options['check']:
+            regressions = compare(results, load_baseline(options['baseline']), options['tolerance'])
+            if regressions:
+                raise CommandError("Regresiones de rendimiento:\n" + "\n".join(regressions))
+            self.stdout.write(self.style.SUCCESS("Sin regresiones respecto a la referencia"))
+
+    def print_table(self, results, counts):
+        self.stdout.write(
+            f"{connection.vendor}: {counts['players']} jugadores, "
+            f"{counts['games']} juegos, {counts['rounds']} rondas"
+        )
+        self.stdout.write(
+            f"{'escenario':<20}{'n':>6}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'consultas':>11}{'máx':>6}"
+        )
+        for name, summary in results.items():
+            self.stdout.write(
+                f"{name:<20}{summary['requests']:>6}{summary['p50_ms']:>10.2f}"
+                f"{summary['p95_ms']:>10.2f}{summary['p99_ms']:>10.2f}"
+                f"{summary['queries_mean']:>11.2f}{summary['queries_max']:>6}"
+            )
+
+    def print_serialization(self, results):
+        self.stdout.write(
+            f"{connection.vendor}: {results['games']} juegos, {results['bytes']} bytes, "
+            f"salida idéntica: {'sí' if results['identical'] else 'NO'}"
+        )
+        self.stdout.write(f"{'camino':<8}{'consulta ms':>13}{'serializar ms':>15}{'render ms':>11}{'total ms':>10}")
+        for name in ('drf', 'fast'):
+            phases = results[name]
+            self.stdout.write(
+                f"{name:<8}{phases['query_ms']:>13.2f}{phases['serialize_ms']:>15.2f}"
+                f"{phases['render_ms']:>11.2f}{phases['total_ms']:>10.2f}"
+            )
+        self.stdout.write(f"Aceleración: x{results['speedup']}")
+        if not results['identical']:
+            raise CommandError("La serialización rápida no coincide con la de DRF")
+
+    def print_matchmaking(self, results):
+        self.stdout.write(
+            f"{connection.vendor}: {results['players']} jugadores, {results['games']} juegos, "
+            f"{results['unmatched']} sin pareja, {results['seconds']} s"
+        )
+        self.stdout.write(
+            f"Entradas en la cola: {results['enqueue_per_second']}/s; "
+            f"{results['rounds']} rondas, p95 {results['round_p95_ms']:.2f} ms por ronda"
+        )
+        self.stdout.write(
+            f"Espera hasta el juego: p50 {results['wait_p50_ms']:.1f} ms, "
+            f"p95 {results['wait_p95_ms']:.1f} ms, máx {results['wait_max_ms']:.1f} ms"
+        )
@@ -0,0 +1,145 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Case, F, IntegerField, Q, Value, When
+
+from api.cache import invalidate_games
+from api.models import ArchivedGame, ArchivedRound, Game, Player, Round, normalize_handle
+from api.ratings import rebuild_ratings
+from api.stats import rebuild_stats
+
+
+class Command(BaseCommand):
+    help = (
+        "Fusiona los jugadores duplicados (mismo nombre normalizado) con el "
+        "jugador que conserva el handle, reasignando sus juegos y rondas"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500, help="Duplicados fusionados por transacción")
+        parser.add_argument('--dry-run', action='store_true', help="Mostrar qué se fusionaría sin modificar nada")
+
+    def handle(self, *args, **options):
+        merges, handles = self.find_duplicates()
+
+        # Un duplicado que ya jugó contra su jugador canónico dejaría un
+        # juego contra sí mismo: se deja sin fusionar para revisarlo a mano
+        conflicts = self.find_conflicts(merges)
+        for duplicate_id in conflicts:
+            self.stdout.write(self.style.WARNING(
+                f"Jugador {duplicate_id} no fusionado: tiene juegos contra el jugador {merges.pop(duplicate_id)}"
+            ))
+
+        if options['dry_run']:
+            self.stdout.write(f"Se fusionarían {len(merges)} jugadores duplicados")
+            return
+
+        with transaction.atomic():
+            # Primero los handles que faltan en los jugadores canónicos
+            Player.objects.bulk_update(
+                [Player(id=player_id, handle=handle) for player_id, handle in handles.items()],
+                ['handle'],
+                batch_size=options['batch_size']
+            )
+
+        items = sorted(merges.items())
+        for start in range(0, len(items), options['batch_size']):
+            # La caché de los juegos reasignados se borra tras confirmar el lote
+            invalidate_games(self.merge(dict(items[start:start + options['batch_size']])))
+
+        # Las estadísticas de los duplicados pasan a sus jugadores canónicos,
+        # y el rating de todos se recalcula: el de un canónico depende de
+        # los juegos de sus duplicados y de los rivales de esos juegos
+        if merges:
+            rebuild_stats(player_ids=sorted(set(merges.values())))
+            rebuild_ratings()
+
+        self.stdout.write(self.style.SUCCESS(f"{len(merges)} jugadores duplicados fusionados"))
+
+    def find_duplicates(self):
+        """
+        Agrupa a los jugadores por nombre normalizado
+
+        Returns:
+            tuple: (ID del duplicado -> ID del canónico,
+                    ID del canónico sin handle -> handle que debe recibir)
+        """
+        groups = {}
+        rows = Player.objects.order_by('id').values_list('id', 'name', 'handle')
+        for player_id, name, handle in rows.iterator(chunk_size=2000):
+            groups.setdefault(normalize_handle(name), []).append((player_id, handle))
+
+        merges = {}
+        handles = {}
+        for handle, members in groups.items():
+            # El canónico es quien ya tiene el handle o, si nadie lo tiene,
+            # el jugador más antiguo
+            canonical_id = next(
+                (player_id for player_id, current in members if current == handle),
+                members[0][0]
+            )
+            if not any(current == handle for _, current in members):
+                handles[canonical_id] = handle
+            for player_id, _ in members:
+                if player_id != canonical_id:
+                    merges[player_id] = canonical_id
+        return merges, handles
+
+    def find_conflicts(self, merges):
+        """
+        Duplicados que comparten algún juego, archivado o no, con su
+        jugador canónico
+        """
+        if not merges:
+            return []
+
+        conflicts = set()
+        for model in (Game, ArchivedGame):
+            seats = model.objects.filter(
+                Q(player1_id__in=merges) | Q(player2_id__in=merges)
+            ).values_list('player1_id', 'player2_id')
+            for player1_id, player2_id in seats.iterator(chunk_size=2000):
+                if merges.get(player1_id, player1_id) == merges.get(player2_id, player2_id):
+                    conflicts.add(player1_id if player1_id in merges else player2_id)
+        return sorted(conflicts)
+
+    @transaction.atomic
+    def merge(self, merges):
+        """
+        Reasigna las referencias de un lote de duplicados con un UPDATE por
+        tabla (CASE ... WHEN por columna) y borra los duplicados. Los juegos
+        reasignados suben de versión en el mismo UPDATE, así su ETag
+        deja de coincidir con el de los clientes.
+
+        Returns:
+            list: IDs de los juegos reasignados
+        """
+        def reassign(column):
+            return Case(
+                *[When(**{column: duplicate_id}, then=Value(canonical_id))
+                  for duplicate_id, canonical_id in merges.items()],
+                default=F(column),
+                output_field=IntegerField()
+            )
+
+        game_ids = list(Game.objects.filter(
+            Q(player1_id__in=merges) | Q(player2_id__in=merges) | Q(winner_id__in=merges)
+        ).values_list('id', flat=True))
+        Game.objects.filter(pk__in=game_ids).update(
+            player1_id=reassign('player1_id'),
+            player2_id=reassign('player2_id'),
+            winner_id=reassign('winner_id'),
+            version=F('version') + 1
+        )
+        Round.objects.filter(winner_id__in=merges).update(winner_id=reassign('winner_id'))
+
+        ArchivedGame.objects.filter(
+            Q(player1_id__in=merges) | Q(player2_id__in=merges) | Q(winner_id__in=merges)
+        ).update(
+            player1_id=reassign('player1_id'),
+            player2_id=reassign('player2_id'),
+            winner_id=reassign('winner_id')
+        )
+        ArchivedRound.objects.filter(winner_id__in=merges).update(winner_id=reassign('winner_id'))
+
+        Player.objects.filter(id__in=merges).delete()
+        return game_ids
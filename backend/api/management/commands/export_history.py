@@ -0,0 +1,48 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.exceptions import ValidationError
+
+from api.export import CHUNK_SIZE, EXPORTS, FORMATS, export_chunks
+from api.filters import parse_moment
+
+
+class Command(BaseCommand):
+    help = (
+        "Exporta el historial de juegos o rondas en NDJSON, CSV o formato "
+        "columnar, leyendo la tabla por bloques con un cursor del servidor"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('kind', choices=sorted(EXPORTS))
+        parser.add_argument('--format', dest='export_format', choices=sorted(FORMATS), default='ndjson')
+        parser.add_argument('--output', '-o', default='-', help="Fichero de salida ('-' para la salida estándar)")
+        parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE, help="Filas leídas y escritas por bloque")
+        parser.add_argument('--created-after', help="Fecha ISO 8601 (incluida)")
+        parser.add_argument('--created-before', help="Fecha ISO 8601 (los días sin hora se incluyen)")
+
+    def handle(self, *args, **options):
+        filters = {}
+        try:
+            if options['created_after']:
+                filters['created_after'] = parse_moment(options['created_after'], 'created_after')
+            if options['created_before']:
+                filters['created_before'] = parse_moment(options['created_before'], 'created_before', end_of_day=True)
+        except ValidationError as e:
+            raise CommandError(e.detail)
+
+        chunks = export_chunks(
+            options['kind'], options['export_format'], chunk_size=options['chunk_size'], **filters
+        )
+        binary = options['export_format'] == 'columnar'
+        if options['output'] != '-':
+            with open(options['output'], 'wb' if binary else 'w', newline=None if binary else '') as output:
+                for chunk in chunks:
+                    output.write(chunk)
+            self.stderr.write(self.style.SUCCESS(f"Exportación escrita en {options['output']}"))
+        elif binary:
+            for chunk in chunks:
+                sys.stdout.buffer.write(chunk)
+        else:
+            for chunk in chunks:
+                self.stdout.write(chunk, ending='')
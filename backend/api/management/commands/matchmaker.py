@@ -0,0 +1,25 @@
+import asyncio
+
+from django.core.management.base import BaseCommand
+
+from api.matchmaking import Scheduler, queue
+
+
+class Command(BaseCommand):
+    help = (
+        "Ejecuta el emparejador en un proceso propio, sobre la cola de "
+        "settings.MATCHMAKING_BACKEND. Con varios nodos web se usa con "
+        "RedisQueue y MATCHMAKING_SCHEDULER=0 en los nodos."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--interval', type=float, help="Segundos entre rondas (por defecto MATCHMAKING_INTERVAL)")
+        parser.add_argument('--batch-size', type=int, help="Tickets por lote (por defecto MATCHMAKING_BATCH_SIZE)")
+
+    def handle(self, *args, **options):
+        scheduler = Scheduler(queue, interval=options['interval'], batch_size=options['batch_size'])
+        self.stdout.write(f"Emparejador en marcha cada {scheduler.interval} s ({type(queue).__name__})")
+        try:
+            asyncio.run(scheduler.run())
+        except KeyboardInterrupt:
+            pass
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from api.ratings import CHUNK_SIZE, rebuild_ratings
+
+
+class Command(BaseCommand):
+    help = (
+        "Recalcula el rating Elo de todos los jugadores repitiendo el "
+        "historial de juegos terminados en orden, por bloques"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE, help="Juegos leídos por bloque")
+
+    def handle(self, *args, **options):
+        result = rebuild_ratings(chunk_size=options['chunk_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Ratings recalculados: {result['games']} juegos, {result['players']} jugadores actualizados"
+        ))
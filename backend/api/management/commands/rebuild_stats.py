@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from api.stats import BATCH_SIZE, rebuild_stats
+
+
+class Command(BaseCommand):
+    help = (
+        "Recalcula las estadísticas de los jugadores (PlayerStats) desde el "
+        "historial de juegos, por bloques"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=BATCH_SIZE, help="Juegos leídos por bloque")
+        parser.add_argument('--player', type=int, action='append', dest='players', help="Recalcular solo este jugador (repetible)")
+
+    def handle(self, *args, **options):
+        count = rebuild_stats(player_ids=options['players'], chunk_size=options['chunk_size'])
+        self.stdout.write(self.style.SUCCESS(f"Estadísticas recalculadas para {count} jugadores"))
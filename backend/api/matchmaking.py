@@ -0,0 +1,424 @@
+"""
+Cola de emparejamiento.
+
+Los jugadores entran en la cola con POST /api/matchmaking/ y consultan su
+estado con GET /api/matchmaking/{player_id}/. Un emparejador (Scheduler)
+corre como tarea asyncio en el proceso ASGI: cada settings.MATCHMAKING_INTERVAL
+segundos saca de la cola los tickets en espera por lotes, los ordena por
+rating y empareja vecinos cuya diferencia de rating cabe en una ventana que
+se ensancha con la espera. Los juegos de todo el lote se crean con un solo
+bulk_create. Tras MAX_WAIT segundos de espera se acepta cualquier rival,
+así la latencia de emparejamiento está acotada mientras haya alguien más en
+la cola. El rating de cada jugador es su Player.rating (ver api.ratings),
+redondeado.
+
+La cola es un backend intercambiable (settings.MATCHMAKING_BACKEND):
+
+- MemoryQueue: en la memoria del proceso. Para un solo proceso, tests y
+  desarrollo.
+- RedisQueue: en Redis (REDIS_URL), compartida por todos los nodos. Cada
+  ronda la hace un solo nodo, el que consigue el lock; el resto se la salta.
+  También puede emparejar un proceso aparte con `manage.py matchmaker` y
+  MATCHMAKING_SCHEDULER=0 en los nodos web.
+"""
+import asyncio
+import logging
+import os
+import time
+from collections import OrderedDict
+from itertools import islice
+from operator import attrgetter
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import transaction
+from django.utils.module_loading import import_string
+
+from .models import Game, Player
+
+logger = logging.getLogger(__name__)
+
+# Diferencia de rating admitida sin espera y lo que crece por segundo de
+# espera del ticket que más lleva en la cola
+RATING_WINDOW = 100
+WINDOW_GROWTH = 50
+
+# Segundos de espera a partir de los que se acepta cualquier rival
+MAX_WAIT = 30
+
+# Segundos que se guarda el juego asignado a un jugador emparejado
+MATCH_TTL = 300
+
+
+class Ticket:
+    """
+    Un jugador en la cola: su rating y cuándo entró (segundos epoch, para
+    poder compararlo entre nodos)
+    """
+    __slots__ = ('player_id', 'rating', 'enqueued_at')
+
+    def __init__(self, player_id, rating, enqueued_at):
+        self.player_id = player_id
+        self.rating = rating
+        self.enqueued_at = enqueued_at
+
+    def __repr__(self):
+        return f'Ticket({self.player_id}, {self.rating}, {self.enqueued_at})'
+
+
+def window(wait):
+    """
+    Diferencia de rating admitida tras wait segundos de espera
+    """
+    if wait >= MAX_WAIT:
+        return float('inf')
+    return RATING_WINDOW + WINDOW_GROWTH * wait
+
+
+def pair_tickets(tickets, now):
+    """
+    Empareja tickets vecinos por rating: recorre el lote ordenado y junta
+    cada ticket con el siguiente si la diferencia cabe en la ventana del que
+    más espera de los dos. O(n log n) por lote.
+
+    Returns:
+        tuple: (pares (ticket del jugador 1, ticket del jugador 2), tickets
+        sin pareja en orden de llegada). El jugador 1 es el que más esperaba.
+    """
+    ordered = sorted(tickets, key=attrgetter('rating'))
+    pairs = []
+    unpaired = []
+    index = 0
+    while index < len(ordered):
+        ticket = ordered[index]
+        if index + 1 < len(ordered):
+            other = ordered[index + 1]
+            first, second = sorted((ticket, other), key=attrgetter('enqueued_at'))
+            if other.rating - ticket.rating <= window(now - first.enqueued_at):
+                pairs.append((first, second))
+                index += 2
+                continue
+        unpaired.append(ticket)
+        index += 1
+    unpaired.sort(key=attrgetter('enqueued_at'))
+    return pairs, unpaired
+
+
+@transaction.atomic
+def create_matches(pairs):
+    """
+    Crea un juego por par con un solo bulk_create
+
+    Returns:
+        dict: ID del juego asignado a cada jugador
+    """
+    games = Game.objects.bulk_create(
+        [Game(player1_id=first.player_id, player2_id=second.player_id) for first, second in pairs],
+        batch_size=settings.MATCHMAKING_BATCH_SIZE
+    )
+    matches = {}
+    for game, (first, second) in zip(games, pairs):
+        matches[first.player_id] = matches[second.player_id] = game.pk
+    return matches
+
+
+class MemoryQueue:
+    """
+    Cola en la memoria del proceso. Solo se usa desde el bucle de eventos,
+    así no necesita locks.
+    """
+    def __init__(self):
+        # En espera, en orden de llegada
+        self.waiting = OrderedDict()
+        # Todos los tickets sin juego, también los del lote que se está
+        # emparejando
+        self.tickets = {}
+        # Jugador -> (ID del juego, caducidad), en orden de caducidad
+        self.matches = OrderedDict()
+
+    async def add(self, ticket):
+        """
+        Returns:
+            bool: False si el jugador ya estaba en la cola
+        """
+        if ticket.player_id in self.tickets:
+            return False
+        self.matches.pop(ticket.player_id, None)
+        self.tickets[ticket.player_id] = self.waiting[ticket.player_id] = ticket
+        return True
+
+    async def remove(self, player_id):
+        """
+        Saca de la cola a un jugador en espera
+
+        Returns:
+            bool: False si no estaba esperando (o su lote ya se está
+            emparejando)
+        """
+        if self.waiting.pop(player_id, None) is None:
+            return False
+        del self.tickets[player_id]
+        return True
+
+    async def lookup(self, player_id):
+        """
+        Returns:
+            tuple: (ticket en la cola o None, ID del juego asignado o None)
+        """
+        match = self.matches.get(player_id)
+        if match is not None and match[1] > time.time():
+            return None, match[0]
+        return self.tickets.get(player_id), None
+
+    async def take(self, limit):
+        """
+        Saca de la espera los limit tickets más antiguos para emparejarlos
+        """
+        batch = list(islice(self.waiting.values(), limit))
+        for ticket in batch:
+            del self.waiting[ticket.player_id]
+        return batch
+
+    async def put_back(self, tickets):
+        """
+        Devuelve a la espera los tickets sin pareja, por delante de los que
+        llegaron después
+        """
+        waiting = OrderedDict((ticket.player_id, ticket) for ticket in tickets)
+        waiting.update(self.waiting)
+        self.waiting = waiting
+
+    async def record_matches(self, matches):
+        now = time.time()
+        while self.matches and next(iter(self.matches.values()))[1] <= now:
+            self.matches.popitem(last=False)
+        for player_id, game_id in matches.items():
+            self.tickets.pop(player_id, None)
+            self.matches.pop(player_id, None)
+            self.matches[player_id] = (game_id, now + MATCH_TTL)
+
+    async def claim(self, seconds):
+        # Un solo proceso: la ronda siempre es suya
+        return True
+
+    async def clear(self):
+        self.waiting.clear()
+        self.tickets.clear()
+        self.matches.clear()
+
+
+class RedisQueue:
+    """
+    Cola compartida en Redis:
+
+    - {prefix}:waiting: sorted set de jugadores en espera por hora de llegada
+    - {prefix}:tickets: hash jugador -> "rating:llegada" de todos los tickets
+      sin juego
+    - {prefix}:match:{jugador}: juego asignado, con caducidad MATCH_TTL
+    - {prefix}:lock: lock de la ronda de emparejamiento
+    """
+    # Saca los más antiguos de la espera y devuelve sus datos
+    TAKE_SCRIPT = """
+    local ids = redis.call('ZRANGE', KEYS[1], 0, tonumber(ARGV[1]) - 1)
+    if #ids == 0 then return {} end
+    redis.call('ZREM', KEYS[1], unpack(ids))
+    local data = redis.call('HMGET', KEYS[2], unpack(ids))
+    local result = {}
+    for i, id in ipairs(ids) do
+        result[#result + 1] = id
+        result[#result + 1] = data[i]
+    end
+    return result
+    """
+    # Solo se cancela un ticket que sigue en espera
+    REMOVE_SCRIPT = """
+    if redis.call('ZREM', KEYS[1], ARGV[1]) == 1 then
+        redis.call('HDEL', KEYS[2], ARGV[1])
+        return 1
+    end
+    return 0
+    """
+
+    def __init__(self, url=None, prefix='matchmaking'):
+        import redis.asyncio as redis
+
+        self.redis = redis.Redis.from_url(url or os.environ['REDIS_URL'])
+        self.waiting_key = f'{prefix}:waiting'
+        self.tickets_key = f'{prefix}:tickets'
+        self.match_prefix = f'{prefix}:match:'
+        self.lock_key = f'{prefix}:lock'
+        self.take_script = self.redis.register_script(self.TAKE_SCRIPT)
+        self.remove_script = self.redis.register_script(self.REMOVE_SCRIPT)
+
+    @staticmethod
+    def parse(player_id, data):
+        rating, enqueued_at = data.decode().split(':')
+        return Ticket(int(player_id), int(rating), float(enqueued_at))
+
+    async def add(self, ticket):
+        added = await self.redis.hsetnx(
+            self.tickets_key, ticket.player_id, f'{ticket.rating}:{ticket.enqueued_at}'
+        )
+        if not added:
+            return False
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.delete(f'{self.match_prefix}{ticket.player_id}')
+            pipe.zadd(self.waiting_key, {ticket.player_id: ticket.enqueued_at})
+            await pipe.execute()
+        return True
+
+    async def remove(self, player_id):
+        return bool(await self.remove_script(keys=[self.waiting_key, self.tickets_key], args=[player_id]))
+
+    async def lookup(self, player_id):
+        async with self.redis.pipeline(transaction=False) as pipe:
+            pipe.get(f'{self.match_prefix}{player_id}')
+            pipe.hget(self.tickets_key, player_id)
+            game_id, data = await pipe.execute()
+        if game_id is not None:
+            return None, int(game_id)
+        return (self.parse(player_id, data) if data is not None else None), None
+
+    async def take(self, limit):
+        flat = await self.take_script(keys=[self.waiting_key, self.tickets_key], args=[limit])
+        return [
+            self.parse(player_id, data)
+            for player_id, data in zip(flat[::2], flat[1::2])
+            if data is not None
+        ]
+
+    async def put_back(self, tickets):
+        if tickets:
+            await self.redis.zadd(self.waiting_key, {ticket.player_id: ticket.enqueued_at for ticket in tickets})
+
+    async def record_matches(self, matches):
+        if not matches:
+            return
+        async with self.redis.pipeline(transaction=False) as pipe:
+            for player_id, game_id in matches.items():
+                pipe.set(f'{self.match_prefix}{player_id}', game_id, ex=MATCH_TTL)
+            pipe.hdel(self.tickets_key, *matches)
+            await pipe.execute()
+
+    async def claim(self, seconds):
+        return bool(await self.redis.set(self.lock_key, 1, nx=True, px=max(1, int(seconds * 1000))))
+
+    async def clear(self):
+        keys = [key async for key in self.redis.scan_iter(match=f'{self.match_prefix}*')]
+        await self.redis.delete(self.waiting_key, self.tickets_key, self.lock_key, *keys)
+
+
+class Scheduler:
+    """
+    Emparejador: cada interval segundos hace una ronda sobre la cola
+    """
+    def __init__(self, queue, interval=None, batch_size=None):
+        self.queue = queue
+        self.interval = interval if interval is not None else settings.MATCHMAKING_INTERVAL
+        self.batch_size = batch_size or settings.MATCHMAKING_BATCH_SIZE
+        self.task = None
+
+    async def run_once(self, now=None):
+        """
+        Una ronda: empareja la cola entera por lotes de batch_size y crea
+        los juegos de cada lote con un bulk_create. Los tickets sin pareja
+        vuelven a la espera al final de la ronda.
+
+        Returns:
+            dict: ID del juego asignado a cada jugador emparejado
+        """
+        if not await self.queue.claim(self.interval):
+            return {}
+        matches = {}
+        leftovers = []
+        try:
+            while True:
+                batch = await self.queue.take(self.batch_size)
+                if not batch:
+                    break
+                pairs, unpaired = pair_tickets(batch, now if now is not None else time.time())
+                leftovers += unpaired
+                if pairs:
+                    created = await sync_to_async(create_matches)(pairs)
+                    await self.queue.record_matches(created)
+                    matches.update(created)
+                if len(batch) < self.batch_size:
+                    break
+        finally:
+            # También si falla la base de datos: nadie se queda fuera de la
+            # cola sin juego
+            await self.queue.put_back(sorted(leftovers, key=attrgetter('enqueued_at')))
+        if matches:
+            logger.info(
+                "%s juegos creados por el emparejador, %s jugadores siguen esperando",
+                len(matches) // 2, len(leftovers),
+                extra={'games': len(matches) // 2, 'waiting': len(leftovers), 'sampled': True}
+            )
+        return matches
+
+    async def run(self):
+        while True:
+            started = time.monotonic()
+            try:
+                await self.run_once()
+            except Exception:
+                logger.exception("Error en la ronda de emparejamiento")
+            await asyncio.sleep(max(0.0, self.interval - (time.monotonic() - started)))
+
+    def ensure_running(self):
+        """
+        Arranca la tarea del emparejador en el bucle de eventos actual si
+        no está corriendo (se llama al entrar un jugador en la cola)
+        """
+        loop = asyncio.get_running_loop()
+        if self.task is None or self.task.done() or self.task.get_loop() is not loop:
+            self.task = loop.create_task(self.run())
+
+
+queue = import_string(settings.MATCHMAKING_BACKEND)()
+scheduler = Scheduler(queue)
+
+
+async def player_rating(player_id):
+    """
+    Returns:
+        int | None: Rating de un jugador humano, o None si no existe
+    """
+    rating = await Player.objects.filter(pk=player_id, is_bot=False).values_list('rating', flat=True).afirst()
+    return round(rating) if rating is not None else None
+
+
+async def enqueue(player_id):
+    """
+    Mete a un jugador en la cola y arranca el emparejador si hace falta
+
+    Returns:
+        bool | None: False si ya estaba en la cola, None si no existe
+    """
+    rating = await player_rating(player_id)
+    if rating is None:
+        return None
+    added = await queue.add(Ticket(player_id, rating, time.time()))
+    if settings.MATCHMAKING_SCHEDULER:
+        scheduler.ensure_running()
+    return added
+
+
+async def ticket_status(player_id):
+    """
+    Returns:
+        dict | None: Estado del jugador en la cola ('waiting', con su rating
+        y los segundos que lleva esperando, o 'matched', con el juego), o
+        None si no está en la cola
+    """
+    ticket, game_id = await queue.lookup(player_id)
+    if game_id is not None:
+        return {'status': 'matched', 'player_id': player_id, 'game_id': game_id}
+    if ticket is None:
+        return None
+    return {
+        'status': 'waiting',
+        'player_id': player_id,
+        'rating': ticket.rating,
+        'waited': round(max(0.0, time.time() - ticket.enqueued_at), 3),
+    }
@@ -0,0 +1,267 @@
+"""
+Métricas de rendimiento por petición.
+
+MetricsMiddleware mide cada petición: duración total, número y tiempo de las
+consultas SQL y tiempo de serialización. Los datos de la petición en curso
+viven en una ContextVar, así también se cuentan las consultas que las vistas
+asíncronas ejecutan con sync_to_async.
+
+- Cada respuesta lleva una cabecera Server-Timing (visible en las
+  herramientas de desarrollo del navegador).
+- GET /metrics expone los acumulados por endpoint en formato de texto de
+  Prometheus. Los contadores son del proceso: con varios procesos, cada uno
+  se consulta por separado.
+- Las peticiones que superan settings.SLOW_REQUEST_MS se registran como
+  aviso en el log.
+"""
+import bisect
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.http import HttpResponse
+
+logger = logging.getLogger(__name__)
+
+# Límites superiores (segundos) de los buckets del histograma de duración
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Endpoint de las peticiones que no corresponden a ninguna URL
+UNMATCHED = '<unmatched>'
+
+
+class RequestTimings:
+    """
+    Tiempos acumulados de una petición
+    """
+    __slots__ = ('queries', 'db_time', 'phases', 'open_phases')
+
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0.0
+        # Segundos por fase medida con timing(), p. ej. 'serialize'
+        self.phases = {}
+        # Fases en curso, para no contar dos veces las anidadas
+        self.open_phases = set()
+
+
+current = ContextVar('request_timings', default=None)
+
+
+def record_query(execute, sql, params, many, context):
+    """
+    Envoltorio de ejecución de consultas (connection.execute_wrapper) que
+    suma la consulta a la petición en curso
+    """
+    timings = current.get()
+    if timings is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        timings.queries += 1
+        timings.db_time += time.perf_counter() - start
+
+
+def install_query_recorder(sender, connection, **kwargs):
+    """
+    Receptor de connection_created: añade record_query a la conexión una
+    sola vez, aunque se reconecte
+    """
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+@contextmanager
+def timing(phase):
+    """
+    Suma al tiempo de phase de la petición en curso lo que tarda el bloque.
+    Los bloques de la misma fase anidados dentro de otro no se suman.
+    """
+    timings = current.get()
+    if timings is None or phase in timings.open_phases:
+        yield
+        return
+    timings.open_phases.add(phase)
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings.open_phases.discard(phase)
+        timings.phases[phase] = timings.phases.get(phase, 0.0) + time.perf_counter() - start
+
+
+class EndpointStats:
+    __slots__ = ('requests', 'errors', 'slow', 'buckets', 'duration', 'queries', 'db_time', 'phases')
+
+    def __init__(self):
+        self.requests = 0
+        self.errors = 0
+        self.slow = 0
+        self.buckets = [0] * (len(BUCKETS) + 1)
+        self.duration = 0.0
+        self.queries = 0
+        self.db_time = 0.0
+        self.phases = {}
+
+
+class Registry:
+    """
+    Acumulados por (método, endpoint) del proceso, seguros entre hilos
+    """
+    def __init__(self):
+        self.endpoints = {}
+        self.lock = threading.Lock()
+
+    def observe(self, method, endpoint, status_code, duration, timings, slow):
+        with self.lock:
+            stats = self.endpoints.get((method, endpoint))
+            if stats is None:
+                stats = self.endpoints[method, endpoint] = EndpointStats()
+            stats.requests += 1
+            stats.errors += status_code >= 500
+            stats.slow += slow
+            stats.buckets[bisect.bisect_left(BUCKETS, duration)] += 1
+            stats.duration += duration
+            stats.queries += timings.queries
+            stats.db_time += timings.db_time
+            for phase, seconds in timings.phases.items():
+                stats.phases[phase] = stats.phases.get(phase, 0.0) + seconds
+
+    def clear(self):
+        with self.lock:
+            self.endpoints.clear()
+
+    def render(self):
+        """
+        Returns:
+            str: Los acumulados en formato de texto de Prometheus
+        """
+        lines = []
+        with self.lock:
+            endpoints = sorted(self.endpoints.items())
+            for name, help_text, value in COUNTERS:
+                lines += [f'# HELP {name} {help_text}', f'# TYPE {name} counter']
+                for (method, endpoint), stats in endpoints:
+                    lines.append(f'{name}{labels(method, endpoint)} {value(stats)}')
+
+            name = 'api_http_request_duration_seconds'
+            lines += [f'# HELP {name} Duración de las peticiones', f'# TYPE {name} histogram']
+            for (method, endpoint), stats in endpoints:
+                cumulative = 0
+                for bound, count in zip(BUCKETS + ('+Inf',), stats.buckets):
+                    cumulative += count
+                    lines.append(f'{name}_bucket{labels(method, endpoint, le=bound)} {cumulative}')
+                lines.append(f'{name}_sum{labels(method, endpoint)} {stats.duration:.6f}')
+                lines.append(f'{name}_count{labels(method, endpoint)} {stats.requests}')
+
+            name = 'api_phase_seconds_total'
+            lines += [f'# HELP {name} Tiempo por fase de la petición (p. ej. serialize)', f'# TYPE {name} counter']
+            for (method, endpoint), stats in endpoints:
+                for phase, seconds in sorted(stats.phases.items()):
+                    lines.append(f'{name}{labels(method, endpoint, phase=phase)} {seconds:.6f}')
+        return '\n'.join(lines) + '\n'
+
+
+# Contadores por endpoint: (nombre, descripción, valor)
+COUNTERS = [
+    ('api_http_requests_total', 'Peticiones atendidas', lambda stats: stats.requests),
+    ('api_http_server_errors_total', 'Peticiones respondidas con un error 5xx', lambda stats: stats.errors),
+    ('api_http_slow_requests_total', 'Peticiones que superaron SLOW_REQUEST_MS', lambda stats: stats.slow),
+    ('api_db_queries_total', 'Consultas SQL ejecutadas por las peticiones', lambda stats: stats.queries),
+    ('api_db_seconds_total', 'Tiempo en consultas SQL', lambda stats: f'{stats.db_time:.6f}'),
+]
+
+
+def labels(method, endpoint, **extra):
+    values = {'method': method, 'endpoint': endpoint, **extra}
+    escaped = (
+        (name, str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n'))
+        for name, value in values.items()
+    )
+    return '{' + ','.join(f'{name}="{value}"' for name, value in escaped) + '}'
+
+
+registry = Registry()
+
+
+def server_timing(duration, timings):
+    """
+    Valor de la cabecera Server-Timing (duraciones en milisegundos)
+    """
+    entries = [
+        f'db;dur={timings.db_time * 1000:.1f};desc="{timings.queries} consultas"',
+        *(f'{phase};dur={seconds * 1000:.1f}' for phase, seconds in sorted(timings.phases.items())),
+        f'total;dur={duration * 1000:.1f}',
+    ]
+    return ', '.join(entries)
+
+
+class MetricsMiddleware:
+    """
+    Mide cada petición y publica el resultado en Server-Timing, en el
+    registro de /metrics y, si es lenta, en el log. Debe ir la primera en
+    MIDDLEWARE para medir también al resto de middlewares. En las respuestas
+    en streaming se mide hasta que empieza el envío.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        timings = RequestTimings()
+        token = current.set(timings)
+        start = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            current.reset(token)
+        return self.finish(request, response, time.perf_counter() - start, timings)
+
+    async def __acall__(self, request):
+        timings = RequestTimings()
+        token = current.set(timings)
+        start = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            current.reset(token)
+        return self.finish(request, response, time.perf_counter() - start, timings)
+
+    def finish(self, request, response, duration, timings):
+        match = request.resolver_match
+        endpoint = match.view_name if match else UNMATCHED
+        slow = duration * 1000 >= settings.SLOW_REQUEST_MS
+        registry.observe(request.method, endpoint, response.status_code, duration, timings, slow)
+        response['Server-Timing'] = server_timing(duration, timings)
+        if slow:
+            duration_ms = round(duration * 1000)
+            db_ms = round(timings.db_time * 1000)
+            logger.warning(
+                "Petición lenta: %s %s (%s) %s ms, %s consultas en %s ms, estado %s",
+                request.method, request.path, endpoint, duration_ms, timings.queries, db_ms, response.status_code,
+                extra={
+                    'endpoint': endpoint, 'duration_ms': duration_ms, 'queries': timings.queries,
+                    'db_ms': db_ms, 'status': response.status_code,
+                }
+            )
+        return response
+
+
+def metrics_view(request):
+    """
+    Endpoint de métricas: GET /metrics, en formato de texto de Prometheus
+    """
+    return HttpResponse(registry.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -0,0 +1,32 @@
+from django.db import migrations
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def backfill_current_round(apps, schema_editor):
+    """
+    Apunta cada juego a su última ronda y guarda cuántas rondas tiene, con un
+    único UPDATE basado en subconsultas
+    """
+    Game = apps.get_model('api', 'Game')
+    Round = apps.get_model('api', 'Round')
+
+    rounds = Round.objects.filter(game=OuterRef('pk'))
+    latest_round = rounds.order_by('-created_at', '-id').values('id')[:1]
+    round_count = rounds.order_by().values('game').annotate(total=Count('id')).values('total')
+
+    Game.objects.update(
+        current_round=Subquery(latest_round),
+        round_count=Coalesce(Subquery(round_count), 0),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0003_current_round'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_current_round, migrations.RunPython.noop),
+    ]
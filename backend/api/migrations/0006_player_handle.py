@@ -0,0 +1,78 @@
+import unicodedata
+
+from django.db import migrations, models
+
+
+def normalize_handle(name):
+    # Copia de api.models.normalize_handle en el momento de la migración
+    return ' '.join(unicodedata.normalize('NFKC', name).split()).casefold()[:100]
+
+
+def backfill_handles(apps, schema_editor):
+    """
+    Asigna el handle al jugador más antiguo de cada nombre normalizado. Los
+    duplicados quedan con handle nulo hasta que `manage.py dedupe_players`
+    los fusiona con él.
+    """
+    Player = apps.get_model('api', 'Player')
+
+    seen = set()
+    batch = []
+    for player_id, name in Player.objects.order_by('id').values_list('id', 'name').iterator(chunk_size=2000):
+        handle = normalize_handle(name)
+        if handle in seen:
+            continue
+        seen.add(handle)
+        batch.append(Player(id=player_id, handle=handle))
+        if len(batch) >= 1000:
+            Player.objects.bulk_update(batch, ['handle'])
+            batch = []
+    Player.objects.bulk_update(batch, ['handle'])
+
+
+def create_trigram_index(apps, schema_editor):
+    """
+    Índice de trigramas para las búsquedas por nombre del admin
+    (name__icontains, que PostgreSQL ejecuta como UPPER(name) LIKE ...).
+    Solo existe en PostgreSQL y requiere la extensión pg_trgm; si el
+    servidor no la incluye, la migración sigue sin el índice.
+    """
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute("SELECT 1 FROM pg_available_extensions WHERE name = 'pg_trgm'")
+        if cursor.fetchone() is None:
+            return
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    schema_editor.execute(
+        'CREATE INDEX IF NOT EXISTS player_name_trgm_idx '
+        'ON api_player USING gin (UPPER(name) gin_trgm_ops)'
+    )
+
+
+def drop_trigram_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('DROP INDEX IF EXISTS player_name_trgm_idx')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0005_game_version'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='player',
+            name='handle',
+            field=models.CharField(blank=True, max_length=100, null=True),
+        ),
+        migrations.RunPython(backfill_handles, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='player',
+            name='handle',
+            field=models.CharField(blank=True, max_length=100, null=True, unique=True),
+        ),
+        migrations.RunPython(create_trigram_index, drop_trigram_index),
+    ]
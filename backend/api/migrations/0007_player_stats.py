@@ -0,0 +1,34 @@
+# Generated by Django 4.2.30 on 2026-10-18 14:32
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0006_player_handle'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PlayerStats',
+            fields=[
+                ('player', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to='api.player')),
+                ('games_played', models.PositiveIntegerField(default=0)),
+                ('wins', models.PositiveIntegerField(default=0)),
+                ('losses', models.PositiveIntegerField(default=0)),
+                ('rounds_played', models.PositiveIntegerField(default=0)),
+                ('round_wins', models.PositiveIntegerField(default=0)),
+                ('rock_count', models.PositiveIntegerField(default=0)),
+                ('paper_count', models.PositiveIntegerField(default=0)),
+                ('scissors_count', models.PositiveIntegerField(default=0)),
+                ('current_streak', models.PositiveIntegerField(default=0)),
+                ('best_streak', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['-wins', '-round_wins', 'player'], name='stats_leaderboard_idx')],
+            },
+        ),
+    ]
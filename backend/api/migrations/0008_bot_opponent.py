@@ -0,0 +1,23 @@
+# Generated by Django 4.2.30 on 2026-10-18 14:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0007_player_stats'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='game',
+            name='bot_strategy',
+            field=models.CharField(blank=True, default='', max_length=20),
+        ),
+        migrations.AddField(
+            model_name='player',
+            name='is_bot',
+            field=models.BooleanField(default=False),
+        ),
+    ]
@@ -0,0 +1,41 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0008_bot_opponent'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='game',
+            name='rule_set',
+            field=models.CharField(choices=[('classic', 'Piedra, papel o tijera'), ('rpsls', 'Piedra, papel, tijera, lagarto o Spock')], default='classic', max_length=20),
+        ),
+        migrations.AddField(
+            model_name='playerstats',
+            name='lizard_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='playerstats',
+            name='spock_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        # Los movimientos pasan de CharField(max_length=10) a un entero
+        # pequeño: columnas nuevas aquí, copia de los datos en 0010 y
+        # renombrado en 0011. Van en migraciones separadas porque PostgreSQL
+        # no permite alterar una tabla con eventos de trigger pendientes en la
+        # misma transacción que la actualiza.
+        migrations.AddField(
+            model_name='round',
+            name='player1_move_code',
+            field=models.SmallIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='round',
+            name='player2_move_code',
+            field=models.SmallIntegerField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,46 @@
+from django.db import migrations
+from django.db.models import Case, CharField, IntegerField, Value, When
+
+# Copia de api.rules.MOVE_CODES en el momento de la migración
+MOVE_CODES = {
+    'ROCK': 1,
+    'PAPER': 2,
+    'SCISSORS': 3,
+}
+
+
+def encode_moves(apps, schema_editor):
+    """
+    Copia los movimientos de texto a las columnas nuevas con un UPDATE por
+    columna, sin cargar las rondas en memoria
+    """
+    Round = apps.get_model('api', 'Round')
+    for field in ('player1_move', 'player2_move'):
+        Round.objects.exclude(**{field: None}).update(**{
+            f'{field}_code': Case(
+                *[When(**{field: move}, then=Value(code)) for move, code in MOVE_CODES.items()],
+                output_field=IntegerField()
+            )
+        })
+
+
+def decode_moves(apps, schema_editor):
+    Round = apps.get_model('api', 'Round')
+    for field in ('player1_move', 'player2_move'):
+        Round.objects.exclude(**{f'{field}_code': None}).update(**{
+            field: Case(
+                *[When(**{f'{field}_code': code}, then=Value(move)) for move, code in MOVE_CODES.items()],
+                output_field=CharField()
+            )
+        })
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0009_compact_moves'),
+    ]
+
+    operations = [
+        migrations.RunPython(encode_moves, decode_moves),
+    ]
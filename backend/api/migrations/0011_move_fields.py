@@ -0,0 +1,40 @@
+import api.models
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0010_encode_moves'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='round',
+            name='player1_move',
+        ),
+        migrations.RemoveField(
+            model_name='round',
+            name='player2_move',
+        ),
+        migrations.RenameField(
+            model_name='round',
+            old_name='player1_move_code',
+            new_name='player1_move',
+        ),
+        migrations.RenameField(
+            model_name='round',
+            old_name='player2_move_code',
+            new_name='player2_move',
+        ),
+        migrations.AlterField(
+            model_name='round',
+            name='player1_move',
+            field=api.models.MoveField(blank=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name='round',
+            name='player2_move',
+            field=api.models.MoveField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,80 @@
+# Generated by Django 4.2.30 on 2026-10-18 14:44
+
+import api.models
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0011_move_fields'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedGame',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('player1_score', models.IntegerField(default=0)),
+                ('player2_score', models.IntegerField(default=0)),
+                ('created_at', models.DateTimeField()),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('archived_at', models.DateTimeField(auto_now_add=True)),
+                ('round_count', models.PositiveIntegerField(default=0)),
+                ('version', models.PositiveIntegerField(default=1)),
+                ('bot_strategy', models.CharField(blank=True, default='', max_length=20)),
+                ('rule_set', models.CharField(default='classic', max_length=20)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ArchivedRound',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('player1_move', api.models.MoveField(blank=True, null=True)),
+                ('player2_move', api.models.MoveField(blank=True, null=True)),
+                ('created_at', models.DateTimeField()),
+            ],
+        ),
+        migrations.RemoveIndex(
+            model_name='game',
+            name='game_active_created_idx',
+        ),
+        migrations.AddIndex(
+            model_name='game',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['created_at', 'id'], name='game_active_partial_idx'),
+        ),
+        migrations.AddField(
+            model_name='archivedround',
+            name='game',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='rounds', to='api.archivedgame'),
+        ),
+        migrations.AddField(
+            model_name='archivedround',
+            name='winner',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='api.player'),
+        ),
+        migrations.AddField(
+            model_name='archivedgame',
+            name='player1',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='api.player'),
+        ),
+        migrations.AddField(
+            model_name='archivedgame',
+            name='player2',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='api.player'),
+        ),
+        migrations.AddField(
+            model_name='archivedgame',
+            name='winner',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='api.player'),
+        ),
+        migrations.AddIndex(
+            model_name='archivedround',
+            index=models.Index(fields=['game', 'created_at'], name='archived_round_game_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='archivedgame',
+            index=models.Index(fields=['finished_at', 'id'], name='archived_game_finished_idx'),
+        ),
+    ]
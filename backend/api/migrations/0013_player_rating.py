@@ -0,0 +1,22 @@
+# Generated by Django 4.2.30 on 2026-10-18 15:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0012_archive'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='player',
+            name='rating',
+            field=models.FloatField(default=1000.0),
+        ),
+        migrations.AddIndex(
+            model_name='player',
+            index=models.Index(fields=['-rating', 'id'], name='player_rating_idx'),
+        ),
+    ]
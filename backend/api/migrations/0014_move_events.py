@@ -0,0 +1,49 @@
+# Generated by Django 4.2.30 on 2026-10-18 15:26
+
+import api.models
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0013_player_rating'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GameSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('game_id', models.BigIntegerField()),
+                ('seq', models.PositiveIntegerField()),
+                ('state', models.JSONField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='MoveEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('game_id', models.BigIntegerField()),
+                ('seq', models.PositiveIntegerField()),
+                ('seat', models.PositiveSmallIntegerField()),
+                ('move', api.models.MoveField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='game',
+            name='move_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddConstraint(
+            model_name='moveevent',
+            constraint=models.UniqueConstraint(fields=('game_id', 'seq'), name='move_event_game_seq_uniq'),
+        ),
+        migrations.AddConstraint(
+            model_name='gamesnapshot',
+            constraint=models.UniqueConstraint(fields=('game_id', 'seq'), name='game_snapshot_game_seq_uniq'),
+        ),
+    ]
@@ -0,0 +1,92 @@
+from django.db import migrations
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+# Filas por INSERT y leídas del cursor por bloque
+BATCH_SIZE = 1000
+
+# Copia de los asientos de api.models.MoveEvent
+CLOSED, PLAYER1, PLAYER2 = 0, 1, 2
+
+
+def game_events(game_id, rounds, closed, MoveEvent):
+    """
+    Eventos de un juego a partir de sus rondas, en orden: el movimiento del
+    jugador 1 y el del jugador 2 de cada ronda y, si el juego se cerró con
+    un reinicio, el cierre
+    """
+    events = []
+    for player1_move, player2_move, created_at in rounds:
+        for seat, move in ((PLAYER1, player1_move), (PLAYER2, player2_move)):
+            if move is not None:
+                events.append(MoveEvent(
+                    game_id=game_id, seq=len(events) + 1, seat=seat, move=move, created_at=created_at
+                ))
+    if game_id in closed:
+        # Sin el momento del reinicio, el del último movimiento o el de la
+        # creación del juego
+        created_at = events[-1].created_at if events else closed[game_id]
+        events.append(MoveEvent(game_id=game_id, seq=len(events) + 1, seat=CLOSED, created_at=created_at))
+    return events
+
+
+def backfill_move_events(apps, schema_editor):
+    """
+    Genera el registro de eventos de los juegos existentes, en curso y
+    archivados, a partir de sus rondas, y guarda en cada juego cuántos tiene
+    """
+    MoveEvent = apps.get_model('api', 'MoveEvent')
+    for game_model, round_model in (('Game', 'Round'), ('ArchivedGame', 'ArchivedRound')):
+        Game = apps.get_model('api', game_model)
+        Round = apps.get_model('api', round_model)
+        # Juegos terminados sin ganador: los cerró un reinicio (los
+        # archivados siempre están terminados)
+        closed = Game.objects.filter(winner=None)
+        if game_model == 'Game':
+            closed = closed.filter(is_active=False)
+        closed = dict(closed.values_list('id', 'created_at'))
+
+        batch = []
+        current_id = None
+        rounds = []
+        rows = Round.objects.order_by('game_id', 'created_at', 'id').values_list(
+            'game_id', 'player1_move', 'player2_move', 'created_at'
+        )
+        for game_id, *row in rows.iterator(chunk_size=BATCH_SIZE):
+            if game_id != current_id:
+                if current_id is not None:
+                    batch += game_events(current_id, rounds, closed, MoveEvent)
+                    closed.pop(current_id, None)
+                current_id, rounds = game_id, []
+            rounds.append(row)
+            if len(batch) >= BATCH_SIZE:
+                MoveEvent.objects.bulk_create(batch, batch_size=BATCH_SIZE)
+                batch = []
+        if current_id is not None:
+            batch += game_events(current_id, rounds, closed, MoveEvent)
+            closed.pop(current_id, None)
+        # Juegos cerrados antes de su primera ronda
+        for game_id in list(closed):
+            batch += game_events(game_id, [], closed, MoveEvent)
+        MoveEvent.objects.bulk_create(batch, batch_size=BATCH_SIZE)
+
+    event_count = MoveEvent.objects.filter(game_id=OuterRef('pk')).order_by().values('game_id').annotate(
+        total=Count('id')
+    ).values('total')
+    apps.get_model('api', 'Game').objects.update(move_count=Coalesce(Subquery(event_count), 0))
+
+
+def delete_move_events(apps, schema_editor):
+    apps.get_model('api', 'MoveEvent').objects.all().delete()
+    apps.get_model('api', 'GameSnapshot').objects.all().delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0014_move_events'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_move_events, delete_move_events),
+    ]
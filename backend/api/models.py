@@ -1,14 +1,90 @@
+import unicodedata
+
+from django.core import exceptions
 from django.db import models
+from django.utils import timezone
+
+from . import rules
 
 # Create your models here.
 
+def normalize_handle(name):
+    """
+    Forma canónica de un nombre de jugador: Unicode NFKC, espacios colapsados
+    y sin distinguir mayúsculas, de modo que "Ana  Pérez" y "ana pérez" son
+    el mismo jugador
+    """
+    handle = ' '.join(unicodedata.normalize('NFKC', name).split()).casefold()
+    return handle[:Player.HANDLE_MAX_LENGTH]
+
+class PlayerQuerySet(models.QuerySet):
+    def get_or_create_by_name(self, name):
+        """
+        Reutiliza el jugador cuyo handle coincide con el nombre normalizado o
+        lo crea si no existe. La restricción única sobre handle resuelve las
+        carreras entre peticiones simultáneas.
+
+        Returns:
+            tuple: (jugador, True si se creó)
+        """
+        return self.get_or_create(
+            handle=normalize_handle(name),
+            defaults={'name': ' '.join(name.split())}
+        )
+
 class Player(models.Model):
     name = models.CharField(max_length=100)
+    # Nombre normalizado (ver normalize_handle), único e indexado. Es nulo
+    # solo en duplicados históricos pendientes de `manage.py dedupe_players`
+    handle = models.CharField(max_length=100, unique=True, null=True, blank=True)
+    # Jugador controlado por el servidor (ver api.bots)
+    is_bot = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True)
+    # Rating Elo: lo actualiza api.ratings al terminar cada juego y se
+    # recalcula desde el historial con `manage.py rebuild_ratings`
+    rating = models.FloatField(default=1000.0)
+
+    HANDLE_MAX_LENGTH = 100
+
+    objects = PlayerQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # Orden de la paginación por cursor
+            models.Index(fields=['created_at', 'id'], name='player_created_idx'),
+            # Clasificación por rating
+            models.Index(fields=['-rating', 'id'], name='player_rating_idx'),
+        ]
 
     def __str__(self):
         return self.name
 
+    def save(self, *args, **kwargs):
+        if self._state.adding and not self.handle:
+            self.handle = normalize_handle(self.name)
+        super().save(*args, **kwargs)
+
+class GameQuerySet(models.QuerySet):
+    def with_players(self):
+        """
+        Trae jugadores y ganador en el mismo JOIN, suficiente para las
+        representaciones resumidas que no incluyen rondas
+        """
+        return self.select_related('player1', 'player2', 'winner')
+
+    def with_details(self):
+        """
+        Carga en bloque todo lo que necesita GameSerializer: jugadores y
+        ganador por JOIN, y las rondas (con el nombre de su ganador anotado)
+        en una sola consulta adicional, sin importar cuántos juegos haya.
+        """
+        rounds = Round.objects.annotate(
+            winner_name=models.F('winner__name')
+        ).order_by('created_at', 'id')
+        return self.with_players().prefetch_related(
+            models.Prefetch('rounds', queryset=rounds)
+        )
+
 class Game(models.Model):
     player1 = models.ForeignKey(Player, on_delete=models.CASCADE, related_name='games_as_player1')
     player2 = models.ForeignKey(Player, on_delete=models.CASCADE, related_name='games_as_player2')
@@ -17,43 +93,313 @@ class Game(models.Model):
     winner = models.ForeignKey(Player, on_delete=models.CASCADE, null=True, blank=True, related_name='games_won')
     is_active = models.BooleanField(default=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    # Puntero desnormalizado a la ronda en curso (o la última jugada) y número
+    # de rondas creadas; los mantienen apply_move y restart_game para que
+    # encontrar la ronda activa sea una búsqueda por PK y no un ORDER BY
+    current_round = models.ForeignKey(
+        'Round', on_delete=models.SET_NULL, null=True, blank=True, related_name='+'
+    )
+    round_count = models.PositiveIntegerField(default=0)
+    # Se incrementa con cada cambio de estado; identifica la versión de la
+    # representación cacheada y el ETag de GET /api/games/{id}/
+    version = models.PositiveIntegerField(default=1)
+    # Eventos escritos en el registro de movimientos (ver api.events); el
+    # siguiente evento lleva move_count + 1 como número de secuencia
+    move_count = models.PositiveIntegerField(default=0)
+    # Estrategia de la CPU cuando el jugador 2 es un bot (vacío si es humano);
+    # se guarda en el juego para decidir su movimiento sin leer al jugador
+    bot_strategy = models.CharField(max_length=20, blank=True, default='')
+    # Variante de reglas (ver api.rules.RULE_SETS)
+    rule_set = models.CharField(
+        max_length=20,
+        choices=[(name, rule_set.label) for name, rule_set in rules.RULE_SETS.items()],
+        default=rules.DEFAULT_RULE_SET
+    )
+
+    # Victorias de ronda necesarias para ganar el juego
+    WINNING_SCORE = 3
+
+    objects = GameQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # Orden de la paginación por cursor
+            models.Index(fields=['created_at', 'id'], name='game_created_idx'),
+            # Índice parcial: solo los juegos en curso, que son los que se
+            # listan con is_active=true; los terminados acaban archivados
+            models.Index(
+                fields=['created_at', 'id'],
+                condition=models.Q(is_active=True),
+                name='game_active_partial_idx'
+            ),
+        ]
+
+    def bump_version(self):
+        """
+        Marca un nuevo estado del juego. No guarda.
 
-    def update_score(self, winner):
-        if winner == self.player1:
+        Returns:
+            list: Campos modificados, para usar con save(update_fields=...)
+        """
+        self.version += 1
+        return ['version']
+
+    def set_current_round(self, round):
+        """
+        Apunta el juego a una ronda recién creada. No guarda.
+
+        Returns:
+            list: Campos modificados, para usar con save(update_fields=...)
+        """
+        self.current_round = round
+        self.round_count += 1
+        return ['current_round', 'round_count']
+
+    def update_score(self, winner_id):
+        """
+        Suma el punto de la ronda al ganador y cierra el juego cuando alguno
+        llega a WINNING_SCORE. No guarda: el llamador persiste los cambios
+        en una sola escritura.
+
+        Returns:
+            list: Campos modificados, para usar con save(update_fields=...)
+        """
+        if winner_id == self.player1_id:
             self.player1_score += 1
-        elif winner == self.player2:
+        elif winner_id == self.player2_id:
             self.player2_score += 1
-        self.save()
+        else:
+            return []
+
+        changed = ['player1_score', 'player2_score']
+        if self.player1_score >= self.WINNING_SCORE:
+            self.winner_id = self.player1_id
+            self.is_active = False
+            changed += ['winner', 'is_active']
+        elif self.player2_score >= self.WINNING_SCORE:
+            self.winner_id = self.player2_id
+            self.is_active = False
+            changed += ['winner', 'is_active']
+        return changed
+
+class MoveField(models.SmallIntegerField):
+    """
+    Movimiento guardado como entero pequeño (rules.MOVE_CODES) y expuesto en
+    Python y en la API por su nombre ('ROCK', 'PAPER'...). Los filtros del
+    ORM aceptan también el nombre.
+    """
+    def __init__(self, *args, **kwargs):
+        kwargs['choices'] = [(move, rules.MOVE_LABELS[move]) for move in rules.ALL_MOVES]
+        super().__init__(*args, **kwargs)
+
+    def deconstruct(self):
+        name, path, args, kwargs = super().deconstruct()
+        del kwargs['choices']
+        return name, path, args, kwargs
+
+    @property
+    def validators(self):
+        # Los límites de SmallIntegerField se aplican al código, no al nombre
+        return []
+
+    def from_db_value(self, value, expression, connection):
+        return None if value is None else rules.MOVE_NAMES[value]
+
+    def to_python(self, value):
+        if value is None or value in rules.MOVE_CODES:
+            return value
+        if value in rules.MOVE_NAMES:
+            return rules.MOVE_NAMES[value]
+        raise exceptions.ValidationError(f"Movimiento desconocido: {value}", code='invalid')
+
+    def get_prep_value(self, value):
+        value = self.to_python(value)
+        return None if value is None else rules.MOVE_CODES[value]
+
 
 class Round(models.Model):
-    ROCK = 'ROCK'
-    PAPER = 'PAPER'
-    SCISSORS = 'SCISSORS'
+    ROCK = rules.ROCK
+    PAPER = rules.PAPER
+    SCISSORS = rules.SCISSORS
+    LIZARD = rules.LIZARD
+    SPOCK = rules.SPOCK
     
-    MOVES = [
-        (ROCK, 'Piedra'),
-        (PAPER, 'Papel'),
-        (SCISSORS, 'Tijera'),
-    ]
+    MOVES = [(move, rules.MOVE_LABELS[move]) for move in rules.ALL_MOVES]
     
     game = models.ForeignKey(Game, on_delete=models.CASCADE, related_name='rounds')
-    player1_move = models.CharField(max_length=10, choices=MOVES, null=True, blank=True)
-    player2_move = models.CharField(max_length=10, choices=MOVES, null=True, blank=True)
+    player1_move = MoveField(null=True, blank=True)
+    player2_move = MoveField(null=True, blank=True)
     winner = models.ForeignKey(Player, on_delete=models.CASCADE, null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
-    def determine_winner(self):
-        if self.player1_move == self.player2_move:
-            return None
-            
-        if (
-            (self.player1_move == self.PAPER and self.player2_move == self.ROCK) or
-            (self.player1_move == self.ROCK and self.player2_move == self.SCISSORS) or
-            (self.player1_move == self.SCISSORS and self.player2_move == self.PAPER)
-        ):
-            self.winner = self.game.player1
+    class Meta:
+        indexes = [
+            models.Index(fields=['game', 'created_at'], name='round_game_created_idx'),
+        ]
+
+    def determine_winner(self, game):
+        """
+        Calcula el ganador de la ronda con la tabla de resultados de las
+        reglas del juego y lo asigna en winner. No guarda ni consulta: el
+        llamador pasa el juego y persiste la ronda.
+
+        Args:
+            game: Juego de la ronda
+
+        Returns:
+            int | None: ID del jugador ganador, o None si hay empate
+        """
+        outcome = rules.RULE_SETS[game.rule_set].outcome(self.player1_move, self.player2_move)
+        if outcome == rules.PLAYER1:
+            self.winner_id = game.player1_id
+        elif outcome == rules.PLAYER2:
+            self.winner_id = game.player2_id
         else:
-            self.winner = self.game.player2
-            
-        self.save()
-        return self.winner
+            self.winner_id = None
+        return self.winner_id
+
+
+class PlayerStats(models.Model):
+    """
+    Estadísticas precalculadas de un jugador. Las actualiza api.stats al
+    terminar cada juego y se recalculan desde el historial con
+    `manage.py rebuild_stats`. Solo cuentan los juegos terminados con
+    ganador; un juego cerrado por un reinicio no suma.
+    """
+    player = models.OneToOneField(Player, on_delete=models.CASCADE, primary_key=True, related_name='stats')
+    games_played = models.PositiveIntegerField(default=0)
+    wins = models.PositiveIntegerField(default=0)
+    losses = models.PositiveIntegerField(default=0)
+    rounds_played = models.PositiveIntegerField(default=0)
+    round_wins = models.PositiveIntegerField(default=0)
+    rock_count = models.PositiveIntegerField(default=0)
+    paper_count = models.PositiveIntegerField(default=0)
+    scissors_count = models.PositiveIntegerField(default=0)
+    lizard_count = models.PositiveIntegerField(default=0)
+    spock_count = models.PositiveIntegerField(default=0)
+    # Juegos ganados seguidos (el actual y el mejor)
+    current_streak = models.PositiveIntegerField(default=0)
+    best_streak = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            # Top-K de la clasificación: se lee en el orden del índice
+            models.Index(fields=['-wins', '-round_wins', 'player'], name='stats_leaderboard_idx'),
+        ]
+
+    def __str__(self):
+        return f"Estadísticas de {self.player_id}"
+
+
+class ArchivedGameQuerySet(models.QuerySet):
+    def with_details(self):
+        """
+        Igual que GameQuerySet.with_details para los juegos archivados
+        """
+        rounds = ArchivedRound.objects.annotate(
+            winner_name=models.F('winner__name')
+        ).order_by('created_at', 'id')
+        return self.select_related('player1', 'player2', 'winner').prefetch_related(
+            models.Prefetch('rounds', queryset=rounds)
+        )
+
+
+class ArchivedGame(models.Model):
+    """
+    Juego terminado movido fuera de Game por `manage.py archive_games`.
+    Conserva su ID y los campos que muestra la API, así
+    GET /api/games/{id}/ lo sigue encontrando y lo serializa igual.
+    """
+    id = models.BigIntegerField(primary_key=True)
+    player1 = models.ForeignKey(Player, on_delete=models.CASCADE, related_name='+')
+    player2 = models.ForeignKey(Player, on_delete=models.CASCADE, related_name='+')
+    player1_score = models.IntegerField(default=0)
+    player2_score = models.IntegerField(default=0)
+    winner = models.ForeignKey(Player, on_delete=models.CASCADE, null=True, blank=True, related_name='+')
+    created_at = models.DateTimeField()
+    # Momento de la última ronda: orden en que terminaron los juegos
+    finished_at = models.DateTimeField(null=True, blank=True)
+    archived_at = models.DateTimeField(auto_now_add=True)
+    round_count = models.PositiveIntegerField(default=0)
+    version = models.PositiveIntegerField(default=1)
+    bot_strategy = models.CharField(max_length=20, blank=True, default='')
+    rule_set = models.CharField(max_length=20, default=rules.DEFAULT_RULE_SET)
+
+    # Un juego archivado siempre está terminado
+    is_active = False
+
+    objects = ArchivedGameQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['finished_at', 'id'], name='archived_game_finished_idx'),
+        ]
+
+
+class ArchivedRound(models.Model):
+    """
+    Ronda de un juego archivado
+    """
+    id = models.BigIntegerField(primary_key=True)
+    game = models.ForeignKey(ArchivedGame, on_delete=models.CASCADE, related_name='rounds')
+    player1_move = MoveField(null=True, blank=True)
+    player2_move = MoveField(null=True, blank=True)
+    winner = models.ForeignKey(Player, on_delete=models.CASCADE, null=True, blank=True, related_name='+')
+    created_at = models.DateTimeField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['game', 'created_at'], name='archived_round_game_idx'),
+        ]
+
+
+class MoveEvent(models.Model):
+    """
+    Registro de solo inserción con un evento por movimiento (ver
+    api.events). A diferencia de Round, sus filas no se modifican nunca:
+    el estado de cualquier juego se reconstruye repitiendo sus eventos en
+    orden de seq. No tiene claves foráneas, así que el registro de un juego
+    sobrevive a su archivo.
+    """
+    # Asiento que genera el evento; CLOSED es el cierre de un juego en curso
+    # por un reinicio, sin movimiento
+    CLOSED = 0
+    PLAYER1 = rules.PLAYER1
+    PLAYER2 = rules.PLAYER2
+
+    game_id = models.BigIntegerField()
+    # Posición del evento en su juego, desde 1
+    seq = models.PositiveIntegerField()
+    seat = models.PositiveSmallIntegerField()
+    move = MoveField(null=True, blank=True)
+    # Sin auto_now_add: el backfill conserva el momento de cada ronda
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        constraints = [
+            # Orden de la repetición y protección frente a eventos duplicados
+            models.UniqueConstraint(fields=['game_id', 'seq'], name='move_event_game_seq_uniq'),
+        ]
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding:
+            raise ValueError("Los eventos de movimiento no se modifican")
+        super().save(*args, **kwargs)
+
+
+class GameSnapshot(models.Model):
+    """
+    Estado de un juego tras sus primeros seq eventos (ver
+    api.events.GameState), para reconstruirlo repitiendo solo los eventos
+    posteriores
+    """
+    game_id = models.BigIntegerField()
+    seq = models.PositiveIntegerField()
+    state = models.JSONField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['game_id', 'seq'], name='game_snapshot_game_seq_uniq'),
+        ]
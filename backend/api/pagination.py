@@ -0,0 +1,15 @@
+from rest_framework.pagination import CursorPagination
+
+
+class CreatedAtCursorPagination(CursorPagination):
+    """
+    Paginación por cursor (keyset) sobre created_at e id.
+
+    A diferencia de la paginación por offset, cada página se obtiene con un
+    WHERE sobre el índice (created_at, id), así que el costo no crece con la
+    profundidad de la página ni con el tamaño de la tabla. El tamaño por
+    defecto viene de REST_FRAMEWORK['PAGE_SIZE'].
+    """
+    ordering = ('-created_at', '-id')
+    page_size_query_param = 'page_size'
+    max_page_size = 200
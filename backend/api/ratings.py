@@ -0,0 +1,155 @@
+"""
+Rating Elo de los jugadores.
+
+Player.rating se actualiza de forma incremental: al terminar un juego,
+record_games() aplica la fórmula de Elo a sus dos jugadores dentro de la
+misma transacción que el movimiento final, con las filas de los jugadores
+bloqueadas por stats.record_games. rebuild_ratings() recalcula todos los
+ratings repitiendo el historial de juegos terminados (archivados o no) en
+el orden en que terminaron.
+
+El recálculo está vectorizado con NumPy: los ratings viven en un array y
+los juegos de cada bloque se reparten en oleadas en las que ningún jugador
+aparece dos veces. Cada oleada depende solo de las anteriores, así que sus
+juegos se actualizan a la vez con operaciones sobre arrays y el resultado
+es el mismo que aplicarlos uno a uno.
+"""
+import logging
+
+import numpy as np
+from django.db import transaction
+
+from .models import Player
+from .stats import finished_games
+
+logger = logging.getLogger(__name__)
+
+# Rating de un jugador sin juegos terminados (el default de Player.rating)
+INITIAL_RATING = 1000.0
+
+# Puntos que se juegan en cada juego
+K_FACTOR = 32
+
+# Juegos leídos por bloque al recalcular y filas por UPDATE
+CHUNK_SIZE = 50000
+BATCH_SIZE = 1000
+
+
+def expected_score(rating, opponent_rating):
+    """
+    Probabilidad de ganar según Elo. Admite números o arrays de NumPy.
+    """
+    return 1 / (1 + 10 ** ((opponent_rating - rating) / 400))
+
+
+def record_games(games, players):
+    """
+    Actualiza el rating de los jugadores de juegos recién terminados. Debe
+    llamarse dentro de la transacción que los termina, con los jugadores que
+    stats.record_games ya bloqueó junto a sus estadísticas: el rating se lee
+    en esa misma consulta y aquí solo se escribe.
+
+    Args:
+        games: Juegos terminados, en el orden en que terminaron
+        players: Jugadores bloqueados por ID (ver stats.record_games)
+    """
+    games = [game for game in games if game.winner_id]
+    if not games:
+        return
+
+    for game in games:
+        player1, player2 = players[game.player1_id], players[game.player2_id]
+        score = 1.0 if game.winner_id == game.player1_id else 0.0
+        delta = K_FACTOR * (score - expected_score(player1.rating, player2.rating))
+        player1.rating += delta
+        player2.rating -= delta
+    Player.objects.bulk_update(players.values(), ['rating'], batch_size=BATCH_SIZE)
+
+
+def waves(player1, player2, player_count):
+    """
+    Oleada de cada juego de un bloque: la siguiente a la del último juego de
+    cualquiera de sus dos jugadores. Es el único recorrido en Python, con
+    enteros y sin cálculos de rating.
+
+    Args:
+        player1, player2: Índices de los jugadores, en orden de los juegos
+        player_count: Número de jugadores (tamaño de los índices)
+
+    Returns:
+        np.ndarray: Oleada de cada juego, desde 0
+    """
+    last = [-1] * player_count
+    result = np.empty(len(player1), dtype=np.int64)
+    for index, (first, second) in enumerate(zip(player1.tolist(), player2.tolist())):
+        wave = max(last[first], last[second]) + 1
+        result[index] = last[first] = last[second] = wave
+    return result
+
+
+def replay(ratings, player1, player2, score1):
+    """
+    Aplica un bloque de juegos, en orden, sobre el array de ratings
+
+    Args:
+        ratings: Array de ratings por índice de jugador; se modifica
+        player1, player2: Índices de los jugadores de cada juego
+        score1: 1.0 si ganó el jugador 1, 0.0 si ganó el jugador 2
+    """
+    game_waves = waves(player1, player2, len(ratings))
+    order = np.argsort(game_waves, kind='stable')
+    bounds = np.flatnonzero(np.diff(game_waves[order])) + 1
+    for games in np.split(order, bounds):
+        first, second = player1[games], player2[games]
+        delta = K_FACTOR * (score1[games] - expected_score(ratings[first], ratings[second]))
+        ratings[first] += delta
+        ratings[second] -= delta
+
+
+@transaction.atomic
+def rebuild_ratings(chunk_size=CHUNK_SIZE):
+    """
+    Recalcula el rating de todos los jugadores desde el historial. Los
+    juegos se leen por bloques de un cursor y solo se escriben los ratings
+    que cambian.
+
+    Args:
+        chunk_size: Juegos por bloque
+
+    Returns:
+        dict: Juegos repetidos y jugadores cuyo rating cambió
+    """
+    players = Player.objects.order_by('id').values_list('id', 'rating')
+    ids = np.fromiter((player_id for player_id, _ in players), dtype=np.int64)
+    current = np.fromiter((rating for _, rating in players), dtype=np.float64)
+    ratings = np.full(len(ids), INITIAL_RATING)
+
+    def flush(chunk):
+        table = np.array(chunk, dtype=np.int64)
+        player1 = np.searchsorted(ids, table[:, 0])
+        player2 = np.searchsorted(ids, table[:, 1])
+        replay(ratings, player1, player2, (table[:, 2] == table[:, 0]).astype(np.float64))
+
+    # Los juegos archivados terminaron antes que los que siguen en Game
+    replayed = 0
+    for archived in (True, False):
+        chunk = []
+        rows = finished_games(archived=archived).values_list('player1_id', 'player2_id', 'winner_id')
+        for row in rows.iterator(chunk_size=chunk_size):
+            chunk.append(row)
+            if len(chunk) >= chunk_size:
+                flush(chunk)
+                replayed += len(chunk)
+                chunk = []
+        if chunk:
+            flush(chunk)
+            replayed += len(chunk)
+
+    changed = np.flatnonzero(ratings != current)
+    Player.objects.bulk_update(
+        [Player(pk=int(ids[index]), rating=float(ratings[index])) for index in changed],
+        ['rating'],
+        batch_size=BATCH_SIZE
+    )
+    logger.info("Ratings recalculados: %s juegos, %s jugadores actualizados", replayed, len(changed))
+    return {'games': replayed, 'players': len(changed)}
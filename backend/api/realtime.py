@@ -0,0 +1,50 @@
+"""
+Difusión de cambios de estado de los juegos por WebSocket.
+
+Cada juego tiene un grupo en la capa de canales; GameConsumer suscribe a
+los clientes y make_move/restart_game publican el estado resultante, de
+modo que el tablero del rival se actualiza sin sondear la API.
+"""
+import logging
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+
+logger = logging.getLogger(__name__)
+
+
+def game_group_name(game_id):
+    return f'game_{game_id}'
+
+
+async def abroadcast_game(game_id, event, payload):
+    """
+    Publica un evento para los clientes suscritos a un juego
+
+    Args:
+        game_id: ID del juego cuyo grupo recibe el evento
+        event: Nombre del evento ('game.update', 'game.delta' o
+            'game.restarted')
+        payload: Estado serializado del juego (el delta del movimiento en
+            'game.delta')
+    """
+    channel_layer = get_channel_layer()
+    if channel_layer is None:
+        return
+    # El movimiento ya está guardado: un fallo de la capa de canales no debe
+    # convertirlo en un error para quien lo hizo
+    try:
+        await channel_layer.group_send(game_group_name(game_id), {
+            'type': 'game.event',
+            'event': event,
+            'game': payload,
+        })
+    except Exception as e:
+        logger.error("No se pudo publicar el evento %s del juego %s: %s", event, game_id, e)
+
+
+def broadcast_game(game_id, event, payload):
+    """
+    Versión síncrona de abroadcast_game, para las vistas WSGI
+    """
+    async_to_sync(abroadcast_game)(game_id, event, payload)
@@ -0,0 +1,38 @@
+"""
+Renderer JSON rápido.
+
+FastJSONRenderer genera los mismos bytes que el JSONRenderer de DRF con la
+configuración por defecto (compacto, UTF-8 sin escapar, U+2028 y U+2029
+escapados) usando orjson, que es varias veces más rápido. orjson es
+opcional: sin él, o si se pide JSON indentado, se usa el JSONRenderer de
+DRF.
+"""
+from rest_framework.renderers import JSONRenderer
+from rest_framework.settings import api_settings
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+
+class FastJSONRenderer(JSONRenderer):
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if (
+            orjson is None
+            or data is None
+            or not (api_settings.COMPACT_JSON and api_settings.UNICODE_JSON)
+            or self.get_indent(accepted_media_type or '', renderer_context or {})
+        ):
+            return super().render(data, accepted_media_type, renderer_context)
+        try:
+            ret = orjson.dumps(data)
+        except TypeError:
+            # Tipos que solo sabe codificar el encoder de DRF (Decimal,
+            # lazy strings, ...)
+            return super().render(data, accepted_media_type, renderer_context)
+        # Igual que DRF: separadores de línea escapados para poder incrustar
+        # el JSON en JavaScript
+        if b'\xe2\x80\xa8' in ret or b'\xe2\x80\xa9' in ret:
+            ret = ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+        return ret
@@ -0,0 +1,104 @@
+"""
+Reglas del juego definidas como datos.
+
+Cada conjunto de reglas es la lista de movimientos que gana cada movimiento.
+A partir de ella se precalcula la tabla de resultados de todas las parejas
+de movimientos, así resolver una ronda es una búsqueda en un dict, sin
+comparaciones encadenadas. Para añadir una variante basta con añadir una
+entrada a RULE_SETS.
+"""
+
+ROCK = 'ROCK'
+PAPER = 'PAPER'
+SCISSORS = 'SCISSORS'
+LIZARD = 'LIZARD'
+SPOCK = 'SPOCK'
+
+# Código con el que se guarda cada movimiento en la base de datos (ver
+# api.models.MoveField). No se deben cambiar los códigos existentes.
+MOVE_CODES = {
+    ROCK: 1,
+    PAPER: 2,
+    SCISSORS: 3,
+    LIZARD: 4,
+    SPOCK: 5,
+}
+MOVE_NAMES = {code: move for move, code in MOVE_CODES.items()}
+
+MOVE_LABELS = {
+    ROCK: 'Piedra',
+    PAPER: 'Papel',
+    SCISSORS: 'Tijera',
+    LIZARD: 'Lagarto',
+    SPOCK: 'Spock',
+}
+
+# Resultado de una ronda
+TIE = 0
+PLAYER1 = 1
+PLAYER2 = 2
+
+
+class RuleSet:
+    """
+    Variante del juego
+
+    Args:
+        name: Identificador (Game.rule_set)
+        label: Nombre para mostrar
+        beats: Movimientos que gana cada movimiento de la variante
+
+    Raises:
+        ValueError: Si en alguna pareja de movimientos no hay exactamente
+            un ganador
+    """
+    def __init__(self, name, label, beats):
+        self.name = name
+        self.label = label
+        self.moves = list(beats)
+        self.outcomes = {}
+        for move1 in self.moves:
+            for move2 in self.moves:
+                if move1 == move2:
+                    self.outcomes[move1, move2] = TIE
+                    continue
+                wins, loses = move2 in beats[move1], move1 in beats[move2]
+                if wins == loses:
+                    raise ValueError(f"Reglas {name}: {move1} contra {move2} no tiene un único ganador")
+                self.outcomes[move1, move2] = PLAYER1 if wins else PLAYER2
+        # Movimientos que ganan a cada movimiento
+        self.counters = {
+            move: [other for other in self.moves if move in beats[other]]
+            for move in self.moves
+        }
+
+    def invalid_move_message(self):
+        return f"Movimiento inválido. Debe ser {', '.join(self.moves[:-1])} o {self.moves[-1]}"
+
+    def outcome(self, move1, move2):
+        """
+        Returns:
+            int: TIE, PLAYER1 o PLAYER2
+        """
+        return self.outcomes[move1, move2]
+
+
+RULE_SETS = {
+    'classic': RuleSet('classic', 'Piedra, papel o tijera', {
+        ROCK: [SCISSORS],
+        PAPER: [ROCK],
+        SCISSORS: [PAPER],
+    }),
+    'rpsls': RuleSet('rpsls', 'Piedra, papel, tijera, lagarto o Spock', {
+        ROCK: [SCISSORS, LIZARD],
+        PAPER: [ROCK, SPOCK],
+        SCISSORS: [PAPER, LIZARD],
+        LIZARD: [PAPER, SPOCK],
+        SPOCK: [ROCK, SCISSORS],
+    }),
+}
+
+DEFAULT_RULE_SET = 'classic'
+
+# Todos los movimientos de todas las variantes, en orden de código
+ALL_MOVES = sorted(MOVE_CODES, key=MOVE_CODES.get)
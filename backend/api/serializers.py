@@ -1,12 +1,29 @@
 from rest_framework import serializers
-from .models import Player, Game, Round
+from .metrics import timing
+from .models import Player, PlayerStats, Game, Round
 
-class PlayerSerializer(serializers.ModelSerializer):
+
+class TimedSerializerMixin:
+    """
+    Suma el tiempo de serialización a la fase 'serialize' de las métricas
+    de la petición; los serializers anidados no se cuentan dos veces
+    """
+    def to_representation(self, instance):
+        with timing('serialize'):
+            return super().to_representation(instance)
+
+
+class PlayerSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = Player
-        fields = ['id', 'name', 'created_at']
+        fields = ['id', 'name', 'is_bot', 'created_at']
+        read_only_fields = ['is_bot']
+
+    def create(self, validated_data):
+        # Un nombre ya registrado devuelve el jugador existente
+        return Player.objects.get_or_create_by_name(validated_data['name'])[0]
 
-class RoundSerializer(serializers.ModelSerializer):
+class RoundSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     result = serializers.SerializerMethodField()
 
     class Meta:
@@ -16,11 +33,24 @@ class RoundSerializer(serializers.ModelSerializer):
     def get_result(self, obj):
         if not obj.player1_move or not obj.player2_move:
             return "Ronda en progreso"
-        if not obj.winner:
+        if not obj.winner_id:
             return "Empate"
-        return f"Ganador: {obj.winner.name}"
+        # winner_name viene anotado por Game.objects.with_details()
+        winner_name = getattr(obj, 'winner_name', None) or obj.winner.name
+        return f"Ganador: {winner_name}"
 
-class GameSerializer(serializers.ModelSerializer):
+def game_status(is_active, winner_name):
+    """
+    Texto del estado de un juego (campo status)
+    """
+    if not is_active:
+        # Un juego reiniciado queda inactivo sin ganador
+        if winner_name is None:
+            return "Juego terminado"
+        return f"Juego terminado. Ganador: {winner_name}"
+    return "Juego en progreso"
+
+class GameSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     player1 = PlayerSerializer()
     player2 = PlayerSerializer()
     winner = PlayerSerializer()
@@ -31,10 +61,53 @@ class GameSerializer(serializers.ModelSerializer):
         model = Game
         fields = [
             'id', 'player1', 'player2', 'player1_score', 'player2_score',
-            'winner', 'is_active', 'created_at', 'rounds', 'status'
-        ] 
+            'winner', 'is_active', 'bot_strategy', 'rule_set', 'version', 'created_at', 'rounds', 'status'
+        ]
+        read_only_fields = ['bot_strategy', 'rule_set', 'version']
 
     def get_status(self, obj):
-        if not obj.is_active:
-            return f"Juego terminado. Ganador: {obj.winner.name}"
-        return "Juego en progreso" 
\ No newline at end of file
+        return game_status(obj.is_active, obj.winner.name if obj.winner_id else None)
+
+class GameSummarySerializer(GameSerializer):
+    """
+    Representación resumida para listados: igual a GameSerializer pero sin
+    las rondas anidadas
+    """
+    class Meta(GameSerializer.Meta):
+        fields = [field for field in GameSerializer.Meta.fields if field != 'rounds']
+
+
+class GameDeltaSerializer(GameSerializer):
+    """
+    Respuesta compacta de un movimiento: el marcador, el estado y solo la
+    ronda que acaba de cambiar. Su tamaño no depende del número de rondas.
+    El cliente la aplica sobre el estado que ya tiene si version es la
+    siguiente a la suya.
+    """
+    round = RoundSerializer(source='current_round', read_only=True)
+
+    class Meta(GameSerializer.Meta):
+        fields = ['id', 'version', 'player1_score', 'player2_score', 'winner', 'is_active', 'status', 'round']
+
+
+class PlayerStatsSerializer(TimedSerializerMixin, serializers.ModelSerializer):
+    player = PlayerSerializer(read_only=True)
+    rating = serializers.FloatField(source='player.rating', read_only=True)
+    moves = serializers.SerializerMethodField()
+
+    class Meta:
+        model = PlayerStats
+        fields = [
+            'player', 'rating', 'games_played', 'wins', 'losses', 'rounds_played',
+            'round_wins', 'moves', 'current_streak', 'best_streak', 'updated_at'
+        ]
+
+    def get_moves(self, obj):
+        # Frecuencia de cada movimiento
+        return {
+            Round.ROCK: obj.rock_count,
+            Round.PAPER: obj.paper_count,
+            Round.SCISSORS: obj.scissors_count,
+            Round.LIZARD: obj.lizard_count,
+            Round.SPOCK: obj.spock_count,
+        }
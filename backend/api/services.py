@@ -0,0 +1,514 @@
+import logging
+
+from django.db import transaction
+from django.db.models import F, Q
+
+from . import bots, events, ratings, rules, stats
+from .models import ArchivedGame, Game, Player, Round, normalize_handle
+
+logger = logging.getLogger(__name__)
+
+# Filas por INSERT en las operaciones en bloque
+BULK_BATCH_SIZE = 1000
+
+
+class MoveError(Exception):
+    """
+    Movimiento rechazado por las reglas del juego (turno, juego terminado...)
+    """
+
+
+def lock_game(game_id):
+    """
+    Obtiene el juego bloqueando su fila hasta el fin de la transacción, de
+    modo que los movimientos concurrentes sobre un mismo juego se apliquen
+    uno detrás de otro
+
+    Raises:
+        Game.DoesNotExist: Si el juego no existe o el ID no es válido
+    """
+    try:
+        return Game.objects.select_for_update().get(pk=game_id)
+    except (TypeError, ValueError):
+        raise Game.DoesNotExist(f"ID de juego inválido: {game_id}")
+
+
+def load_current_round(game):
+    """
+    Obtiene por PK la ronda a la que apunta el juego, sin ordenar rondas.
+
+    No se trae en un JOIN junto al bloqueo del juego: en READ COMMITTED,
+    PostgreSQL revalida la fila bloqueada pero no las unidas, y tras esperar
+    el bloqueo se vería una ronda desactualizada.
+    """
+    if not game.current_round_id:
+        return None
+    current_round = Round.objects.get(pk=game.current_round_id)
+    current_round.game = game
+    return current_round
+
+
+def play_move(game, current_round, player_id, movement, new_version=True):
+    """
+    Aplica las reglas del juego en memoria, sin escribir en la base de datos.
+    Si el movimiento no es válido, ni el juego ni la ronda se modifican.
+
+    Args:
+        game: Juego (bloqueado por el llamador)
+        current_round: Ronda a la que apunta el juego, o None
+        player_id: ID del jugador que mueve
+        movement: Movimiento de las reglas del juego (ver api.rules)
+        new_version: Si el movimiento incrementa Game.version; False cuando
+            entra en la misma versión que el anterior
+
+    Returns:
+        tuple: (ronda jugada, True si la ronda es nueva, campos de game
+        modificados para save(update_fields=...))
+
+    Raises:
+        MoveError: Si el movimiento no respeta las reglas del juego
+    """
+    # Verificar si el juego sigue activo
+    if not game.is_active:
+        raise MoveError("El juego ya ha terminado")
+
+    # Verificar que el movimiento existe en las reglas del juego
+    rule_set = rules.RULE_SETS[game.rule_set]
+    if movement not in rule_set.moves:
+        raise MoveError(rule_set.invalid_move_message())
+
+    # Crear una nueva ronda si:
+    # - No hay rondas
+    # - La última ronda está completa (tiene ambos movimientos)
+    # - La última ronda tiene un ganador
+    # La ronda nueva se inserta ya con el movimiento, en una sola escritura
+    created = not current_round or \
+        bool(current_round.player1_move and current_round.player2_move) or \
+        bool(current_round.winner_id)
+    if created:
+        current_round = Round(game=game)
+
+    # Validar el orden de los turnos
+    if current_round.player1_move is None:
+        # Si es el primer movimiento de la ronda, debe ser el jugador 1
+        if player_id != game.player1_id:
+            raise MoveError("Es el turno del Jugador 1")
+    elif current_round.player2_move is None:
+        # Si ya hay un movimiento del jugador 1, debe ser el jugador 2
+        if player_id != game.player2_id:
+            raise MoveError("Es el turno del Jugador 2")
+    else:
+        raise MoveError("Esta ronda ya está completa")
+
+    # Registrar el movimiento del jugador correspondiente
+    if player_id == game.player1_id:
+        current_round.player1_move = movement
+    else:
+        current_round.player2_move = movement
+
+    # Si ambos jugadores han hecho su movimiento, determinar ganador
+    winner_id = None
+    if current_round.player1_move and current_round.player2_move:
+        winner_id = current_round.determine_winner(game)
+
+    # Versión, puntero de ronda y marcador (y fin del juego) se guardan en
+    # una sola escritura; una ronda recién creada nunca tiene ganador todavía
+    update_fields = game.bump_version() if new_version else []
+    if created:
+        update_fields += game.set_current_round(current_round)
+    if winner_id:
+        update_fields += game.update_score(winner_id)
+    # El movimiento entra también en el registro de eventos
+    update_fields += events.record_move(game, current_round, player_id, movement)
+
+    return current_round, created, update_fields
+
+
+def play_turn(game, current_round, player_id, movement):
+    """
+    Igual que play_move y, en los juegos contra la CPU, añade a la misma
+    ronda la respuesta del bot al movimiento del jugador 1. Ambos
+    movimientos son una sola versión del juego: el cliente recibe un único
+    delta con version anterior + 1
+
+    Returns:
+        tuple: Como play_move
+    """
+    previous_move = None
+    if current_round and current_round.player1_move and current_round.player2_move:
+        previous_move = current_round.player1_move
+
+    current_round, created, update_fields = play_move(game, current_round, player_id, movement)
+    if game.bot_strategy and game.is_active and current_round.player2_move is None:
+        bot_move = bots.choose_move(game, previous_move, movement)
+        current_round, _, bot_fields = play_move(
+            game, current_round, game.player2_id, bot_move, new_version=False
+        )
+        update_fields += bot_fields
+    return current_round, created, update_fields
+
+
+@transaction.atomic
+def apply_move(game_id, player_id, movement):
+    """
+    Aplica el movimiento de un jugador en una única transacción.
+
+    La fila del juego queda bloqueada con SELECT ... FOR UPDATE mientras se
+    decide la ronda, así que dos peticiones simultáneas no pueden crear
+    rondas duplicadas ni perder puntos. Como mucho se hacen dos escrituras:
+    la de la ronda (con su ganador ya calculado) y la del juego, más la
+    inserción en el registro de eventos (ver api.events). En los juegos
+    contra la CPU, su respuesta entra en esas mismas escrituras.
+
+    Args:
+        game_id: ID del juego
+        player_id: ID del jugador que mueve
+        movement: Movimiento de las reglas del juego (ver api.rules)
+
+    Returns:
+        Game: El juego con el marcador actualizado y current_round cargada
+
+    Raises:
+        Game.DoesNotExist: Si el juego no existe
+        MoveError: Si el movimiento no respeta las reglas del juego
+    """
+    game = lock_game(game_id)
+    current_round, created, update_fields = play_turn(
+        game, load_current_round(game), player_id, movement
+    )
+
+    current_round.save()
+    if created:
+        logger.info("Nueva ronda creada: %s", current_round.id, extra={'game_id': game.id, 'sampled': True})
+    game.save(update_fields=update_fields)
+    events.save_pending([game])
+    if not game.is_active:
+        # Movimiento final: el juego cuenta ya en las estadísticas y en el
+        # rating de los jugadores
+        players = stats.record_games([game])
+        ratings.record_games([game], players)
+
+    # La ronda jugada queda en el juego para la respuesta compacta
+    game.current_round = current_round
+    return game
+
+
+@transaction.atomic
+def apply_moves(moves):
+    """
+    Aplica una lista de movimientos, sobre uno o varios juegos, en una sola
+    transacción y con un número constante de consultas.
+
+    Los juegos se bloquean de una vez y en orden de ID (así dos lotes
+    concurrentes no pueden bloquearse mutuamente), las rondas en curso se
+    cargan en una consulta y los movimientos se aplican en memoria, en el
+    orden recibido. Al final las rondas nuevas se insertan con bulk_create
+    y las modificadas, igual que los juegos, con bulk_update; los eventos de
+    todos los movimientos, con otro bulk_create. Los juegos que
+    terminan se suman a las estadísticas al final, todos juntos. Un
+    movimiento inválido no afecta a los demás.
+
+    Args:
+        moves: Lista de tuplas (game_id, player_id, movement)
+
+    Returns:
+        list: Por cada movimiento, un dict con el resultado. Si se aplicó
+        incluye el estado del juego tras el movimiento; si no, el error.
+    """
+    game_ids = sorted({game_id for game_id, _, _ in moves})
+    games = {
+        game.pk: game
+        for game in Game.objects.select_for_update().filter(pk__in=game_ids).order_by('pk')
+    }
+    rounds = Round.objects.in_bulk([game.current_round_id for game in games.values() if game.current_round_id])
+    current_rounds = {}
+    for game in games.values():
+        current_round = rounds.get(game.current_round_id)
+        if current_round:
+            current_round.game = game
+        current_rounds[game.pk] = current_round
+
+    results = []
+    played = []
+    new_rounds = []
+    changed_rounds = {}
+    changed_games = {}
+    game_fields = set()
+    finished = []
+
+    for game_id, player_id, movement in moves:
+        game = games.get(game_id)
+        if game is None:
+            results.append({"game_id": game_id, "status": 404, "error": "Juego no encontrado"})
+            continue
+
+        try:
+            current_round, created, update_fields = play_turn(
+                game, current_rounds[game_id], player_id, movement
+            )
+        except MoveError as e:
+            results.append({"game_id": game_id, "status": 400, "error": str(e)})
+            continue
+
+        current_rounds[game_id] = current_round
+        if created:
+            new_rounds.append(current_round)
+        elif current_round.pk is not None:
+            changed_rounds[current_round.pk] = current_round
+        changed_games[game_id] = game
+        game_fields.update(update_fields)
+        if not game.is_active:
+            finished.append(game)
+
+        result = {
+            "game_id": game_id,
+            "status": 200,
+            "player1_score": game.player1_score,
+            "player2_score": game.player2_score,
+            "is_active": game.is_active,
+            "winner": game.winner_id,
+            "version": game.version,
+        }
+        results.append(result)
+        played.append((result, current_round))
+
+    Round.objects.bulk_create(new_rounds, batch_size=BULK_BATCH_SIZE)
+    Round.objects.bulk_update(
+        changed_rounds.values(), ['player1_move', 'player2_move', 'winner'], batch_size=BULK_BATCH_SIZE
+    )
+    if changed_games:
+        Game.objects.bulk_update(changed_games.values(), sorted(game_fields), batch_size=BULK_BATCH_SIZE)
+    events.save_pending(changed_games.values())
+    players = stats.record_games(finished)
+    ratings.record_games(finished, players)
+    logger.info("Lote de %s movimientos aplicado: %s rondas nuevas", len(moves), len(new_rounds))
+
+    # Los IDs de las rondas nuevas solo se conocen tras el bulk_create
+    for result, current_round in played:
+        result["round_id"] = current_round.pk
+
+    return results
+
+
+class PlayerError(Exception):
+    """
+    Datos inválidos al crear un juego: jugadores, reglas o estrategia de la CPU
+    """
+
+
+def resolve_player(player_id=None, name=None):
+    """
+    Obtiene el jugador indicado por ID o, si no hay ID, reutiliza (o crea)
+    el jugador con ese nombre normalizado
+
+    Raises:
+        PlayerError: Si el ID no corresponde a ningún jugador
+    """
+    if player_id:
+        try:
+            return Player.objects.get(pk=player_id)
+        except (Player.DoesNotExist, TypeError, ValueError):
+            raise PlayerError(f"Jugador no encontrado: {player_id}")
+    return Player.objects.get_or_create_by_name(name)[0]
+
+
+def resolve_players(data):
+    """
+    Resuelve los dos jugadores de un juego a partir de player1_id/player2_id
+    o player1_name/player2_name. Con bot_strategy, el jugador 2 es la CPU
+    con esa estrategia. Los jugadores indicados por nombre se buscan (y
+    crean) juntos con get_or_create_players.
+
+    Returns:
+        tuple: (jugador 1, jugador 2)
+
+    Raises:
+        PlayerError: Si falta algún jugador, no existe o ambos son el mismo
+    """
+    seats = ('player1', 'player2')
+    strategy = data.get('bot_strategy')
+    if strategy:
+        # Contra la CPU solo se indica el jugador 1
+        if strategy not in bots.STRATEGIES:
+            raise PlayerError(f"Estrategia desconocida. Debe ser una de: {', '.join(bots.STRATEGIES)}")
+        seats = ('player1',)
+
+    requested = []
+    for seat in seats:
+        player_id = data.get(f'{seat}_id')
+        name = data.get(f'{seat}_name')
+        if not player_id and not name:
+            raise PlayerError("Se requieren los nombres de ambos jugadores")
+        requested.append((player_id, name))
+
+    by_handle = get_or_create_players([name for player_id, name in requested if not player_id])
+    players = []
+    for player_id, name in requested:
+        player = resolve_player(player_id) if player_id else by_handle[normalize_handle(name)]
+        if player.is_bot:
+            raise PlayerError("La CPU solo puede jugar como jugador 2 (usa bot_strategy)")
+        players.append(player)
+
+    if strategy:
+        players.append(bots.bot_player(strategy))
+        if not players[1].is_bot:
+            raise PlayerError(f"El nombre {players[1].name} está ocupado por un jugador humano")
+
+    if players[0].pk == players[1].pk:
+        raise PlayerError("Los jugadores deben ser distintos")
+    return tuple(players)
+
+
+@transaction.atomic
+def create_game(data):
+    """
+    Crea un juego, con sus jugadores si no existen, en una sola transacción
+
+    Args:
+        data: Cuerpo de la petición (ver resolve_players y game_options)
+
+    Returns:
+        Game: El juego creado, con sus jugadores asignados
+
+    Raises:
+        PlayerError: Si los jugadores o las opciones no son válidos
+    """
+    options = game_options(data)
+    player1, player2 = resolve_players(data)
+    game = Game.objects.create(player1=player1, player2=player2, is_active=True, **options)
+    # Un juego nuevo no tiene rondas: se serializa sin consultarlas
+    game._prefetched_objects_cache = {'rounds': Round.objects.none()}
+    return game
+
+
+def game_options(data):
+    """
+    Opciones de un juego nuevo, validadas: variante de reglas y estrategia
+    de la CPU (resolve_players valida la estrategia)
+
+    Returns:
+        dict: Campos de Game
+
+    Raises:
+        PlayerError: Si la variante de reglas no existe
+    """
+    rule_set = data.get('rule_set') or rules.DEFAULT_RULE_SET
+    if rule_set not in rules.RULE_SETS:
+        raise PlayerError(f"Reglas desconocidas. Deben ser unas de: {', '.join(rules.RULE_SETS)}")
+    return {'rule_set': rule_set, 'bot_strategy': data.get('bot_strategy') or ''}
+
+
+def get_or_create_players(names):
+    """
+    Versión en bloque de Player.objects.get_or_create_by_name: busca todos
+    los handles en una consulta, inserta los que faltan con un solo
+    bulk_create y recupera sus IDs en otra consulta
+
+    Returns:
+        dict: Jugador por handle normalizado
+    """
+    wanted = {}
+    for name in names:
+        wanted.setdefault(normalize_handle(name), ' '.join(name.split()))
+
+    players = Player.objects.in_bulk(list(wanted), field_name='handle')
+    missing = [handle for handle in wanted if handle not in players]
+    if missing:
+        # ignore_conflicts cubre jugadores creados por peticiones simultáneas
+        Player.objects.bulk_create(
+            [Player(name=wanted[handle], handle=handle) for handle in missing],
+            batch_size=BULK_BATCH_SIZE,
+            ignore_conflicts=True
+        )
+        players.update(Player.objects.in_bulk(missing, field_name='handle'))
+    return players
+
+
+@transaction.atomic
+def create_games(pairs):
+    """
+    Crea muchos juegos de una vez con bulk_create, reutilizando los jugadores
+    existentes: un número constante de consultas en lugar de tres por juego
+
+    Args:
+        pairs: Lista de tuplas (nombre del jugador 1, nombre del jugador 2)
+
+    Returns:
+        list: Juegos creados, con sus jugadores asignados
+
+    Raises:
+        PlayerError: Si en algún par ambos nombres son el mismo jugador
+    """
+    for index, (player1_name, player2_name) in enumerate(pairs):
+        if normalize_handle(player1_name) == normalize_handle(player2_name):
+            raise PlayerError(f"Juego {index}: los jugadores deben ser distintos")
+
+    players = get_or_create_players(name for pair in pairs for name in pair)
+    games = Game.objects.bulk_create(
+        [
+            Game(
+                player1=players[normalize_handle(player1_name)],
+                player2=players[normalize_handle(player2_name)]
+            )
+            for player1_name, player2_name in pairs
+        ],
+        batch_size=BULK_BATCH_SIZE
+    )
+    logger.info("%s juegos creados en bloque", len(games))
+    return games
+
+
+@transaction.atomic
+def touch_player_games(player_id):
+    """
+    Sube la versión de los juegos de un jugador, en curso o archivados,
+    tras un cambio en los datos del jugador que muestran sus payloads
+
+    Returns:
+        list: IDs de los juegos afectados, para borrarlos de la caché
+    """
+    game_ids = []
+    for model in (Game, ArchivedGame):
+        games = model.objects.filter(Q(player1_id=player_id) | Q(player2_id=player_id))
+        game_ids.extend(games.values_list('id', flat=True))
+        games.update(version=F('version') + 1)
+    return game_ids
+
+
+@transaction.atomic
+def restart_game(game_id):
+    """
+    Cierra un juego y crea otro con los mismos jugadores y su primera ronda
+
+    Args:
+        game_id: ID del juego a reiniciar
+
+    Returns:
+        Game: El juego nuevo
+
+    Raises:
+        Game.DoesNotExist: Si el juego no existe
+    """
+    old_game = lock_game(game_id)
+
+    # Asegurarnos de que el juego anterior quede inactivo
+    if old_game.is_active:
+        old_game.is_active = False
+        old_game.save(update_fields=['is_active'] + old_game.bump_version() + events.record_close(old_game))
+        events.save_pending([old_game])
+
+    # Crear nuevo juego con los mismos jugadores
+    new_game = Game.objects.create(
+        player1_id=old_game.player1_id,
+        player2_id=old_game.player2_id,
+        is_active=True,
+        bot_strategy=old_game.bot_strategy,
+        rule_set=old_game.rule_set
+    )
+
+    # Crear la primera ronda del nuevo juego y apuntar el juego a ella
+    first_round = Round.objects.create(game=new_game)
+    new_game.save(update_fields=new_game.set_current_round(first_round))
+
+    logger.info("Juego %s reiniciado como %s", old_game.id, new_game.id)
+    return new_game
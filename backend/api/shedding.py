@@ -0,0 +1,147 @@
+"""
+Descarte de carga (load shedding).
+
+Cuando el proceso está saturado, es mejor rechazar rápido algunas peticiones
+que dejar que todas esperen: LoadSheddingMiddleware responde 503 con
+Retry-After, sin tocar la base de datos, mientras se cumpla alguna de estas
+condiciones:
+
+- Hay settings.SHED_MAX_INFLIGHT peticiones o más en curso en el proceso
+  (la cola de trabajo que espera hilos o conexiones).
+- La latencia media por consulta SQL, una media móvil exponencial de las
+  peticiones recientes (ver api.metrics), supera settings.SHED_DB_LATENCY_MS.
+  Sin peticiones nuevas la media decae con una vida media de HALF_LIFE
+  segundos, así el descarte se levanta solo cuando la base de datos se
+  recupera.
+
+Un 0 en cualquiera de los dos umbrales desactiva esa condición. /metrics no
+se descarta nunca. Los contadores son de cada proceso.
+"""
+import logging
+import threading
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.http import JsonResponse
+
+from . import metrics
+
+logger = logging.getLogger(__name__)
+
+# Peso de cada petición nueva en la media de latencia
+ALPHA = 0.2
+
+# Segundos en que la media de latencia se reduce a la mitad sin peticiones
+HALF_LIFE = 2.0
+
+# Rutas que nunca se descartan
+EXEMPT_PATHS = ('/metrics',)
+
+
+class LoadMonitor:
+    """
+    Peticiones en curso y latencia media por consulta SQL del proceso,
+    seguros entre hilos
+    """
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.inflight = 0
+        self.latency = 0.0
+        self.updated = time.monotonic()
+
+    def db_latency(self, now=None):
+        """
+        Returns:
+            float: Segundos por consulta, con el decaimiento desde la última
+            muestra
+        """
+        now = time.monotonic() if now is None else now
+        return self.latency * 0.5 ** ((now - self.updated) / HALF_LIFE)
+
+    def overload_reason(self):
+        """
+        Returns:
+            str | None: Por qué el proceso está saturado, o None si no lo está
+        """
+        max_inflight = settings.SHED_MAX_INFLIGHT
+        if max_inflight and self.inflight >= max_inflight:
+            return 'inflight'
+        max_latency = settings.SHED_DB_LATENCY_MS
+        if max_latency and self.db_latency() * 1000 >= max_latency:
+            return 'db_latency'
+        return None
+
+    def enter(self):
+        with self.lock:
+            self.inflight += 1
+
+    def exit(self, timings):
+        now = time.monotonic()
+        with self.lock:
+            self.inflight -= 1
+            if timings is not None and timings.queries:
+                sample = timings.db_time / timings.queries
+                self.latency = self.db_latency(now) * (1 - ALPHA) + sample * ALPHA
+                self.updated = now
+
+    def reset(self):
+        with self.lock:
+            self.inflight = 0
+            self.latency = 0.0
+            self.updated = time.monotonic()
+
+
+monitor = LoadMonitor()
+
+
+def shed_response(reason):
+    logger.warning("Petición descartada por sobrecarga (%s)", reason, extra={'reason': reason, 'sampled': True})
+    response = JsonResponse({"error": "Servidor sobrecargado, reintenta más tarde"}, status=503)
+    response['Retry-After'] = str(settings.SHED_RETRY_AFTER)
+    return response
+
+
+class LoadSheddingMiddleware:
+    """
+    Descarta peticiones con un 503 mientras el proceso esté saturado. Va
+    después de MetricsMiddleware, de cuyas mediciones toma la latencia de
+    la base de datos, y de CorsMiddleware, para que el navegador pueda leer
+    el Retry-After.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def check(self, request):
+        if request.path.startswith(EXEMPT_PATHS):
+            return None
+        reason = monitor.overload_reason()
+        return shed_response(reason) if reason else None
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        response = self.check(request)
+        if response is not None:
+            return response
+        monitor.enter()
+        try:
+            return self.get_response(request)
+        finally:
+            monitor.exit(metrics.current.get())
+
+    async def __acall__(self, request):
+        response = self.check(request)
+        if response is not None:
+            return response
+        monitor.enter()
+        try:
+            return await self.get_response(request)
+        finally:
+            monitor.exit(metrics.current.get())
@@ -0,0 +1,220 @@
+"""
+Estadísticas por jugador y clasificación.
+
+PlayerStats se mantiene de forma incremental: al terminar un juego,
+record_games() suma sus rondas a las estadísticas de ambos jugadores dentro
+de la misma transacción que el movimiento final. rebuild_stats() recalcula
+la tabla desde el historial, por bloques de juegos, con la misma lógica;
+el historial incluye los juegos archivados (ver api.archive).
+"""
+import logging
+
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import ArchivedGame, ArchivedRound, Game, PlayerStats, Round
+
+logger = logging.getLogger(__name__)
+
+# Contador de PlayerStats para cada movimiento
+MOVE_FIELDS = {
+    Round.ROCK: 'rock_count',
+    Round.PAPER: 'paper_count',
+    Round.SCISSORS: 'scissors_count',
+    Round.LIZARD: 'lizard_count',
+    Round.SPOCK: 'spock_count',
+}
+
+STAT_FIELDS = [
+    'games_played', 'wins', 'losses', 'rounds_played', 'round_wins',
+    'rock_count', 'paper_count', 'scissors_count', 'lizard_count', 'spock_count',
+    'current_streak', 'best_streak', 'updated_at',
+]
+
+# Filas por INSERT/UPDATE y juegos leídos por bloque al reconstruir
+BATCH_SIZE = 1000
+
+
+def load_rounds(game_ids, archived=False):
+    """
+    Rondas completas de varios juegos, en una consulta
+
+    Args:
+        game_ids: IDs de los juegos
+        archived: Leer las rondas del archivo (ArchivedRound)
+
+    Returns:
+        dict: Lista de (movimiento 1, movimiento 2, ganador) por ID de juego
+    """
+    rounds = {game_id: [] for game_id in game_ids}
+    model = ArchivedRound if archived else Round
+    rows = model.objects.filter(
+        game_id__in=game_ids,
+        player1_move__isnull=False,
+        player2_move__isnull=False
+    ).values_list('game_id', 'player1_move', 'player2_move', 'winner_id')
+    for game_id, player1_move, player2_move, winner_id in rows:
+        rounds[game_id].append((player1_move, player2_move, winner_id))
+    return rounds
+
+
+def add_game(stats, game, rounds):
+    """
+    Suma un juego terminado a las estadísticas de sus jugadores. No guarda.
+
+    Args:
+        stats: PlayerStats por ID de jugador; deben estar los dos jugadores
+        game: Juego terminado
+        rounds: Rondas completas del juego, como las devuelve load_rounds
+    """
+    for player_id, seat in ((game.player1_id, 0), (game.player2_id, 1)):
+        player_stats = stats[player_id]
+        player_stats.games_played += 1
+        player_stats.rounds_played += len(rounds)
+        for round_moves in rounds:
+            field = MOVE_FIELDS[round_moves[seat]]
+            setattr(player_stats, field, getattr(player_stats, field) + 1)
+            if round_moves[2] == player_id:
+                player_stats.round_wins += 1
+
+        if game.winner_id == player_id:
+            player_stats.wins += 1
+            player_stats.current_streak += 1
+            player_stats.best_streak = max(player_stats.best_streak, player_stats.current_streak)
+        else:
+            player_stats.losses += 1
+            player_stats.current_streak = 0
+
+
+def record_games(games):
+    """
+    Suma juegos recién terminados a PlayerStats. Debe llamarse dentro de la
+    transacción que los termina.
+
+    Las filas de estadísticas se bloquean en orden de jugador, junto con las
+    de sus jugadores, así dos juegos que terminan a la vez con un jugador en
+    común se aplican uno detrás de otro. Son cuatro consultas sea cual sea
+    el número de juegos.
+
+    Args:
+        games: Juegos terminados, en el orden en que terminaron
+
+    Returns:
+        dict: Jugadores bloqueados por ID, para ratings.record_games
+    """
+    games = [game for game in games if game.winner_id]
+    if not games:
+        return {}
+
+    player_ids = sorted({game.player1_id for game in games} | {game.player2_id for game in games})
+    PlayerStats.objects.bulk_create(
+        [PlayerStats(player_id=player_id) for player_id in player_ids],
+        ignore_conflicts=True
+    )
+    stats = {
+        player_stats.player_id: player_stats
+        for player_stats in PlayerStats.objects.select_for_update(of=('self', 'player')).select_related(
+            'player'
+        ).filter(player_id__in=player_ids).order_by('player_id')
+    }
+
+    rounds = load_rounds([game.pk for game in games])
+    for game in games:
+        add_game(stats, game, rounds[game.pk])
+
+    now = timezone.now()
+    for player_stats in stats.values():
+        player_stats.updated_at = now
+    PlayerStats.objects.bulk_update(stats.values(), STAT_FIELDS, batch_size=BATCH_SIZE)
+    return {player_id: player_stats.player for player_id, player_stats in stats.items()}
+
+
+def finished_games(player_ids=None, archived=False):
+    """
+    Juegos terminados con ganador, en el orden en que terminaron (el de su
+    última ronda)
+
+    Args:
+        player_ids: Solo los juegos de estos jugadores (None: todos)
+        archived: Leer los juegos del archivo (ArchivedGame)
+    """
+    if archived:
+        games = ArchivedGame.objects.filter(winner__isnull=False)
+        finished_at = 'finished_at'
+    else:
+        games = Game.objects.filter(is_active=False, winner__isnull=False)
+        finished_at = 'current_round__created_at'
+    if player_ids is not None:
+        games = games.filter(Q(player1_id__in=player_ids) | Q(player2_id__in=player_ids))
+    return games.only('id', 'player1_id', 'player2_id', 'winner_id').order_by(finished_at, 'id')
+
+
+@transaction.atomic
+def rebuild_stats(player_ids=None, chunk_size=BATCH_SIZE):
+    """
+    Recalcula PlayerStats desde el historial. Los juegos se leen por bloques
+    de chunk_size, con una consulta de rondas por bloque, y las filas se
+    reescriben en lotes.
+
+    Args:
+        player_ids: Limitar el recálculo a estos jugadores (None: todos)
+        chunk_size: Juegos por bloque
+
+    Returns:
+        int: Número de jugadores con estadísticas
+    """
+    stats = {}
+    chunk = []
+
+    def flush(archived):
+        rounds = load_rounds([game.pk for game in chunk], archived=archived)
+        for game in chunk:
+            for player_id in (game.player1_id, game.player2_id):
+                if player_id not in stats:
+                    stats[player_id] = PlayerStats(player_id=player_id)
+            add_game(stats, game, rounds[game.pk])
+        chunk.clear()
+
+    # Los juegos archivados terminaron antes que los que siguen en Game
+    for archived in (True, False):
+        for game in finished_games(player_ids, archived).iterator(chunk_size=chunk_size):
+            chunk.append(game)
+            if len(chunk) >= chunk_size:
+                flush(archived)
+        flush(archived)
+
+    if player_ids is not None:
+        # Los rivales de estos jugadores conservan sus estadísticas
+        stats = {player_id: stats[player_id] for player_id in player_ids if player_id in stats}
+        PlayerStats.objects.filter(player_id__in=player_ids).delete()
+    else:
+        PlayerStats.objects.all().delete()
+
+    now = timezone.now()
+    for player_stats in stats.values():
+        player_stats.updated_at = now
+    PlayerStats.objects.bulk_create(stats.values(), batch_size=BATCH_SIZE)
+    logger.info("Estadísticas recalculadas para %s jugadores", len(stats))
+    return len(stats)
+
+
+# Órdenes de la clasificación: por victorias (stats_leaderboard_idx) o por
+# rating (player_rating_idx)
+LEADERBOARD_ORDERINGS = {
+    'wins': ('-wins', '-round_wins', 'player_id'),
+    'rating': ('-player__rating', 'player_id'),
+}
+
+
+def leaderboard(limit, by='wins'):
+    """
+    Los limit mejores jugadores humanos con algún juego terminado
+
+    Args:
+        limit: Jugadores devueltos
+        by: Orden, una clave de LEADERBOARD_ORDERINGS
+    """
+    return PlayerStats.objects.select_related('player').filter(player__is_bot=False).order_by(
+        *LEADERBOARD_ORDERINGS[by]
+    )[:limit]
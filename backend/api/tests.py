@@ -1,7 +1,68 @@
-from django.test import TestCase
+import importlib
+import io
+import json
+import logging
+import os
+import sys
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone as dt_timezone
+from io import StringIO
+from unittest import mock, skipUnless
+
+import numpy as np
+from asgiref.sync import async_to_sync, sync_to_async
+from django.apps import apps
+from channels.routing import URLRouter
+from channels.testing import WebsocketCommunicator
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.http import HttpResponse
+from django.db.models import Q
+from django.test import Client, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
 from rest_framework.test import APITestCase
 from rest_framework import status
-from .models import Player, Game, Round
+from benchmarks.data import seed_data
+from benchmarks.matchmaking import run_matchmaking_benchmark
+from benchmarks.serialization import run_serialization_benchmark
+from benchmarks.suite import compare, run_suite
+from . import analytics, bots, events, idempotency, matchmaking, metrics, ratings, rules
+from .log import JsonFormatter, QueuedHandler, SampleFilter
+from .renderers import FastJSONRenderer
+from .serializers import GameSummarySerializer, PlayerSerializer
+from .archive import archive_games
+from .cache import cache_game, game_etag, get_cached_game
+from .export import read_columnar
+from .models import ArchivedGame, ArchivedRound, GameSnapshot, MoveEvent, Player, PlayerStats, Game, Round
+from .routing import websocket_urlpatterns
+from .services import MoveError, apply_move
+from .shedding import HALF_LIFE, monitor
+from .throttling import TokenBucket
+
+# Las pruebas hacen muchas peticiones seguidas con el mismo jugador y la
+# misma IP: los límites por cliente solo se activan en ThrottleTests
+NO_THROTTLING = override_settings(
+    REST_FRAMEWORK={**settings.REST_FRAMEWORK, 'DEFAULT_THROTTLE_RATES': {}}
+)
+
+
+def setUpModule():
+    NO_THROTTLING.enable()
+
+
+def tearDownModule():
+    NO_THROTTLING.disable()
+
+
+def throttle_rates(**rates):
+    return override_settings(REST_FRAMEWORK={**settings.REST_FRAMEWORK, 'DEFAULT_THROTTLE_RATES': rates})
+
 
 class GameTests(APITestCase):
     def setUp(self):
@@ -188,3 +249,2232 @@ class GameTests(APITestCase):
         }
         response = self.client.post(f'/api/games/{game_id}/make_move/', move_data, format='json')
         self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+
+class GameQueryCountTests(APITestCase):
+    """
+    Verifica que las lecturas de juegos usan un número constante de consultas
+    """
+    def setUp(self):
+        cache.clear()
+
+    def create_games(self, count, rounds_per_game):
+        # Los nombres de jugador son únicos: se numeran a partir de los ya creados
+        offset = Game.objects.count()
+        for i in range(offset, offset + count):
+            player1 = Player.objects.create(name=f"Jugador {i}A")
+            player2 = Player.objects.create(name=f"Jugador {i}B")
+            game = Game.objects.create(player1=player1, player2=player2)
+            for _ in range(rounds_per_game):
+                Round.objects.create(
+                    game=game,
+                    player1_move=Round.ROCK,
+                    player2_move=Round.SCISSORS,
+                    winner=player1
+                )
+            # Un juego terminado también debe serializarse sin consultas extra
+            if i % 2:
+                game.winner = player1
+                game.is_active = False
+                game.save()
+
+    def count_queries(self, url):
+        # Se mide el camino a base de datos, no la caché de juegos
+        cache.clear()
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return len(context.captured_queries)
+
+    def test_list_query_count_is_constant(self):
+        self.create_games(1, 1)
+        baseline = self.count_queries('/api/games/')
+
+        self.create_games(20, 5)
+        self.assertEqual(self.count_queries('/api/games/'), baseline)
+
+    def test_retrieve_query_count_is_constant(self):
+        self.create_games(1, 1)
+        game = Game.objects.get()
+        baseline = self.count_queries(f'/api/games/{game.id}/')
+
+        for _ in range(10):
+            Round.objects.create(game=game, player1_move=Round.ROCK, player2_move=Round.ROCK)
+        self.assertEqual(self.count_queries(f'/api/games/{game.id}/'), baseline)
+
+    def test_restarted_game_is_listed(self):
+        """
+        Un juego reiniciado queda inactivo sin ganador y debe poder listarse
+        """
+        self.create_games(1, 0)
+        game = Game.objects.get()
+        self.client.post(f'/api/games/{game.id}/restart_game/', {}, format='json')
+
+        response = self.client.get(f'/api/games/{game.id}/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['status'], "Juego terminado")
+
+
+class GameListTests(APITestCase):
+    """
+    Pruebas de paginación y filtros de los listados
+    """
+    def setUp(self):
+        cache.clear()
+        self.player1 = Player.objects.create(name="Jugador 1")
+        self.player2 = Player.objects.create(name="Jugador 2")
+        self.player3 = Player.objects.create(name="Jugador 3")
+
+    def test_list_is_cursor_paginated(self):
+        for _ in range(5):
+            Game.objects.create(player1=self.player1, player2=self.player2)
+
+        response = self.client.get('/api/games/?page_size=2')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data['results']), 2)
+        self.assertIsNone(response.data['previous'])
+
+        seen = [game['id'] for game in response.data['results']]
+        next_url = response.data['next']
+        while next_url:
+            response = self.client.get(next_url)
+            seen.extend(game['id'] for game in response.data['results'])
+            next_url = response.data['next']
+
+        # Todos los juegos, del más reciente al más antiguo, sin repetir
+        expected = list(Game.objects.order_by('-created_at', '-id').values_list('id', flat=True))
+        self.assertEqual(seen, expected)
+
+    def test_list_omits_rounds(self):
+        game = Game.objects.create(player1=self.player1, player2=self.player2)
+        Round.objects.create(game=game)
+
+        response = self.client.get('/api/games/')
+        self.assertNotIn('rounds', response.data['results'][0])
+
+        response = self.client.get(f'/api/games/{game.id}/')
+        self.assertEqual(len(response.data['rounds']), 1)
+
+    def test_filter_by_status_and_player(self):
+        active = Game.objects.create(player1=self.player1, player2=self.player2)
+        finished = Game.objects.create(
+            player1=self.player2, player2=self.player3,
+            winner=self.player3, is_active=False
+        )
+
+        response = self.client.get('/api/games/?is_active=false')
+        self.assertEqual([game['id'] for game in response.data['results']], [finished.id])
+
+        response = self.client.get(f'/api/games/?player={self.player1.id}')
+        self.assertEqual([game['id'] for game in response.data['results']], [active.id])
+
+        response = self.client.get(f'/api/games/?player={self.player2.id}&is_active=true')
+        self.assertEqual([game['id'] for game in response.data['results']], [active.id])
+
+    def test_filter_by_date_range(self):
+        old_game = Game.objects.create(player1=self.player1, player2=self.player2)
+        Game.objects.filter(pk=old_game.pk).update(
+            created_at=datetime(2020, 1, 15, 12, tzinfo=dt_timezone.utc)
+        )
+        new_game = Game.objects.create(player1=self.player1, player2=self.player2)
+
+        response = self.client.get('/api/games/?created_before=2020-01-15')
+        self.assertEqual([game['id'] for game in response.data['results']], [old_game.id])
+
+        response = self.client.get('/api/games/?created_after=2020-01-16')
+        self.assertEqual([game['id'] for game in response.data['results']], [new_game.id])
+
+    def test_invalid_filters(self):
+        for query in ('is_active=maybe', 'player=abc', 'created_after=ayer'):
+            response = self.client.get(f'/api/games/?{query}')
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_players_are_paginated(self):
+        response = self.client.get('/api/players/?page_size=2')
+        self.assertEqual(len(response.data['results']), 2)
+        self.assertIsNotNone(response.data['next'])
+
+
+class MoveWriteTests(APITestCase):
+    """
+    Verifica que cada movimiento se aplica con como mucho dos escrituras,
+    más la inserción en el registro de eventos
+    """
+    def setUp(self):
+        self.player1 = Player.objects.create(name="Jugador 1")
+        self.player2 = Player.objects.create(name="Jugador 2")
+        self.game = Game.objects.create(player1=self.player1, player2=self.player2)
+
+    def count_writes(self, player_id, movement):
+        with CaptureQueriesContext(connection) as context:
+            apply_move(self.game.id, player_id, movement)
+        return sum(
+            1 for query in context.captured_queries
+            if query['sql'].startswith(('INSERT', 'UPDATE')) and 'api_moveevent' not in query['sql']
+        )
+
+    def test_move_writes(self):
+        # Primer movimiento: se inserta la ronda y se apunta el juego a ella
+        self.assertEqual(self.count_writes(self.player1.id, Round.ROCK), 2)
+        # Segundo movimiento con ganador: ronda y marcador
+        self.assertEqual(self.count_writes(self.player2.id, Round.SCISSORS), 2)
+        # Empate: ronda y versión del juego
+        self.count_writes(self.player1.id, Round.ROCK)
+        self.assertEqual(self.count_writes(self.player2.id, Round.ROCK), 2)
+
+        self.game.refresh_from_db()
+        self.assertEqual(self.game.player1_score, 1)
+        self.assertEqual(Round.objects.filter(game=self.game).count(), 2)
+
+    def test_game_ends_in_same_write(self):
+        for _ in range(Game.WINNING_SCORE):
+            apply_move(self.game.id, self.player1.id, Round.PAPER)
+            apply_move(self.game.id, self.player2.id, Round.ROCK)
+
+        self.game.refresh_from_db()
+        self.assertFalse(self.game.is_active)
+        self.assertEqual(self.game.winner, self.player1)
+        with self.assertRaises(MoveError):
+            apply_move(self.game.id, self.player1.id, Round.PAPER)
+
+
+@skipUnless(connection.features.has_select_for_update, "Requiere SELECT ... FOR UPDATE")
+class ConcurrentMoveTests(TransactionTestCase):
+    """
+    Dispara movimientos en paralelo contra un mismo juego y verifica que el
+    marcador y las rondas quedan consistentes
+    """
+    THREADS = 8
+
+    def setUp(self):
+        self.player1 = Player.objects.create(name="Jugador 1")
+        self.player2 = Player.objects.create(name="Jugador 2")
+        self.game = Game.objects.create(player1=self.player1, player2=self.player2)
+
+    def post_concurrently(self, player_id, movement):
+        barrier = threading.Barrier(self.THREADS)
+
+        def post(_):
+            barrier.wait()
+            try:
+                response = Client().post(
+                    f'/api/games/{self.game.id}/make_move/',
+                    {"player_id": player_id, "movement": movement},
+                    content_type='application/json'
+                )
+                return response.status_code
+            finally:
+                connection.close()
+
+        with ThreadPoolExecutor(max_workers=self.THREADS) as executor:
+            return list(executor.map(post, range(self.THREADS)))
+
+    def test_parallel_moves_keep_scores_consistent(self):
+        for played in range(1, Game.WINNING_SCORE + 1):
+            codes = self.post_concurrently(self.player1.id, Round.ROCK)
+            self.assertEqual(codes.count(status.HTTP_200_OK), 1)
+
+            codes = self.post_concurrently(self.player2.id, Round.SCISSORS)
+            self.assertEqual(codes.count(status.HTTP_200_OK), 1)
+
+            self.assertEqual(Round.objects.filter(game=self.game).count(), played)
+
+        self.game.refresh_from_db()
+        self.assertEqual(self.game.player1_score, Game.WINNING_SCORE)
+        self.assertEqual(self.game.player2_score, 0)
+        self.assertFalse(self.game.is_active)
+
+
+class CurrentRoundTests(APITestCase):
+    """
+    Verifica el puntero a la ronda en curso y el contador de rondas
+    """
+    def setUp(self):
+        self.player1 = Player.objects.create(name="Jugador 1")
+        self.player2 = Player.objects.create(name="Jugador 2")
+        self.game = Game.objects.create(player1=self.player1, player2=self.player2)
+
+    def test_moves_maintain_current_round(self):
+        apply_move(self.game.id, self.player1.id, Round.ROCK)
+        self.game.refresh_from_db()
+        first_round = self.game.current_round
+        self.assertEqual(first_round.player1_move, Round.ROCK)
+        self.assertEqual(self.game.round_count, 1)
+
+        apply_move(self.game.id, self.player2.id, Round.ROCK)
+        self.game.refresh_from_db()
+        self.assertEqual(self.game.current_round, first_round)
+
+        apply_move(self.game.id, self.player1.id, Round.PAPER)
+        self.game.refresh_from_db()
+        self.assertNotEqual(self.game.current_round, first_round)
+        self.assertEqual(self.game.round_count, 2)
+
+    def test_move_does_not_sort_rounds(self):
+        apply_move(self.game.id, self.player1.id, Round.ROCK)
+        with CaptureQueriesContext(connection) as context:
+            apply_move(self.game.id, self.player2.id, Round.PAPER)
+        self.assertFalse(any('ORDER BY' in query['sql'] for query in context.captured_queries))
+
+    def test_restart_points_to_first_round(self):
+        response = self.client.post(f'/api/games/{self.game.id}/restart_game/', {}, format='json')
+        new_game = Game.objects.get(pk=response.data['id'])
+        self.assertEqual(new_game.round_count, 1)
+        self.assertEqual(new_game.current_round.game_id, new_game.id)
+
+        # La primera ronda creada al reiniciar es la que recibe el movimiento
+        apply_move(new_game.id, self.player1.id, Round.ROCK)
+        self.assertEqual(Round.objects.filter(game=new_game).count(), 1)
+
+
+class GameCacheTests(APITestCase):
+    """
+    Pruebas de la caché de juegos y de las peticiones condicionales
+    """
+    def setUp(self):
+        cache.clear()
+        self.player1 = Player.objects.create(name="Jugador 1")
+        self.player2 = Player.objects.create(name="Jugador 2")
+        self.game = Game.objects.create(player1=self.player1, player2=self.player2)
+        self.url = f'/api/games/{self.game.id}/'
+
+    def move(self, player, movement):
+        return self.client.post(f'{self.url}make_move/', {
+            "player_id": player.id,
+            "movement": movement
+        }, format='json')
+
+    def test_cached_retrieve_skips_database(self):
+        first = self.client.get(self.url)
+        etag = first['ETag']
+
+        with self.assertNumQueries(0):
+            response = self.client.get(self.url)
+        self.assertEqual(response.data, first.data)
+        self.assertEqual(response['ETag'], etag)
+
+        with self.assertNumQueries(0):
+            response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_make_move_writes_through(self):
+        etag = self.client.get(self.url)['ETag']
+
+        move_response = self.move(self.player1, Round.ROCK)
+        self.assertNotEqual(move_response['ETag'], etag)
+
+        # El sondeo siguiente ve el movimiento sin ir a la base de datos
+        with self.assertNumQueries(0):
+            response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data, move_response.data)
+        self.assertEqual(response['ETag'], move_response['ETag'])
+
+    def test_restart_invalidates_old_game(self):
+        self.client.get(self.url)
+        response = self.client.post(f'{self.url}restart_game/', {}, format='json')
+
+        new_game = self.client.get(f"/api/games/{response.data['id']}/")
+        self.assertTrue(new_game.data['is_active'])
+        old_game = self.client.get(self.url)
+        self.assertFalse(old_game.data['is_active'])
+
+    def test_update_locks_and_bumps_version(self):
+        etag = self.client.get(self.url)['ETag']
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.patch(self.url, {"is_active": False}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['version'], 2)
+        if connection.features.has_select_for_update:
+            self.assertTrue(any('FOR UPDATE' in query['sql'] for query in context.captured_queries))
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertFalse(response.data['is_active'])
+        self.assertEqual(self.client.patch(self.url, {"is_active": True}, format='json').data['version'], 3)
+
+    def test_player_rename_invalidates_games(self):
+        etag = self.client.get(self.url)['ETag']
+        other = Game.objects.create(player1=self.player2, player2=Player.objects.create(name="Jugador 3"))
+        response = self.client.patch(f'/api/players/{self.player1.id}/', {"name": "Ana"}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['player1']['name'], "Ana")
+        self.assertEqual(response.data['version'], 2)
+        # Los juegos de otros jugadores no cambian, ni un nombre repetido
+        other.refresh_from_db()
+        self.assertEqual(other.version, 1)
+        self.client.patch(f'/api/players/{self.player1.id}/', {"name": "Ana"}, format='json')
+        self.assertEqual(self.client.get(self.url).data['version'], 2)
+
+    def test_stale_version_does_not_overwrite(self):
+        cache_game(self.game.id, 5, {"version": 5})
+        cache_game(self.game.id, 4, {"version": 4})
+        self.assertEqual(get_cached_game(self.game.id), (5, {"version": 5}))
+
+    def test_missing_game(self):
+        response = self.client.get('/api/games/999999/')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class GameWebSocketTests(TransactionTestCase):
+    """
+    Pruebas del canal WebSocket de actualizaciones en vivo
+    """
+    def setUp(self):
+        cache.clear()
+        self.player1 = Player.objects.create(name="Jugador 1")
+        self.player2 = Player.objects.create(name="Jugador 2")
+        self.game = Game.objects.create(player1=self.player1, player2=self.player2)
+
+    def connect(self, game_id):
+        communicator = WebsocketCommunicator(
+            URLRouter(websocket_urlpatterns), f'/ws/games/{game_id}/'
+        )
+        return communicator
+
+    async def test_receives_state_and_moves(self):
+        communicator = self.connect(self.game.id)
+        connected, _ = await communicator.connect()
+        self.assertTrue(connected)
+
+        message = await communicator.receive_json_from()
+        self.assertEqual(message['event'], 'game.update')
+        self.assertEqual(message['game']['id'], self.game.id)
+
+        response = await sync_to_async(self.client.post)(
+            f'/api/games/{self.game.id}/make_move/',
+            {"player_id": self.player1.id, "movement": "ROCK"},
+            content_type='application/json'
+        )
+        message = await communicator.receive_json_from()
+        self.assertEqual(message['event'], 'game.update')
+        self.assertEqual(message['game'], json.loads(response.content))
+
+        await communicator.disconnect()
+
+    async def test_restart_announces_new_game(self):
+        communicator = self.connect(self.game.id)
+        await communicator.connect()
+        await communicator.receive_json_from()
+
+        response = await sync_to_async(self.client.post)(
+            f'/api/games/{self.game.id}/restart_game/', {}, content_type='application/json'
+        )
+        message = await communicator.receive_json_from()
+        self.assertEqual(message['event'], 'game.restarted')
+        self.assertEqual(message['game']['id'], json.loads(response.content)['id'])
+
+        await communicator.disconnect()
+
+    async def test_unknown_game_is_rejected(self):
+        communicator = self.connect(999999)
+        connected, code = await communicator.connect()
+        self.assertFalse(connected)
+        self.assertEqual(code, 4404)
+
+
+class AsyncGameViewTests(TransactionTestCase):
+    """
+    Pruebas de las variantes asíncronas de los endpoints de juego
+    """
+    def setUp(self):
+        cache.clear()
+
+    async def create_game(self):
+        response = await self.async_client.post('/api/async/create-game/', {
+            "player1_name": "Jugador 1",
+            "player2_name": "Jugador 2"
+        }, content_type='application/json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.json()
+
+    async def move(self, game_id, player_id, movement):
+        return await self.async_client.post(
+            f'/api/async/games/{game_id}/make_move/',
+            {"player_id": player_id, "movement": movement},
+            content_type='application/json'
+        )
+
+    async def test_async_game_flow(self):
+        game = await self.create_game()
+        player1_id = game['player1']['id']
+        player2_id = game['player2']['id']
+
+        for _ in range(Game.WINNING_SCORE):
+            response = await self.move(game['id'], player1_id, "PAPER")
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            response = await self.move(game['id'], player2_id, "ROCK")
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        data = response.json()
+        self.assertFalse(data['is_active'])
+        self.assertEqual(data['winner']['id'], player1_id)
+
+        # Las dos rutas de lectura devuelven lo mismo
+        response = await self.async_client.get(f"/api/async/games/{game['id']}/")
+        self.assertEqual(response.json(), data)
+        sync_response = await sync_to_async(self.client.get)(f"/api/games/{game['id']}/")
+        self.assertEqual(json.loads(sync_response.content), data)
+
+    async def test_async_validation(self):
+        game = await self.create_game()
+
+        response = await self.move(game['id'], game['player1']['id'], "INVALID")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        response = await self.move(game['id'], game['player2']['id'], "ROCK")
+        self.assertEqual(response.json(), {"error": "Es el turno del Jugador 1"})
+
+        response = await self.move(999999, game['player1']['id'], "ROCK")
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+        response = await self.async_client.post('/api/async/create-game/', {}, content_type='application/json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        response = await self.async_client.get('/api/async/create-game/')
+        self.assertEqual(response.status_code, status.HTTP_405_METHOD_NOT_ALLOWED)
+
+    async def test_async_unexpected_error(self):
+        game = await self.create_game()
+        with mock.patch('api.services.apply_move', side_effect=RuntimeError("fallo")), \
+                self.assertLogs('api.async_views', 'CRITICAL'):
+            response = await self.move(game['id'], game['player1']['id'], "ROCK")
+        self.assertEqual(response.status_code, status.HTTP_500_INTERNAL_SERVER_ERROR)
+        self.assertEqual(response.json(), {"error": "Error interno del servidor"})
+
+    async def test_async_detail_etag(self):
+        game = await self.create_game()
+        url = f"/api/async/games/{game['id']}/"
+
+        response = await self.async_client.get(url)
+        response = await self.async_client.get(url, headers={'If-None-Match': response['ETag']})
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        response = await self.async_client.get('/api/async/games/999999/')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    async def test_export_streams_under_asgi(self):
+        await self.create_game()
+        response = await self.async_client.get('/api/export/games/?format=csv')
+        self.assertTrue(response.is_async)
+
+        chunks = [chunk async for chunk in response.streaming_content]
+        self.assertEqual(len(b''.join(chunks).decode().splitlines()), 2)
+
+    async def test_async_move_delta(self):
+        game = await self.create_game()
+        response = await self.async_client.post(
+            f"/api/async/games/{game['id']}/make_move/?delta=1",
+            {"player_id": game['player1']['id'], "movement": "ROCK"},
+            content_type='application/json'
+        )
+        data = response.json()
+        self.assertEqual(data['version'], game['version'] + 1)
+        self.assertEqual(data['round']['player1_move'], "ROCK")
+        self.assertNotIn('rounds', data)
+
+    async def test_async_metrics_count_queries(self):
+        metrics.registry.clear()
+        game = await self.create_game()
+        response = await self.move(game['id'], game['player1']['id'], "ROCK")
+
+        # Las consultas se ejecutan en el hilo de sync_to_async
+        self.assertRegex(response['Server-Timing'], r'db;dur=[\d.]+;desc="[1-9]\d* consultas"')
+        stats = metrics.registry.endpoints['POST', 'async-make-move']
+        self.assertEqual(stats.requests, 1)
+        self.assertGreater(stats.queries, 0)
+
+
+class BenchmarkSuiteTests(APITestCase):
+    """
+    Verifica que la suite de benchmarks corre y detecta regresiones
+    """
+    def setUp(self):
+        cache.clear()
+
+    def test_seed_is_reproducible(self):
+        counts = seed_data(players=10, games=20, rounds_per_game=4, seed=7)
+        self.assertEqual(counts['games'], 20)
+        self.assertEqual(Round.objects.count(), counts['rounds'])
+        game = Game.objects.exclude(current_round=None).first()
+        self.assertEqual(game.round_count, game.rounds.count())
+
+        scores = list(Game.objects.order_by('id').values_list('player1_score', 'player2_score'))
+        Game.objects.all().delete()
+        Player.objects.all().delete()
+        seed_data(players=10, games=20, rounds_per_game=4, seed=7)
+        self.assertEqual(list(Game.objects.order_by('id').values_list('player1_score', 'player2_score')), scores)
+
+    def test_suite_and_comparison(self):
+        seed_data(players=10, games=20, rounds_per_game=4)
+        results = run_suite(iterations=3)
+        self.assertEqual(results['retrieve_cached']['queries_max'], 0)
+        self.assertEqual(compare(results, {'results': results}), [])
+
+        baseline = {'results': {'make_move': dict(results['make_move'], queries_max=1)}}
+        self.assertEqual(len(compare(results, baseline)), 1)
+
+    @throttle_rates(ip='100/s', player='5/s')
+    def test_suite_runs_with_default_throttles(self):
+        # Las tasas por defecto de settings; la suite las desactiva
+        seed_data(players=10, games=20, rounds_per_game=4)
+        results = run_suite(iterations=30)
+        self.assertEqual(results['make_move']['requests'], 30)
+
+    def test_serialization_benchmark(self):
+        seed_data(players=10, games=30, rounds_per_game=3)
+        results = run_serialization_benchmark(limit=20, repeat=1)
+        self.assertTrue(results['identical'])
+        self.assertEqual(results['games'], 20)
+
+
+class BulkEndpointTests(APITestCase):
+    """
+    Pruebas de la creación de juegos en bloque y de los movimientos por lotes
+    """
+    def setUp(self):
+        cache.clear()
+
+    def create_games(self, count):
+        response = self.client.post('/api/games/bulk/', {
+            "games": [
+                {"player1_name": f"Bot {i}A", "player2_name": f"Bot {i}B"}
+                for i in range(count)
+            ]
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        return response.data
+
+    def test_bulk_create_uses_constant_queries(self):
+        with CaptureQueriesContext(connection) as small:
+            self.create_games(2)
+        with CaptureQueriesContext(connection) as large:
+            games = self.create_games(50)
+
+        self.assertEqual(len(large.captured_queries), len(small.captured_queries))
+        self.assertEqual(Game.objects.count(), 52)
+        self.assertEqual(games[0]['player1']['name'], "Bot 0A")
+        self.assertNotIn('rounds', games[0])
+
+    def test_bulk_create_validation(self):
+        response = self.client.post('/api/games/bulk/', {"games": []}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        response = self.client.post('/api/games/bulk/', {
+            "games": [{"player1_name": "Bot A"}]
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(Game.objects.count(), 0)
+
+    def test_batch_move_plays_many_games(self):
+        games = self.create_games(10)
+        moves = []
+        for _ in range(Game.WINNING_SCORE):
+            for game in games:
+                moves.append({"game_id": game['id'], "player_id": game['player1']['id'], "movement": "ROCK"})
+                moves.append({"game_id": game['id'], "player_id": game['player2']['id'], "movement": "SCISSORS"})
+
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.post('/api/games/batch_move/', {"moves": moves}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        # Constante: una de ellas actualiza el rating de los jugadores
+        # (bloqueados junto a sus estadísticas) y otra inserta los eventos
+        # de todos los movimientos
+        self.assertLess(len(context.captured_queries), 12)
+
+        results = response.data['results']
+        self.assertTrue(all(result['status'] == 200 for result in results))
+        self.assertFalse(results[-1]['is_active'])
+
+        for game in Game.objects.all():
+            self.assertEqual(game.player1_score, Game.WINNING_SCORE)
+            self.assertEqual(game.winner_id, game.player1_id)
+            self.assertEqual(game.round_count, Game.WINNING_SCORE)
+            self.assertEqual(game.rounds.count(), Game.WINNING_SCORE)
+            self.assertEqual(game.current_round, game.rounds.order_by('-created_at', '-id').first())
+
+    def test_batch_move_matches_single_moves(self):
+        games = self.create_games(2)
+        batch_game, single_game = games
+        sequence = [("player1", "ROCK"), ("player2", "ROCK"), ("player1", "PAPER"), ("player2", "ROCK")]
+
+        self.client.post('/api/games/batch_move/', {"moves": [
+            {"game_id": batch_game['id'], "player_id": batch_game[player]['id'], "movement": movement}
+            for player, movement in sequence
+        ]}, format='json')
+        for player, movement in sequence:
+            apply_move(single_game['id'], single_game[player]['id'], movement)
+
+        batch = Game.objects.get(pk=batch_game['id'])
+        single = Game.objects.get(pk=single_game['id'])
+        for field in ('player1_score', 'player2_score', 'round_count', 'version', 'is_active'):
+            self.assertEqual(getattr(batch, field), getattr(single, field))
+        self.assertEqual(
+            list(batch.rounds.order_by('id').values_list('player1_move', 'player2_move')),
+            list(single.rounds.order_by('id').values_list('player1_move', 'player2_move'))
+        )
+
+    def test_batch_move_reports_errors_per_item(self):
+        game = self.create_games(1)[0]
+        response = self.client.post('/api/games/batch_move/', {"moves": [
+            {"game_id": game['id'], "player_id": game['player2']['id'], "movement": "ROCK"},
+            {"game_id": game['id'], "player_id": game['player1']['id'], "movement": "ROCK"},
+            {"game_id": game['id'], "player_id": game['player1']['id'], "movement": "LIZARD"},
+            {"game_id": 999999, "player_id": game['player1']['id'], "movement": "ROCK"},
+            {"game_id": True, "player_id": game['player2']['id'], "movement": "ROCK"},
+        ]}, format='json')
+
+        results = response.data['results']
+        self.assertEqual([result['status'] for result in results], [400, 200, 400, 404, 400])
+        self.assertEqual(results[0]['error'], "Es el turno del Jugador 1")
+        self.assertEqual(results[4]['error'], "Se requiere el ID del juego")
+        self.assertIsNotNone(results[1]['round_id'])
+        self.assertEqual(Round.objects.count(), 1)
+
+    def test_batch_move_invalidates_cache(self):
+        game = self.create_games(1)[0]
+        url = f"/api/games/{game['id']}/"
+        self.client.get(url)
+
+        self.client.post('/api/games/batch_move/', {"moves": [
+            {"game_id": game['id'], "player_id": game['player1']['id'], "movement": "ROCK"},
+        ]}, format='json')
+        response = self.client.get(url)
+        self.assertEqual(response.data['rounds'][0]['player1_move'], "ROCK")
+
+
+class PlayerReuseTests(APITestCase):
+    """
+    Pruebas de la reutilización de jugadores por nombre normalizado y de la
+    fusión de duplicados
+    """
+    def test_create_game_reuses_players_by_name(self):
+        first = self.client.post('/api/create-game/', {
+            "player1_name": "Ana",
+            "player2_name": "Luis"
+        }, format='json')
+        second = self.client.post('/api/create-game/', {
+            "player1_name": "  ANA ",
+            "player2_name": "Marta"
+        }, format='json')
+
+        self.assertEqual(second.status_code, status.HTTP_200_OK)
+        self.assertEqual(second.data['player1']['id'], first.data['player1']['id'])
+        self.assertEqual(Player.objects.count(), 3)
+
+    def test_create_game_with_player_ids(self):
+        ana = Player.objects.create(name="Ana")
+        luis = Player.objects.create(name="Luis")
+
+        response = self.client.post('/api/create-game/', {
+            "player1_id": ana.id,
+            "player2_id": luis.id
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['player2']['id'], luis.id)
+        self.assertEqual(Player.objects.count(), 2)
+
+        response = self.client.post('/api/create-game/', {
+            "player1_id": ana.id,
+            "player2_id": 9999
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_create_game_rejects_same_player(self):
+        response = self.client.post('/api/create-game/', {
+            "player1_name": "Ana",
+            "player2_name": "ana"
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data['error'], "Los jugadores deben ser distintos")
+        self.assertEqual(Game.objects.count(), 0)
+
+    def test_bulk_create_reuses_players(self):
+        Player.objects.create(name="Ana")
+        response = self.client.post('/api/games/bulk/', {
+            "games": [
+                {"player1_name": "ana", "player2_name": "Luis"},
+                {"player1_name": "LUIS", "player2_name": "Ana"},
+            ]
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(Player.objects.count(), 2)
+        self.assertEqual(response.data[0]['player1']['id'], response.data[1]['player2']['id'])
+
+    def test_dedupe_players_merges_references(self):
+        ana = Player.objects.create(name="Ana")
+        luis = Player.objects.create(name="Luis")
+        # Duplicados anteriores al handle único
+        duplicate = Player.objects.create(name="Pedro")
+        Player.objects.filter(pk=duplicate.pk).update(name="ANA", handle=None)
+        game = Game.objects.create(player1=duplicate, player2=luis)
+        Round.objects.create(game=game, player1_move='ROCK', player2_move='SCISSORS', winner=duplicate)
+        Game.objects.filter(pk=game.pk).update(winner=duplicate)
+        etag = self.client.get(f'/api/games/{game.id}/')['ETag']
+        self.assertIsNotNone(get_cached_game(game.id))
+
+        call_command('dedupe_players', stdout=StringIO())
+
+        game.refresh_from_db()
+        self.assertFalse(Player.objects.filter(pk=duplicate.pk).exists())
+        self.assertEqual(game.player1_id, ana.id)
+        self.assertEqual(game.winner_id, ana.id)
+        self.assertEqual(game.rounds.get().winner_id, ana.id)
+
+        # El juego cambia de versión y su copia en caché se descarta
+        self.assertEqual(game.version, 2)
+        self.assertIsNone(get_cached_game(game.id))
+        response = self.client.get(f'/api/games/{game.id}/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['player1']['id'], ana.id)
+
+    def test_dedupe_players_rebuilds_ratings(self):
+        ana = Player.objects.create(name="Ana")
+        luis = Player.objects.create(name="Luis")
+        duplicate = Player.objects.create(name="Pedro")
+        Player.objects.filter(pk=duplicate.pk).update(name="ANA", handle=None)
+        game = Game.objects.create(player1=duplicate, player2=luis)
+        for _ in range(Game.WINNING_SCORE):
+            apply_move(game.id, duplicate.id, 'ROCK')
+            apply_move(game.id, luis.id, 'SCISSORS')
+        self.assertEqual(Player.objects.get(pk=duplicate.pk).rating, 1016.0)
+
+        call_command('dedupe_players', stdout=StringIO())
+
+        # El juego ganado por el duplicado cuenta ahora para Ana
+        ana.refresh_from_db()
+        luis.refresh_from_db()
+        self.assertEqual(ana.rating, 1016.0)
+        self.assertEqual(luis.rating, 984.0)
+        self.assertEqual(PlayerStats.objects.get(player=ana).wins, 1)
+
+
+class PlayerStatsTests(APITestCase):
+    """
+    Pruebas de las estadísticas precalculadas y la clasificación
+    """
+    def setUp(self):
+        self.ana = Player.objects.create(name="Ana")
+        self.luis = Player.objects.create(name="Luis")
+
+    def play_game(self, winner, loser_move='SCISSORS', ties=0):
+        game = Game.objects.create(player1=self.ana, player2=self.luis)
+        for _ in range(ties):
+            apply_move(game.id, self.ana.id, 'ROCK')
+            apply_move(game.id, self.luis.id, 'ROCK')
+        for _ in range(Game.WINNING_SCORE):
+            if winner == self.ana:
+                apply_move(game.id, self.ana.id, 'ROCK')
+                apply_move(game.id, self.luis.id, loser_move)
+            else:
+                apply_move(game.id, self.ana.id, loser_move)
+                apply_move(game.id, self.luis.id, 'ROCK')
+        return game
+
+    def stats_rows(self):
+        return list(PlayerStats.objects.order_by('player_id').values())
+
+    def test_stats_updated_when_game_ends(self):
+        game = Game.objects.create(player1=self.ana, player2=self.luis)
+        apply_move(game.id, self.ana.id, 'ROCK')
+        apply_move(game.id, self.luis.id, 'SCISSORS')
+        self.assertFalse(PlayerStats.objects.exists())
+
+        self.play_game(self.ana, ties=1)
+        ana = PlayerStats.objects.get(player=self.ana)
+        luis = PlayerStats.objects.get(player=self.luis)
+        self.assertEqual((ana.games_played, ana.wins, ana.losses), (1, 1, 0))
+        self.assertEqual((luis.games_played, luis.wins, luis.losses), (1, 0, 1))
+        self.assertEqual((ana.rounds_played, ana.round_wins), (4, 3))
+        self.assertEqual((ana.rock_count, luis.rock_count, luis.scissors_count), (4, 1, 3))
+
+    def test_streaks(self):
+        self.play_game(self.ana)
+        self.play_game(self.ana)
+        self.play_game(self.luis)
+
+        ana = PlayerStats.objects.get(player=self.ana)
+        luis = PlayerStats.objects.get(player=self.luis)
+        self.assertEqual((ana.current_streak, ana.best_streak), (0, 2))
+        self.assertEqual((luis.current_streak, luis.best_streak), (1, 1))
+
+    def test_batch_move_updates_stats(self):
+        game = Game.objects.create(player1=self.ana, player2=self.luis)
+        moves = []
+        for _ in range(Game.WINNING_SCORE):
+            moves.append({"game_id": game.id, "player_id": self.ana.id, "movement": "PAPER"})
+            moves.append({"game_id": game.id, "player_id": self.luis.id, "movement": "ROCK"})
+        response = self.client.post('/api/games/batch_move/', {"moves": moves}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        ana = PlayerStats.objects.get(player=self.ana)
+        self.assertEqual((ana.wins, ana.paper_count, ana.best_streak), (1, 3, 1))
+
+    def test_rebuild_matches_incremental(self):
+        self.play_game(self.ana, ties=2)
+        self.play_game(self.luis, loser_move='SCISSORS')
+        self.play_game(self.ana)
+        incremental = self.stats_rows()
+
+        PlayerStats.objects.all().delete()
+        call_command('rebuild_stats', '--chunk-size', '2', stdout=StringIO())
+
+        rebuilt = self.stats_rows()
+        for row in incremental + rebuilt:
+            row.pop('updated_at')
+        self.assertEqual(rebuilt, incremental)
+
+    def test_leaderboard(self):
+        marta = Player.objects.create(name="Marta")
+        self.play_game(self.ana)
+        self.play_game(self.ana)
+        self.play_game(self.luis)
+
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get('/api/leaderboard/?limit=5')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(context.captured_queries), 1)
+        self.assertEqual([row['player']['name'] for row in response.data], ["Ana", "Luis"])
+        self.assertEqual(response.data[0]['rank'], 1)
+        self.assertEqual(response.data[0]['wins'], 2)
+        self.assertEqual(response.data[0]['moves']['ROCK'], 6)
+
+        response = self.client.get('/api/leaderboard/?limit=1')
+        self.assertEqual(len(response.data), 1)
+        response = self.client.get('/api/leaderboard/?limit=x')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        response = self.client.get(f'/api/players/{marta.id}/stats/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['games_played'], 0)
+
+
+class ExportTests(APITestCase):
+    """
+    Pruebas de la exportación en streaming del historial
+    """
+    def setUp(self):
+        self.ana = Player.objects.create(name="Ana")
+        self.luis = Player.objects.create(name="Luis")
+        for _ in range(3):
+            game = Game.objects.create(player1=self.ana, player2=self.luis)
+            apply_move(game.id, self.ana.id, 'ROCK')
+            apply_move(game.id, self.luis.id, 'PAPER')
+            apply_move(game.id, self.ana.id, 'SCISSORS')
+
+    def test_export_rounds_ndjson(self):
+        response = self.client.get('/api/export/rounds/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+
+        rows = [json.loads(line) for line in b''.join(response.streaming_content).splitlines()]
+        self.assertEqual(len(rows), 6)
+        self.assertEqual(rows[0]['player2_move'], 'PAPER')
+        self.assertEqual(rows[0]['winner_id'], self.luis.id)
+        self.assertIsNone(rows[1]['player2_move'])
+
+    def test_export_games_csv(self):
+        response = self.client.get('/api/export/games/?format=csv')
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(lines[0].split(',')[:3], ['id', 'player1_id', 'player1_name'])
+        self.assertEqual(len(lines), 4)
+
+    def test_export_validation(self):
+        response = self.client.get('/api/export/games/?format=xml')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.client.get('/api/export/games/?created_after=ayer')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.client.get('/api/export/players/')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_columnar_round_trip(self):
+        response = self.client.get('/api/export/rounds/?format=columnar')
+        groups = list(read_columnar(io.BytesIO(b''.join(response.streaming_content))))
+        self.assertEqual(len(groups), 1)
+
+        rounds = list(Round.objects.order_by('id'))
+        self.assertEqual(groups[0]['id'], [r.id for r in rounds])
+        self.assertEqual(groups[0]['player2_move'], [r.player2_move for r in rounds])
+        self.assertEqual(groups[0]['winner_id'], [r.winner_id for r in rounds])
+        self.assertEqual(groups[0]['created_at'], [r.created_at for r in rounds])
+
+    def test_export_command_in_chunks(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'games.rpscol')
+            call_command(
+                'export_history', 'games', '--format', 'columnar', '--chunk-size', '2',
+                '--output', path, stderr=StringIO()
+            )
+            with open(path, 'rb') as stream:
+                groups = list(read_columnar(stream))
+
+        self.assertEqual([len(group['id']) for group in groups], [2, 1])
+        self.assertEqual(groups[0]['player1_name'], ["Ana", "Ana"])
+        self.assertEqual(groups[0]['is_active'], [True, True])
+
+        output = StringIO()
+        call_command('export_history', 'rounds', '--created-after', '2000-01-01', stdout=output)
+        self.assertEqual(len(output.getvalue().splitlines()), 6)
+
+
+class MoveAnalyticsTests(APITestCase):
+    """
+    Pruebas del análisis vectorizado de patrones de juego
+    """
+    def setUp(self):
+        cache.clear()
+
+    def naive_metrics(self, player_id):
+        # Mismo cálculo ronda a ronda, en Python
+        distribution = {move: 0 for move in analytics.MOVES}
+        transitions = {(a, b): 0 for a in analytics.MOVES for b in analytics.MOVES}
+        after = {move: 0 for move in analytics.MOVES}
+        wins_after = {move: 0 for move in analytics.MOVES}
+        games = Game.objects.filter(Q(player1_id=player_id) | Q(player2_id=player_id)).order_by('id')
+        for game in games:
+            previous = None
+            for played in game.rounds.exclude(player2_move=None).exclude(player1_move=None).order_by('created_at', 'id'):
+                own = played.player1_move if game.player1_id == player_id else played.player2_move
+                distribution[own] += 1
+                if previous is not None:
+                    transitions[previous, own] += 1
+                    after[previous] += 1
+                    wins_after[previous] += played.winner_id == player_id
+                previous = own
+        return distribution, transitions, after, wins_after
+
+    def test_player_metrics_match_naive_computation(self):
+        seed_data(players=6, games=30, rounds_per_game=6, seed=7)
+        player = Player.objects.order_by('id').first()
+        distribution, transitions, after, wins_after = self.naive_metrics(player.id)
+
+        response = self.client.get(f'/api/players/{player.id}/analytics/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        data = response.data
+        self.assertEqual(data['rounds'], sum(distribution.values()))
+        for move in analytics.MOVES:
+            self.assertAlmostEqual(data['distribution'][move], distribution[move] / data['rounds'], places=4)
+            row = sum(transitions[move, other] for other in analytics.MOVES)
+            for other in analytics.MOVES:
+                expected = transitions[move, other] / row if row else 0
+                self.assertAlmostEqual(data['transitions'][move][other], expected, places=4)
+            expected = wins_after[move] / after[move] if after[move] else 0
+            self.assertAlmostEqual(data['win_rate_by_previous_move'][move], expected, places=4)
+
+    def test_metrics_for_all_players(self):
+        seed_data(players=4, games=10, rounds_per_game=4, seed=3)
+        response = self.client.get('/api/analytics/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['rounds'], Round.objects.exclude(player2_move=None).count())
+        self.assertEqual(response.data['players'], 4)
+        self.assertAlmostEqual(sum(response.data['distribution'].values()), 1, places=3)
+
+    def test_player_without_rounds(self):
+        player = Player.objects.create(name="Ana")
+        response = self.client.get(f'/api/players/{player.id}/analytics/')
+        self.assertEqual(response.data['rounds'], 0)
+        self.assertEqual(response.data['distribution']['ROCK'], 0)
+
+        response = self.client.get('/api/analytics/')
+        self.assertEqual(response.data['rounds'], 0)
+
+    def test_results_cached_until_history_changes(self):
+        ana = Player.objects.create(name="Ana")
+        luis = Player.objects.create(name="Luis")
+        game = Game.objects.create(player1=ana, player2=luis)
+        apply_move(game.id, ana.id, 'ROCK')
+        apply_move(game.id, luis.id, 'PAPER')
+        first = self.client.get('/api/analytics/').data
+
+        with mock.patch.object(analytics, 'analyze_all', side_effect=AssertionError("sin caché")):
+            self.assertEqual(self.client.get('/api/analytics/').data, first)
+        self.assertEqual(self.client.get(f'/api/players/{ana.id}/analytics/').data['rounds'], 1)
+
+        # Cada movimiento añade un evento: la marca cambia y se recalcula,
+        # también cuando el movimiento completa una ronda ya existente
+        apply_move(game.id, ana.id, 'SCISSORS')
+        apply_move(game.id, luis.id, 'PAPER')
+        self.assertEqual(self.client.get('/api/analytics/').data['rounds'], 2)
+        self.assertEqual(self.client.get(f'/api/players/{ana.id}/analytics/').data['rounds'], 2)
+
+
+class BotOpponentTests(APITestCase):
+    """
+    Pruebas del oponente CPU y de su caché de modelos
+    """
+    def setUp(self):
+        cache.clear()
+        bots.player_models.clear()
+
+    def create_bot_game(self, strategy, name="Ana"):
+        response = self.client.post('/api/create-game/', {
+            "player1_name": name,
+            "bot_strategy": strategy
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.data
+
+    def move(self, game, movement):
+        return self.client.post(f"/api/games/{game['id']}/make_move/", {
+            "player_id": game['player1']['id'],
+            "movement": movement
+        }, format='json')
+
+    def test_bot_answers_in_same_request(self):
+        game = self.create_bot_game('random')
+        self.assertEqual(game['bot_strategy'], 'random')
+        self.assertTrue(game['player2']['is_bot'])
+
+        response = self.move(game, 'ROCK')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        played = response.data['rounds'][0]
+        self.assertEqual(played['player1_move'], 'ROCK')
+        self.assertIn(played['player2_move'], rules.RULE_SETS['classic'].moves)
+        self.assertNotEqual(played['result'], "Ronda en progreso")
+
+        # El bot no acepta movimientos de nadie más
+        response = self.client.post(f"/api/games/{game['id']}/make_move/", {
+            "player_id": game['player2']['id'],
+            "movement": 'ROCK'
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_frequency_bot_exploits_repeated_move(self):
+        game = self.create_bot_game('frequency')
+        response = None
+        while response is None or response.data['is_active']:
+            response = self.move(game, 'ROCK')
+
+        # Desde la segunda ronda el bot ya sabe que el jugador saca piedra
+        bot_moves = [played['player2_move'] for played in response.data['rounds'][1:]]
+        self.assertEqual(set(bot_moves), {'PAPER'})
+        self.assertEqual(response.data['winner']['id'], game['player2']['id'])
+
+    def test_markov_bot_learns_from_history(self):
+        # Historial en otro juego: después de ROCK, el jugador saca SCISSORS
+        first = self.create_bot_game('random')
+        for movement in ['ROCK', 'SCISSORS', 'ROCK', 'SCISSORS']:
+            self.move(first, movement)
+        bots.player_models.clear()
+
+        game = self.create_bot_game('markov')
+        self.move(game, 'ROCK')
+        response = self.move(game, 'PAPER')
+        # Tras ROCK predice SCISSORS y juega ROCK
+        self.assertEqual(response.data['rounds'][1]['player2_move'], 'ROCK')
+
+    def test_model_is_cached_between_moves(self):
+        game = self.create_bot_game('markov')
+        self.move(game, 'ROCK')
+        with CaptureQueriesContext(connection) as context:
+            self.move(game, 'PAPER')
+        self.assertFalse(any('api_round' in query['sql'] and 'ORDER BY' in query['sql'] and 'LIMIT' in query['sql']
+                             for query in context.captured_queries))
+
+    def test_model_cache_is_lru(self):
+        models = bots.ModelCache(maxsize=2, ttl=60)
+        built = []
+
+        def build(player_id):
+            built.append(player_id)
+            return bots.PlayerModel()
+
+        models.get(1, build)
+        models.get(2, build)
+        models.get(1, build)
+        models.get(3, build)
+        models.get(1, build)
+        models.get(2, build)
+        self.assertEqual(built, [1, 2, 3, 2])
+
+    def test_bot_game_validation(self):
+        response = self.client.post('/api/create-game/', {
+            "player1_name": "Ana",
+            "bot_strategy": "genio"
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        bot = bots.bot_player('random')
+        response = self.client.post('/api/create-game/', {
+            "player1_id": bot.id,
+            "player2_name": "Ana"
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_batch_move_against_bot(self):
+        game = self.create_bot_game('random')
+        response = self.client.post('/api/games/batch_move/', {"moves": [
+            {"game_id": game['id'], "player_id": game['player1']['id'], "movement": "ROCK"},
+            {"game_id": game['id'], "player_id": game['player1']['id'], "movement": "PAPER"},
+        ]}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        rounds = Round.objects.filter(game_id=game['id'])
+        self.assertEqual(rounds.count(), 2)
+        self.assertFalse(rounds.filter(player2_move=None).exists())
+
+
+class RuleSetTests(APITestCase):
+    """
+    Pruebas de la codificación compacta de movimientos y de las reglas
+    definidas como datos
+    """
+    def create_game(self, rule_set=None):
+        data = {"player1_name": "Ana", "player2_name": "Luis"}
+        if rule_set:
+            data["rule_set"] = rule_set
+        response = self.client.post('/api/create-game/', data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.data
+
+    def test_outcome_tables(self):
+        classic = rules.RULE_SETS['classic']
+        self.assertEqual(classic.outcome(Round.PAPER, Round.ROCK), rules.PLAYER1)
+        self.assertEqual(classic.outcome(Round.ROCK, Round.PAPER), rules.PLAYER2)
+        self.assertEqual(classic.outcome(Round.ROCK, Round.ROCK), rules.TIE)
+
+        rpsls = rules.RULE_SETS['rpsls']
+        self.assertEqual(len(rpsls.outcomes), 25)
+        self.assertEqual(rpsls.outcome(Round.SPOCK, Round.SCISSORS), rules.PLAYER1)
+        self.assertEqual(rpsls.outcome(Round.LIZARD, Round.SPOCK), rules.PLAYER1)
+        self.assertEqual(rpsls.outcome(Round.ROCK, Round.SPOCK), rules.PLAYER2)
+        # Cada movimiento gana a la mitad de los demás
+        for move in rpsls.moves:
+            self.assertEqual(len(rpsls.counters[move]), 2)
+
+        with self.assertRaises(ValueError):
+            rules.RuleSet('rota', 'Rota', {Round.ROCK: [Round.PAPER], Round.PAPER: [Round.ROCK]})
+
+    def test_moves_stored_as_small_integers(self):
+        game = self.create_game()
+        apply_move(game['id'], game['player1']['id'], 'PAPER')
+
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT player1_move FROM api_round")
+            self.assertEqual(cursor.fetchone()[0], rules.MOVE_CODES[Round.PAPER])
+        self.assertEqual(Round.objects.get().player1_move, Round.PAPER)
+        self.assertEqual(Round.objects.filter(player1_move=Round.PAPER).count(), 1)
+
+    def test_move_resolution_does_not_query(self):
+        game = Game.objects.create(player1=Player.objects.create(name="Ana"), player2=Player.objects.create(name="Luis"))
+        played = Round(game_id=game.id, player1_move=Round.ROCK, player2_move=Round.SCISSORS)
+        with CaptureQueriesContext(connection) as context:
+            winner_id = played.determine_winner(game)
+        self.assertEqual(winner_id, game.player1_id)
+        self.assertEqual(len(context.captured_queries), 0)
+
+    def test_rpsls_game(self):
+        game = self.create_game('rpsls')
+        self.assertEqual(game['rule_set'], 'rpsls')
+
+        response = self.client.post(f"/api/games/{game['id']}/make_move/", {
+            "player_id": game['player1']['id'], "movement": "SPOCK"
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        response = self.client.post(f"/api/games/{game['id']}/make_move/", {
+            "player_id": game['player2']['id'], "movement": "LIZARD"
+        }, format='json')
+        self.assertEqual(response.data['player2_score'], 1)
+        self.assertEqual(response.data['rounds'][0]['player1_move'], "SPOCK")
+
+    def test_moves_validated_against_game_rules(self):
+        game = self.create_game()
+        response = self.client.post(f"/api/games/{game['id']}/make_move/", {
+            "player_id": game['player1']['id'], "movement": "LIZARD"
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data['error'], "Movimiento inválido. Debe ser ROCK, PAPER o SCISSORS")
+
+        response = self.client.post('/api/create-game/', {
+            "player1_name": "Ana", "player2_name": "Luis", "rule_set": "ajedrez"
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class ArchiveTests(APITestCase):
+    """
+    Pruebas del archivo de juegos terminados
+    """
+    def setUp(self):
+        cache.clear()
+        self.ana = Player.objects.create(name="Ana")
+        self.luis = Player.objects.create(name="Luis")
+        self.old_games = [self.play_game() for _ in range(3)]
+        self.recent = self.play_game()
+        self.active = Game.objects.create(player1=self.ana, player2=self.luis)
+        apply_move(self.active.id, self.ana.id, 'ROCK')
+
+        # Los tres primeros juegos terminaron hace 60 días
+        old = datetime.now(dt_timezone.utc) - timedelta(days=60)
+        ids = [game.id for game in self.old_games]
+        Game.objects.filter(id__in=ids).update(created_at=old)
+        Round.objects.filter(game_id__in=ids).update(created_at=old)
+
+    def play_game(self):
+        game = Game.objects.create(player1=self.ana, player2=self.luis)
+        apply_move(game.id, self.ana.id, 'ROCK')
+        apply_move(game.id, self.luis.id, 'ROCK')
+        for _ in range(Game.WINNING_SCORE):
+            apply_move(game.id, self.ana.id, 'PAPER')
+            apply_move(game.id, self.luis.id, 'ROCK')
+        return game
+
+    def archive(self, *args):
+        output = StringIO()
+        call_command('archive_games', *args, stdout=output)
+        return output.getvalue()
+
+    def test_archive_moves_old_finished_games(self):
+        self.assertIn("Se moverían 3", self.archive('--dry-run'))
+        self.assertFalse(ArchivedGame.objects.exists())
+
+        self.archive('--batch-size', '2')
+        self.assertEqual(
+            sorted(Game.objects.values_list('id', flat=True)),
+            [self.recent.id, self.active.id]
+        )
+        self.assertEqual(
+            sorted(ArchivedGame.objects.values_list('id', flat=True)),
+            [game.id for game in self.old_games]
+        )
+        self.assertEqual(ArchivedRound.objects.count(), 3 * (Game.WINNING_SCORE + 1))
+        self.assertFalse(Round.objects.filter(game_id__in=[game.id for game in self.old_games]).exists())
+
+        # Una segunda pasada no encuentra nada más que mover
+        self.assertIn("0 juegos", self.archive())
+
+    def test_read_through(self):
+        game_id = self.old_games[0].id
+        before = self.client.get(f'/api/games/{game_id}/')
+        self.archive()
+        cache.clear()
+
+        after = self.client.get(f'/api/games/{game_id}/')
+        self.assertEqual(after.status_code, status.HTTP_200_OK)
+        self.assertEqual(after.data, before.data)
+        self.assertEqual(after['ETag'], before['ETag'])
+        self.assertFalse(after.data['is_active'])
+
+        response = self.client.get(f'/api/games/{game_id}/', HTTP_IF_NONE_MATCH=after['ETag'])
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        response = self.client.get('/api/games/999999/')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_history_includes_archive(self):
+        stats_before = list(PlayerStats.objects.order_by('player_id').values('player_id', 'wins', 'rock_count'))
+        analytics_before = analytics.analyze_all()
+        export_before = b''.join(self.client.get('/api/export/games/').streaming_content)
+
+        self.archive()
+        call_command('rebuild_stats', stdout=StringIO())
+
+        self.assertEqual(
+            list(PlayerStats.objects.order_by('player_id').values('player_id', 'wins', 'rock_count')),
+            stats_before
+        )
+        self.assertEqual(analytics.analyze_all(), analytics_before)
+        self.assertEqual(b''.join(self.client.get('/api/export/games/').streaming_content), export_before)
+
+
+class MetricsTests(APITestCase):
+    """
+    Pruebas de las métricas por petición: Server-Timing, /metrics y log de
+    peticiones lentas
+    """
+    def setUp(self):
+        cache.clear()
+        metrics.registry.clear()
+        self.ana = Player.objects.create(name="Ana")
+        self.luis = Player.objects.create(name="Luis")
+        self.game = Game.objects.create(player1=self.ana, player2=self.luis)
+
+    def test_server_timing(self):
+        response = self.client.get(f'/api/games/{self.game.id}/')
+        timing_header = response['Server-Timing']
+        self.assertRegex(timing_header, r'^db;dur=[\d.]+;desc="[1-9]\d* consultas", serialize;dur=[\d.]+, total;dur=[\d.]+$')
+
+        # Desde la caché, sin consultas
+        response = self.client.get(f'/api/games/{self.game.id}/')
+        self.assertTrue(response['Server-Timing'].startswith('db;dur=0.0;desc="0 consultas", total;'))
+
+    def test_prometheus_endpoint(self):
+        self.client.post(f'/api/games/{self.game.id}/make_move/', {
+            "player_id": self.ana.id, "movement": "ROCK"
+        }, format='json')
+        self.client.get('/api/games/')
+        self.client.get('/no-existe/')
+
+        response = self.client.get('/metrics')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response['Content-Type'].startswith('text/plain; version=0.0.4'))
+        body = response.content.decode()
+        self.assertIn('api_http_requests_total{method="POST",endpoint="game-make-move"} 1', body)
+        self.assertRegex(body, r'api_db_queries_total\{method="POST",endpoint="game-make-move"\} [1-9]')
+        self.assertIn('api_http_requests_total{method="GET",endpoint="game-list"} 1', body)
+        self.assertIn('api_http_requests_total{method="GET",endpoint="<unmatched>"} 1', body)
+        self.assertIn('api_http_request_duration_seconds_bucket{method="GET",endpoint="game-list",le="+Inf"} 1', body)
+        self.assertIn('api_phase_seconds_total{method="GET",endpoint="game-list",phase="serialize"}', body)
+
+    def test_slow_request_log(self):
+        with self.assertNoLogs('api.metrics', level='WARNING'):
+            self.client.get(f'/api/games/{self.game.id}/')
+
+        with override_settings(SLOW_REQUEST_MS=0), self.assertLogs('api.metrics', level='WARNING') as logs:
+            self.client.get('/api/games/')
+        self.assertIn("Petición lenta: GET /api/games/ (game-list)", logs.output[0])
+        self.assertEqual(metrics.registry.endpoints['GET', 'game-list'].slow, 1)
+
+
+class LoggingTests(APITestCase):
+    """
+    Pruebas del registro en cola, en JSON y con muestreo
+    """
+    def make_record(self, msg, *args, level=logging.INFO, **extra):
+        record = logging.LogRecord('api.tests', level, __file__, 1, msg, args, None)
+        record.__dict__.update(extra)
+        return record
+
+    def test_json_formatter(self):
+        try:
+            raise ValueError("fallo")
+        except ValueError:
+            record = self.make_record("Juego %s", 7, level=logging.ERROR, game_id=7, sampled=True)
+            record.exc_info = sys.exc_info()
+
+        data = json.loads(JsonFormatter().format(record))
+        self.assertEqual(data['message'], "Juego 7")
+        self.assertEqual(data['level'], "ERROR")
+        self.assertEqual(data['game_id'], 7)
+        self.assertNotIn('sampled', data)
+        self.assertIn("ValueError: fallo", data['exception'])
+
+    @override_settings(LOG_SAMPLE_EVERY=3)
+    def test_sampling(self):
+        sample = SampleFilter()
+        passed = [sample.filter(self.make_record("Ronda %s", i, sampled=True)) for i in range(7)]
+        self.assertEqual(passed, [True, False, False, True, False, False, True])
+
+        # Cada mensaje cuenta aparte; lo no marcado y los avisos siempre pasan
+        self.assertTrue(sample.filter(self.make_record("Otro %s", 1, sampled=True)))
+        self.assertTrue(sample.filter(self.make_record("Ronda %s", 8)))
+        self.assertTrue(sample.filter(self.make_record("Ronda %s", 9, level=logging.WARNING, sampled=True)))
+
+    def test_queued_handler_writes_in_background(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'app.log')
+            handler = QueuedHandler('logging.FileHandler', filename=path)
+            handler.setFormatter(JsonFormatter())
+
+            moves = ['ROCK']
+            handler.handle(self.make_record("Movimientos: %s", moves, game_id=3))
+            # El mensaje queda fijado al encolar
+            moves.append('PAPER')
+            handler.close()
+
+            with open(path) as stream:
+                lines = [json.loads(line) for line in stream]
+        self.assertEqual(len(lines), 1)
+        self.assertEqual(lines[0]['message'], "Movimientos: ['ROCK']")
+        self.assertEqual(lines[0]['game_id'], 3)
+
+
+class MoveDeltaTests(APITestCase):
+    """
+    Pruebas de la respuesta compacta de make_move
+    """
+    def setUp(self):
+        cache.clear()
+        self.ana = Player.objects.create(name="Ana")
+        self.luis = Player.objects.create(name="Luis")
+        self.game = Game.objects.create(player1=self.ana, player2=self.luis)
+
+    def move(self, player, movement, **extra):
+        return self.client.post(
+            f'/api/games/{self.game.id}/make_move/?delta=1',
+            {"player_id": player.id, "movement": movement},
+            format='json', **extra
+        )
+
+    def test_bot_move_is_one_version(self):
+        # El movimiento del jugador y la respuesta de la CPU son una versión
+        game = self.client.post('/api/create-game/', {"player1_name": "Ana", "bot_strategy": "random"}, format='json').data
+        self.client.get(f"/api/games/{game['id']}/")
+        response = self.client.post(
+            f"/api/games/{game['id']}/make_move/?delta=1",
+            {"player_id": game['player1']['id'], "movement": "ROCK"}, format='json'
+        )
+        self.assertEqual(response.data['version'], game['version'] + 1)
+        self.assertIsNotNone(response.data['round']['player2_move'])
+
+        cached = get_cached_game(game['id'])
+        self.assertIsNotNone(cached)
+        self.assertEqual(cached[0], response.data['version'])
+        # El payload actualizado con el delta es el que saldría de la base de datos
+        cache.clear()
+        self.assertEqual(cached[1], self.client.get(f"/api/games/{game['id']}/").data)
+        self.assertEqual(Game.objects.get(pk=game['id']).version, game['version'] + 1)
+
+    def test_delta_payload(self):
+        self.client.get(f'/api/games/{self.game.id}/')
+        response = self.move(self.ana, 'ROCK')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            set(response.data),
+            {'id', 'version', 'player1_score', 'player2_score', 'winner', 'is_active', 'status', 'round'}
+        )
+        self.assertEqual(response.data['round']['player1_move'], 'ROCK')
+        self.assertEqual(response.data['round']['result'], "Ronda en progreso")
+
+        response = self.move(self.luis, 'PAPER')
+        self.assertEqual(response.data['player2_score'], 1)
+        self.assertEqual(response.data['round']['result'], "Ganador: Luis")
+        self.assertEqual(response['ETag'], game_etag(self.game.id, response.data['version']))
+
+        # La caché se actualizó con el delta: coincide con serializar de cero
+        cached = self.client.get(f'/api/games/{self.game.id}/').data
+        cache.clear()
+        fresh = self.client.get(f'/api/games/{self.game.id}/').data
+        self.assertEqual(cached, fresh)
+        self.assertEqual(fresh['rounds'][-1], response.data['round'])
+
+    def test_accept_header(self):
+        response = self.move(self.ana, 'ROCK', HTTP_ACCEPT='application/vnd.rps.delta+json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response['Content-Type'].startswith('application/vnd.rps.delta+json'))
+        self.assertIn('round', json.loads(response.content))
+
+    def test_constant_queries(self):
+        def queries_per_round():
+            counts = []
+            for player, movement in ((self.ana, 'ROCK'), (self.luis, 'ROCK')):
+                with CaptureQueriesContext(connection) as context:
+                    self.move(player, movement)
+                counts.append(len(context.captured_queries))
+            return counts
+
+        queries_per_round()
+        first = queries_per_round()
+        for _ in range(10):
+            queries_per_round()
+        self.assertEqual(queries_per_round(), first)
+        self.assertEqual(Game.objects.get(pk=self.game.id).round_count, 13)
+
+    def test_finished_game_delta(self):
+        for _ in range(Game.WINNING_SCORE):
+            self.move(self.ana, 'PAPER')
+            response = self.move(self.luis, 'ROCK')
+        self.assertFalse(response.data['is_active'])
+        self.assertEqual(response.data['winner']['name'], "Ana")
+        self.assertEqual(response.data['status'], "Juego terminado. Ganador: Ana")
+
+
+class FastSerializationTests(APITestCase):
+    """
+    Pruebas de la serialización rápida de los listados: la respuesta debe
+    ser idéntica byte a byte a la de los serializers de DRF
+    """
+    def setUp(self):
+        self.ana = Player.objects.create(name="Ana \u00f1 \u2028 \"comillas\" \x07")
+        self.luis = Player.objects.create(name="Luis 🎲")
+        bot = bots.bot_player('markov')
+        finished = Game.objects.create(player1=self.ana, player2=self.luis)
+        for _ in range(Game.WINNING_SCORE):
+            apply_move(finished.id, self.ana.id, 'PAPER')
+            apply_move(finished.id, self.luis.id, 'ROCK')
+        Game.objects.create(player1=self.luis, player2=bot, bot_strategy='markov', rule_set='rpsls')
+        Game.objects.create(player1=self.ana, player2=self.luis, is_active=False)
+
+    def drf_page(self, data):
+        return JSONRenderer().render({'next': None, 'previous': None, 'results': data})
+
+    def test_games_identical_to_drf(self):
+        response = self.client.get('/api/games/')
+        games = Game.objects.with_players().order_by('-created_at', '-id')
+        self.assertEqual(response.content, self.drf_page(GameSummarySerializer(games, many=True).data))
+
+        response = self.client.get('/api/games/?is_active=true')
+        games = games.filter(is_active=True)
+        self.assertEqual(response.content, self.drf_page(GameSummarySerializer(games, many=True).data))
+
+    def test_players_identical_to_drf(self):
+        response = self.client.get('/api/players/')
+        players = Player.objects.order_by('-created_at', '-id')
+        self.assertEqual(response.content, self.drf_page(PlayerSerializer(players, many=True).data))
+
+    def test_pagination_with_rows(self):
+        response = self.client.get('/api/games/?page_size=2')
+        self.assertEqual(len(response.data['results']), 2)
+        response = self.client.get(response.data['next'])
+        self.assertEqual(len(response.data['results']), 1)
+        self.assertIsNotNone(response.data['previous'])
+
+    def test_renderer_matches_drf(self):
+        data = {
+            'texto': "línea\u2028párrafo\u2029 \t\n\x00 \\ / 🎲",
+            'lista': [1, None, True, False, -7, {'a': []}],
+        }
+        self.assertEqual(FastJSONRenderer().render(data), JSONRenderer().render(data))
+        # Lo que orjson no codifica pasa al encoder de DRF
+        self.assertEqual(FastJSONRenderer().render({1: 2**70}), JSONRenderer().render({1: 2**70}))
+        indented = FastJSONRenderer().render(data, 'application/json; indent=2')
+        self.assertEqual(indented, JSONRenderer().render(data, 'application/json; indent=2'))
+
+
+@override_settings(MATCHMAKING_SCHEDULER=False)
+class MatchmakingTests(TransactionTestCase):
+    """
+    Pruebas de la cola de emparejamiento; las rondas del emparejador se
+    lanzan a mano con run_once
+    """
+    def setUp(self):
+        async_to_sync(matchmaking.queue.clear)()
+
+    def test_pairs_neighbours_within_window(self):
+        now = 1000.0
+        tickets = [
+            matchmaking.Ticket(1, 1000, now),
+            matchmaking.Ticket(2, 1500, now),
+            matchmaking.Ticket(3, 1050, now - 1),
+            matchmaking.Ticket(4, 1900, now),
+        ]
+        pairs, unpaired = matchmaking.pair_tickets(tickets, now)
+        # El que más esperaba es el jugador 1
+        self.assertEqual([(first.player_id, second.player_id) for first, second in pairs], [(3, 1)])
+        self.assertEqual([ticket.player_id for ticket in unpaired], [2, 4])
+
+        # La ventana crece con la espera; tras MAX_WAIT vale cualquier rival
+        pairs, _ = matchmaking.pair_tickets(unpaired, now + 5)
+        self.assertEqual(len(pairs), 0)
+        pairs, unpaired = matchmaking.pair_tickets(unpaired, now + matchmaking.MAX_WAIT)
+        self.assertEqual(len(pairs), 1)
+        self.assertEqual(unpaired, [])
+
+    async def enqueue(self, player_id):
+        return await self.async_client.post(
+            '/api/matchmaking/', {"player_id": player_id}, content_type='application/json'
+        )
+
+    async def test_queue_flow(self):
+        players = [await Player.objects.acreate(name=f"Jugador {i}") for i in range(3)]
+        bot = await Player.objects.acreate(name="CPU", is_bot=True)
+
+        response = await self.enqueue(players[0].pk)
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(response.json()['status'], 'waiting')
+        self.assertEqual(response.json()['rating'], ratings.INITIAL_RATING)
+
+        # Entrar dos veces no duplica el ticket
+        response = await self.enqueue(players[0].pk)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        for player in players[1:]:
+            await self.enqueue(player.pk)
+
+        self.assertEqual((await self.enqueue(bot.pk)).status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual((await self.enqueue(999999)).status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual((await self.enqueue("x")).status_code, status.HTTP_400_BAD_REQUEST)
+
+        matches = await matchmaking.scheduler.run_once()
+        self.assertEqual(len(matches), 2)
+        game = await Game.objects.aget(pk=matches[players[0].pk])
+        self.assertEqual((game.player1_id, game.player2_id), (players[0].pk, players[1].pk))
+        self.assertTrue(game.is_active)
+
+        response = await self.async_client.get(f'/api/matchmaking/{players[0].pk}/')
+        self.assertEqual(response.json(), {'status': 'matched', 'player_id': players[0].pk, 'game_id': game.pk})
+
+        # El tercero sigue esperando hasta que se cansa
+        url = f'/api/matchmaking/{players[2].pk}/'
+        self.assertEqual((await self.async_client.get(url)).json()['status'], 'waiting')
+        self.assertEqual((await self.async_client.delete(url)).status_code, status.HTTP_204_NO_CONTENT)
+        self.assertEqual((await self.async_client.get(url)).status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual((await self.async_client.delete(url)).status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_round_creates_games_in_batches(self):
+        players = Player.objects.bulk_create(
+            [Player(name=f"Jugador {i}", handle=f"jugador {i}") for i in range(10)]
+        )
+        queue = matchmaking.MemoryQueue()
+        for player in players:
+            async_to_sync(queue.add)(matchmaking.Ticket(player.pk, 1000, 0.0))
+
+        scheduler = matchmaking.Scheduler(queue, interval=0, batch_size=4)
+        with CaptureQueriesContext(connection) as queries:
+            matches = async_to_sync(scheduler.run_once)(now=1.0)
+        self.assertEqual(len(matches), 10)
+        self.assertEqual(Game.objects.count(), 5)
+        # Un INSERT por lote de 4, 4 y 2 tickets
+        inserts = [query for query in queries.captured_queries if query['sql'].startswith('INSERT')]
+        self.assertEqual(len(inserts), 3)
+
+    def test_simulator(self):
+        seed_data(players=20, games=0)
+        results = run_matchmaking_benchmark(rate=2000, interval=0.01)
+        self.assertEqual(results['games'], 10)
+        self.assertEqual(results['unmatched'], 0)
+        self.assertEqual(Game.objects.count(), 10)
+
+
+class RatingTests(APITestCase):
+    """
+    Pruebas del rating Elo y de su recálculo desde el historial
+    """
+    def setUp(self):
+        self.players = [Player.objects.create(name=name) for name in ("Ana", "Luis", "Marta")]
+
+    def play_game(self, winner, loser):
+        game = Game.objects.create(player1=winner, player2=loser)
+        for _ in range(Game.WINNING_SCORE):
+            apply_move(game.id, winner.id, 'ROCK')
+            apply_move(game.id, loser.id, 'SCISSORS')
+        return game
+
+    def ratings_by_player(self):
+        return dict(Player.objects.order_by('id').values_list('id', 'rating'))
+
+    def test_rating_updated_when_game_ends(self):
+        ana, luis, _ = self.players
+        game = Game.objects.create(player1=ana, player2=luis)
+        apply_move(game.id, ana.id, 'ROCK')
+        apply_move(game.id, luis.id, 'SCISSORS')
+        ana.refresh_from_db()
+        self.assertEqual(ana.rating, ratings.INITIAL_RATING)
+
+        self.play_game(ana, luis)
+        ana.refresh_from_db()
+        luis.refresh_from_db()
+        self.assertEqual(ana.rating, ratings.INITIAL_RATING + ratings.K_FACTOR / 2)
+        self.assertEqual(luis.rating, ratings.INITIAL_RATING - ratings.K_FACTOR / 2)
+
+        # Ganar a alguien con menos rating da menos puntos
+        self.play_game(ana, luis)
+        ana.refresh_from_db()
+        self.assertLess(ana.rating, ratings.INITIAL_RATING + ratings.K_FACTOR)
+
+    def test_rebuild_matches_incremental(self):
+        ana, luis, marta = self.players
+        self.play_game(ana, luis)
+        self.play_game(luis, marta)
+        archive_games(timezone.now() + timedelta(days=1))
+        self.play_game(marta, ana)
+        self.play_game(ana, luis)
+        self.play_game(luis, marta)
+        incremental = self.ratings_by_player()
+
+        Player.objects.update(rating=ratings.INITIAL_RATING)
+        out = StringIO()
+        call_command('rebuild_ratings', '--chunk-size', '2', stdout=out)
+        self.assertIn("5 juegos", out.getvalue())
+        rebuilt = self.ratings_by_player()
+        for player_id, rating in incremental.items():
+            self.assertAlmostEqual(rebuilt[player_id], rating, places=9)
+
+    def test_vectorized_replay_matches_sequential(self):
+        rng = np.random.default_rng(3)
+        player1 = rng.integers(0, 20, 2000)
+        player2 = (player1 + rng.integers(1, 20, 2000)) % 20
+        score1 = rng.integers(0, 2, 2000).astype(np.float64)
+
+        expected = [ratings.INITIAL_RATING] * 20
+        for first, second, score in zip(player1, player2, score1):
+            delta = ratings.K_FACTOR * (score - ratings.expected_score(expected[first], expected[second]))
+            expected[first] += delta
+            expected[second] -= delta
+
+        vectorized = np.full(20, ratings.INITIAL_RATING)
+        ratings.replay(vectorized, player1, player2, score1)
+        np.testing.assert_allclose(vectorized, expected, rtol=0, atol=1e-9)
+
+    def test_leaderboard_by_rating(self):
+        ana, luis, marta = self.players
+        self.play_game(marta, luis)
+        self.play_game(marta, ana)
+        self.play_game(ana, luis)
+
+        response = self.client.get('/api/leaderboard/?by=rating')
+        self.assertEqual([row['player']['name'] for row in response.data], ["Marta", "Ana", "Luis"])
+        self.assertGreater(response.data[0]['rating'], response.data[1]['rating'])
+
+        response = self.client.get('/api/leaderboard/?by=x')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class IdempotencyTests(APITestCase):
+    """
+    Pruebas de la cabecera Idempotency-Key en los endpoints de escritura
+    """
+    def setUp(self):
+        cache.clear()
+
+    def create_game(self, key, **data):
+        return self.client.post(
+            '/api/create-game/',
+            data or {"player1_name": "Ana", "player2_name": "Luis"},
+            format='json', HTTP_IDEMPOTENCY_KEY=key
+        )
+
+    def test_create_game_retry_returns_original(self):
+        first = self.create_game('crear-1')
+        retry = self.create_game('crear-1')
+        self.assertEqual(retry.status_code, status.HTTP_200_OK)
+        self.assertEqual(retry.content, first.content)
+        self.assertEqual(retry['Idempotent-Replayed'], 'true')
+        self.assertFalse(first.has_header('Idempotent-Replayed'))
+        self.assertEqual(Game.objects.count(), 1)
+
+        # Otra clave es otra petición
+        self.create_game('crear-2')
+        self.assertEqual(Game.objects.count(), 2)
+
+    def test_move_retry_does_not_replay_turn_error(self):
+        game = self.create_game('crear').json()
+        url = f"/api/games/{game['id']}/make_move/?delta=1"
+        data = {"player_id": game['player1']['id'], "movement": "ROCK"}
+
+        first = self.client.post(url, data, format='json', HTTP_IDEMPOTENCY_KEY='mover-1')
+        retry = self.client.post(url, data, format='json', HTTP_IDEMPOTENCY_KEY='mover-1')
+        self.assertEqual(retry.status_code, status.HTTP_200_OK)
+        self.assertEqual(retry.content, first.content)
+        self.assertEqual(retry['ETag'], first['ETag'])
+        self.assertEqual(Game.objects.get(pk=game['id']).version, game['version'] + 1)
+
+        # Sin clave, repetir el movimiento es un error de turno
+        response = self.client.post(url, data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_key_reused_with_other_request(self):
+        self.create_game('clave')
+        response = self.create_game('clave', player1_name="Marta", player2_name="Luis")
+        self.assertEqual(response.status_code, 422)
+        self.assertEqual(Game.objects.count(), 1)
+
+    def test_errors_are_replayed_but_not_server_errors(self):
+        first = self.create_game('invalido', player1_name="Ana", player2_name="ana")
+        self.assertEqual(first.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.create_game('invalido', player1_name="Ana", player2_name="ana").content, first.content)
+
+        with mock.patch('api.views.services.resolve_players', side_effect=RuntimeError("caída")):
+            with self.assertRaises(RuntimeError):
+                self.create_game('fallo')
+        self.assertEqual(self.create_game('fallo').status_code, status.HTTP_200_OK)
+
+    @override_settings(IDEMPOTENCY_WAIT=0)
+    def test_pending_key_returns_conflict(self):
+        response = self.create_game('en-curso')
+        scope = idempotency.request_scope(response.wsgi_request)
+        cache.set(scope.cache_key, {'fingerprint': scope.fingerprint}, 30)
+
+        response = self.create_game('en-curso')
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual(response['Retry-After'], '1')
+
+    def test_invalid_key_and_other_views(self):
+        response = self.create_game('x' * 300)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        # Las lecturas ignoran la cabecera
+        response = self.client.get('/api/games/', HTTP_IDEMPOTENCY_KEY='lectura')
+        self.assertFalse(response.has_header('Idempotent-Replayed'))
+
+
+class ThrottledIdempotencyTests(APITestCase):
+    """
+    Un 429 de los límites por cliente no queda guardado bajo la clave
+    """
+    def setUp(self):
+        cache.clear()
+        self.ana = Player.objects.create(name="Ana")
+        self.luis = Player.objects.create(name="Luis")
+        self.game = Game.objects.create(player1=self.ana, player2=self.luis)
+
+    def test_throttled_retry_runs_again(self):
+        url = f'/api/games/{self.game.id}/make_move/'
+        data = {"player_id": self.ana.id, "movement": "ROCK"}
+        with throttle_rates(player='1/m'):
+            # Agota la cubeta del jugador sin clave
+            self.client.post(url, {"player_id": self.ana.id, "movement": "LIZARD"}, format='json')
+            throttled = self.client.post(url, data, format='json', HTTP_IDEMPOTENCY_KEY='mover-1')
+        self.assertEqual(throttled.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertTrue(throttled.has_header('Retry-After'))
+
+        retry = self.client.post(url, data, format='json', HTTP_IDEMPOTENCY_KEY='mover-1')
+        self.assertEqual(retry.status_code, status.HTTP_200_OK)
+        self.assertFalse(retry.has_header('Idempotent-Replayed'))
+        self.assertEqual(Round.objects.get(game=self.game).player1_move, 'ROCK')
+
+    def test_replay_keeps_retry_after(self):
+        response = HttpResponse(status=202)
+        response['Retry-After'] = '5'
+        entry = idempotency.result_entry(idempotency.Scope('clave', 'huella'), response)
+        self.assertEqual(idempotency.replay(entry['response'])['Retry-After'], '5')
+
+
+class ConcurrentIdempotencyTests(TransactionTestCase):
+    """
+    Reintentos simultáneos con la misma Idempotency-Key: la vista se ejecuta
+    una sola vez y todos reciben la misma respuesta
+    """
+    THREADS = 8
+
+    def setUp(self):
+        cache.clear()
+
+    def post_concurrently(self, url, data, key):
+        barrier = threading.Barrier(self.THREADS)
+
+        def post(_):
+            barrier.wait()
+            try:
+                return Client().post(url, data, content_type='application/json', HTTP_IDEMPOTENCY_KEY=key)
+            finally:
+                connection.close()
+
+        with ThreadPoolExecutor(max_workers=self.THREADS) as executor:
+            return list(executor.map(post, range(self.THREADS)))
+
+    def test_concurrent_retries_execute_once(self):
+        responses = self.post_concurrently(
+            '/api/create-game/', {"player1_name": "Ana", "player2_name": "Luis"}, 'juego'
+        )
+        self.assertEqual({response.status_code for response in responses}, {status.HTTP_200_OK})
+        self.assertEqual(len({response.content for response in responses}), 1)
+        self.assertEqual(sum(response.has_header('Idempotent-Replayed') for response in responses), self.THREADS - 1)
+        self.assertEqual(Game.objects.count(), 1)
+        self.assertEqual(Player.objects.count(), 2)
+
+        game = json.loads(responses[0].content)
+        for turn, (player, movement) in enumerate([('player1', 'ROCK'), ('player2', 'SCISSORS')]):
+            responses = self.post_concurrently(
+                f"/api/games/{game['id']}/make_move/",
+                {"player_id": game[player]['id'], "movement": movement},
+                f'movimiento-{turn}'
+            )
+            self.assertEqual({response.status_code for response in responses}, {status.HTTP_200_OK})
+            self.assertEqual(len({response.content for response in responses}), 1)
+
+        version = game['version']
+        game = Game.objects.get(pk=game['id'])
+        self.assertEqual((game.version, game.player1_score), (version + 2, 1))
+        self.assertEqual(Round.objects.filter(game=game).count(), 1)
+
+    async def test_async_retry(self):
+        data = {"player1_name": "Ana", "player2_name": "Luis"}
+        first = await self.async_client.post(
+            '/api/async/create-game/', data, content_type='application/json', headers={'Idempotency-Key': 'asinc'}
+        )
+        retry = await self.async_client.post(
+            '/api/async/create-game/', data, content_type='application/json', headers={'Idempotency-Key': 'asinc'}
+        )
+        self.assertEqual(retry.content, first.content)
+        self.assertEqual(retry['Idempotent-Replayed'], 'true')
+        self.assertEqual(await Game.objects.acount(), 1)
+
+
+class ThrottleTests(APITestCase):
+    """
+    Pruebas de los límites por IP y por jugador
+    """
+    def setUp(self):
+        cache.clear()
+        self.ana = Player.objects.create(name="Ana")
+        self.luis = Player.objects.create(name="Luis")
+        self.game = Game.objects.create(player1=self.ana, player2=self.luis)
+
+    def move(self, player, movement="ROCK", **extra):
+        return self.client.post(
+            f'/api/games/{self.game.id}/make_move/',
+            {"player_id": player.id, "movement": movement}, format='json', **extra
+        )
+
+    def test_bucket_refills(self):
+        bucket = TokenBucket('test', 2, 1)
+        state, wait = bucket.take(None, 100.0)
+        state, wait = bucket.take(state, 100.0)
+        self.assertEqual(wait, 0)
+        state, wait = bucket.take(state, 100.0)
+        self.assertAlmostEqual(wait, 0.5)
+        # Medio segundo después hay un token; no se acumulan más de 2
+        state, wait = bucket.take(state, 100.5)
+        self.assertEqual(wait, 0)
+        state, _ = bucket.take(state, 200.0)
+        self.assertAlmostEqual(state[0], 1)
+        self.assertEqual(TokenBucket.from_rate('x', '30/m').rate, 0.5)
+
+    @throttle_rates(player='2/m')
+    def test_player_throttled(self):
+        self.assertEqual(self.move(self.ana).status_code, status.HTTP_200_OK)
+        self.assertEqual(self.move(self.ana).status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.move(self.ana)
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertEqual(response['Retry-After'], '30')
+
+        # Otro jugador tiene su propia cubeta y las lecturas no cuentan
+        self.assertEqual(self.move(self.luis, "SCISSORS").status_code, status.HTTP_200_OK)
+        # Enviar el ID de Ana desde otra dirección no gasta su cubeta
+        self.assertEqual(self.move(self.ana, REMOTE_ADDR='10.0.0.9').status_code, status.HTTP_200_OK)
+        self.assertEqual(self.client.get(f'/api/games/{self.game.id}/').status_code, status.HTTP_200_OK)
+
+    @throttle_rates(ip='3/m')
+    def test_ip_throttled(self):
+        for _ in range(3):
+            self.assertEqual(self.client.get('/api/players/').status_code, status.HTTP_200_OK)
+        self.assertEqual(self.client.get('/api/players/').status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        # Cada dirección tiene su cubeta; sin proxies de confianza,
+        # X-Forwarded-For no cambia la dirección
+        response = self.client.get('/api/players/', REMOTE_ADDR='10.0.0.2')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        response = self.client.get('/api/players/', HTTP_X_FORWARDED_FOR='10.0.0.3')
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+
+    @throttle_rates(player='1/m')
+    def test_async_move_throttled(self):
+        async def moves():
+            url = f'/api/async/games/{self.game.id}/make_move/'
+            data = {"player_id": self.ana.id, "movement": "ROCK"}
+            first = await self.async_client.post(url, data, content_type='application/json')
+            second = await self.async_client.post(url, data, content_type='application/json')
+            return first, second
+
+        first, second = async_to_sync(moves)()
+        self.assertEqual(first.status_code, status.HTTP_200_OK)
+        self.assertEqual(second.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertEqual(second['Retry-After'], '60')
+
+    def player_tokens(self, player):
+        return cache.get(f'throttle:player:127.0.0.1:{player.id}')[0]
+
+    @throttle_rates(ip='1/m', player='5/m')
+    def test_denied_request_does_not_spend_later_scopes(self):
+        self.assertEqual(self.move(self.ana).status_code, status.HTTP_200_OK)
+        self.assertEqual(self.move(self.ana).status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        # La IP rechazó el segundo movimiento antes de mirar al jugador
+        self.assertAlmostEqual(self.player_tokens(self.ana), 4, places=2)
+
+    @throttle_rates(ip='1/m', player='5/m')
+    def test_async_denied_request_does_not_spend_later_scopes(self):
+        async def moves():
+            url = f'/api/async/games/{self.game.id}/make_move/'
+            data = {"player_id": self.ana.id, "movement": "ROCK"}
+            await self.async_client.post(url, data, content_type='application/json')
+            return await self.async_client.post(url, data, content_type='application/json')
+
+        self.assertEqual(async_to_sync(moves)().status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertAlmostEqual(self.player_tokens(self.ana), 4, places=2)
+
+
+class LoadSheddingTests(APITestCase):
+    """
+    Pruebas del descarte de carga por peticiones en curso y latencia SQL
+    """
+    def setUp(self):
+        monitor.reset()
+
+    def tearDown(self):
+        monitor.reset()
+
+    @override_settings(SHED_MAX_INFLIGHT=3, SHED_RETRY_AFTER=2)
+    def test_sheds_when_queue_is_full(self):
+        monitor.inflight = 3
+        response = self.client.get('/api/players/')
+        self.assertEqual(response.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+        self.assertEqual(response['Retry-After'], '2')
+        # /metrics sigue respondiendo para poder observar la sobrecarga
+        self.assertEqual(self.client.get('/metrics').status_code, status.HTTP_200_OK)
+
+        monitor.inflight = 1
+        self.assertEqual(self.client.get('/api/players/').status_code, status.HTTP_200_OK)
+        self.assertEqual(monitor.inflight, 1)
+
+    @override_settings(SHED_DB_LATENCY_MS=100)
+    def test_sheds_on_db_latency_and_recovers(self):
+        self.client.get('/api/players/')
+        self.assertLess(monitor.db_latency() * 1000, 100)
+
+        monitor.latency = 0.5
+        response = self.client.get('/api/players/')
+        self.assertEqual(response.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+
+        # Sin peticiones nuevas la media decae y el descarte se levanta
+        later = monitor.updated + 3 * HALF_LIFE
+        self.assertLess(monitor.db_latency(later) * 1000, 100)
+        monitor.updated -= 3 * HALF_LIFE
+        self.assertEqual(self.client.get('/api/players/').status_code, status.HTTP_200_OK)
+
+
+class EventLogTests(APITestCase):
+    """
+    Pruebas del registro de eventos, su repetición y los snapshots
+    """
+    def setUp(self):
+        cache.clear()
+        self.ana = Player.objects.create(name="Ana")
+        self.luis = Player.objects.create(name="Luis")
+        self.game = Game.objects.create(player1=self.ana, player2=self.luis)
+
+    def play_rounds(self, game, rounds):
+        for player1_move, player2_move in rounds:
+            apply_move(game.id, self.ana.id, player1_move)
+            apply_move(game.id, self.luis.id, player2_move)
+
+    def assert_rebuilt(self, game):
+        game.refresh_from_db()
+        state = events.rebuild(game.id)
+        self.assertEqual(state.seq, game.move_count)
+        self.assertEqual(
+            (state.player1_score, state.player2_score, state.winner_id, state.is_active),
+            (game.player1_score, game.player2_score, game.winner_id, game.is_active)
+        )
+        return state
+
+    def test_moves_are_logged(self):
+        self.play_rounds(self.game, [('ROCK', 'ROCK'), ('PAPER', 'ROCK')])
+        apply_move(self.game.id, self.ana.id, 'SCISSORS')
+
+        logged = list(MoveEvent.objects.filter(game_id=self.game.id).order_by('seq').values_list('seq', 'seat', 'move'))
+        self.assertEqual(logged, [
+            (1, MoveEvent.PLAYER1, 'ROCK'), (2, MoveEvent.PLAYER2, 'ROCK'),
+            (3, MoveEvent.PLAYER1, 'PAPER'), (4, MoveEvent.PLAYER2, 'ROCK'),
+            (5, MoveEvent.PLAYER1, 'SCISSORS'),
+        ])
+        state = self.assert_rebuilt(self.game)
+        self.assertEqual(state.round, ['SCISSORS', None])
+
+        # Un movimiento rechazado no deja evento
+        with self.assertRaises(MoveError):
+            apply_move(self.game.id, self.ana.id, 'ROCK')
+        self.assertEqual(MoveEvent.objects.filter(game_id=self.game.id).count(), 5)
+
+        event = MoveEvent.objects.get(game_id=self.game.id, seq=1)
+        event.move = 'PAPER'
+        with self.assertRaises(ValueError):
+            event.save()
+
+    def test_restart_closes_log(self):
+        apply_move(self.game.id, self.ana.id, 'ROCK')
+        response = self.client.post(f'/api/games/{self.game.id}/restart_game/', {}, format='json')
+
+        closing = MoveEvent.objects.get(game_id=self.game.id, seq=2)
+        self.assertEqual((closing.seat, closing.move), (MoveEvent.CLOSED, None))
+        self.assertFalse(self.assert_rebuilt(self.game).is_active)
+
+        # El juego nuevo empieza su propio registro
+        new_game = Game.objects.get(pk=response.data['id'])
+        self.play_rounds(new_game, [('PAPER', 'ROCK')])
+        self.assertEqual(self.assert_rebuilt(new_game).player1_score, 1)
+
+    def test_batch_and_bot_moves_are_logged(self):
+        other = Game.objects.create(player1=self.ana, player2=self.luis)
+        moves = []
+        for game in (self.game, other):
+            for _ in range(Game.WINNING_SCORE):
+                moves.append({"game_id": game.id, "player_id": self.ana.id, "movement": "ROCK"})
+                moves.append({"game_id": game.id, "player_id": self.luis.id, "movement": "SCISSORS"})
+        self.client.post('/api/games/batch_move/', {"moves": moves}, format='json')
+        for game in (self.game, other):
+            self.assertEqual(self.assert_rebuilt(game).winner_id, self.ana.id)
+
+        response = self.client.post('/api/create-game/', {"player1_name": "Ana", "bot_strategy": "random"}, format='json')
+        bot_game = Game.objects.get(pk=response.data['id'])
+        apply_move(bot_game.id, self.ana.id, 'ROCK')
+        seats = list(MoveEvent.objects.filter(game_id=bot_game.id).order_by('seq').values_list('seat', flat=True))
+        self.assertEqual(seats, [MoveEvent.PLAYER1, MoveEvent.PLAYER2])
+        self.assert_rebuilt(bot_game)
+
+    def test_log_costs_one_insert(self):
+        def inserts(action):
+            with CaptureQueriesContext(connection) as context:
+                action()
+            return [query['sql'].split('"')[1] for query in context.captured_queries
+                    if query['sql'].startswith('INSERT')]
+
+        # Un movimiento suelto añade solo el INSERT de su evento
+        self.assertEqual(inserts(lambda: apply_move(self.game.id, self.ana.id, 'ROCK')), ['api_round', 'api_moveevent'])
+        self.assertEqual(inserts(lambda: apply_move(self.game.id, self.luis.id, 'ROCK')), ['api_moveevent'])
+
+        # Un lote inserta los eventos de todos sus juegos de una vez
+        other = Game.objects.create(player1=self.ana, player2=self.luis)
+        moves = [
+            {"game_id": game.id, "player_id": player.id, "movement": "PAPER"}
+            for game in (self.game, other) for player in (self.ana, self.luis)
+        ]
+        batch = inserts(lambda: self.client.post('/api/games/batch_move/', {"moves": moves}, format='json'))
+        self.assertEqual(batch.count('api_moveevent'), 1)
+
+    @mock.patch.object(events, 'SNAPSHOT_EVERY', 4)
+    def test_rebuild_starts_from_snapshot(self):
+        self.play_rounds(self.game, [('ROCK', 'ROCK'), ('PAPER', 'ROCK'), ('ROCK', 'ROCK'), ('ROCK', 'PAPER')])
+        apply_move(self.game.id, self.ana.id, 'ROCK')
+        snapshots = dict(GameSnapshot.objects.filter(game_id=self.game.id).values_list('seq', 'state'))
+        self.assertEqual(list(snapshots), [4, 8])
+
+        # Cada snapshot coincide con la repetición desde el primer evento
+        replayed = events.GameState(events.game_header(self.game.id))
+        for seat, move in MoveEvent.objects.filter(game_id=self.game.id).order_by('seq').values_list('seat', 'move'):
+            replayed.apply(seat, move)
+            if replayed.seq in snapshots:
+                self.assertEqual(snapshots[replayed.seq], replayed.as_dict())
+
+        # Sin los eventos anteriores al último snapshot, el estado sale igual
+        MoveEvent.objects.filter(game_id=self.game.id, seq__lte=8).delete()
+        state = self.assert_rebuilt(self.game)
+        self.assertEqual(state.as_dict(), replayed.as_dict())
+        self.assertEqual((state.player1_score, state.player2_score, state.round), (1, 1, ['ROCK', None]))
+        self.assertEqual(events.rebuild(self.game.id, 8).as_dict(), snapshots[8])
+
+    def test_events_endpoint(self):
+        self.play_rounds(self.game, [('ROCK', 'SCISSORS')])
+        response = self.client.get(f'/api/games/{self.game.id}/events/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        lines = [json.loads(line) for line in b''.join(response.streaming_content).splitlines()]
+        self.assertEqual([(line['seq'], line['player_id'], line['move']) for line in lines], [
+            (1, self.ana.id, 'ROCK'), (2, self.luis.id, 'SCISSORS'),
+        ])
+        self.assertFalse(lines[0]['closed'])
+
+        response = self.client.get(f'/api/games/{self.game.id}/events/?after=1')
+        self.assertEqual(len(b''.join(response.streaming_content).splitlines()), 1)
+        self.assertEqual(self.client.get(f'/api/games/{self.game.id}/events/?after=x').status_code, 400)
+        self.assertEqual(self.client.get('/api/games/999999/events/').status_code, 404)
+
+    def test_replay_endpoint(self):
+        self.play_rounds(self.game, [('ROCK', 'SCISSORS'), ('ROCK', 'PAPER')])
+        response = self.client.get(f'/api/games/{self.game.id}/replay/?seq=3')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json(), {
+            'game_id': self.game.id, 'seq': 3, 'player1_score': 1, 'player2_score': 0,
+            'winner_id': None, 'is_active': True, 'round': ['ROCK', None],
+        })
+        self.assertEqual(self.client.get(f'/api/games/{self.game.id}/replay/').json()['player2_score'], 1)
+        self.assertEqual(self.client.get(f'/api/games/{self.game.id}/replay/?seq=-1').status_code, 400)
+        self.assertEqual(self.client.get('/api/games/999999/replay/').status_code, 404)
+
+    def test_archived_game_replays(self):
+        self.play_rounds(self.game, [('PAPER', 'ROCK')] * Game.WINNING_SCORE)
+        Game.objects.filter(pk=self.game.id).update(created_at=timezone.now() - timedelta(days=60))
+        Round.objects.filter(game_id=self.game.id).update(created_at=timezone.now() - timedelta(days=60))
+        archive_games()
+        self.assertFalse(Game.objects.filter(pk=self.game.id).exists())
+
+        response = self.client.get(f'/api/games/{self.game.id}/replay/')
+        self.assertEqual(response.json()['winner_id'], self.ana.id)
+        self.assertEqual(response.json()['seq'], 2 * Game.WINNING_SCORE)
+
+    def test_backfill(self):
+        backfill = importlib.import_module('api.migrations.0015_backfill_move_events')
+        self.play_rounds(self.game, [('ROCK', 'ROCK'), ('PAPER', 'ROCK')])
+        apply_move(self.game.id, self.ana.id, 'SCISSORS')
+        restarted = Game.objects.create(player1=self.ana, player2=self.luis)
+        self.client.post(f'/api/games/{restarted.id}/restart_game/', {}, format='json')
+        expected = list(MoveEvent.objects.order_by('game_id', 'seq').values_list('game_id', 'seq', 'seat', 'move'))
+
+        MoveEvent.objects.all().delete()
+        Game.objects.update(move_count=0)
+        backfill.backfill_move_events(apps, None)
+        self.assertEqual(
+            list(MoveEvent.objects.order_by('game_id', 'seq').values_list('game_id', 'seq', 'seat', 'move')),
+            expected
+        )
+        self.assert_rebuilt(self.game)
+        self.assertEqual(Game.objects.get(pk=restarted.id).move_count, 1)
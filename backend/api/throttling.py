@@ -0,0 +1,195 @@
+"""
+Límites de peticiones por cliente con cubetas de tokens (token bucket).
+
+Cada cliente tiene una cubeta por ámbito: 'ip' (todas las peticiones de una
+dirección) y 'player' (los movimientos de un jugador desde una dirección,
+por la IP y el player_id). El player_id llega en el cuerpo sin autenticar:
+la cubeta 'player' incluye la IP para que un cliente que envíe el ID de
+otro jugador solo gaste su propia cubeta y no pueda dejar sin movimientos
+al jugador real.
+Una cubeta admite ráfagas de hasta N peticiones y se rellena a N por
+periodo, según la tasa "N/periodo" de REST_FRAMEWORK['DEFAULT_THROTTLE_RATES']
+(p. ej. '20/s'). Una petición sin token recibe un 429 con Retry-After.
+
+El estado de cada cubeta (tokens y momento de la última actualización) vive
+en la caché de Django, compartida entre procesos con REDIS_URL. Como en
+los throttles de DRF, la lectura y la escritura no son atómicas: con
+peticiones simultáneas de un mismo cliente puede colarse alguna de más.
+
+Las vistas de DRF aplican IPThrottle y PlayerThrottle desde
+DEFAULT_THROTTLE_CLASSES; las vistas asíncronas usan athrottle_wait.
+"""
+import math
+import time
+
+from django.core.cache import cache
+from rest_framework.settings import api_settings
+from rest_framework.throttling import BaseThrottle
+
+
+class TokenBucket:
+    """
+    Cubeta de capacity tokens que se rellena a rate tokens por segundo
+    """
+    def __init__(self, scope, capacity, period):
+        self.scope = scope
+        self.capacity = capacity
+        self.rate = capacity / period
+        # Pasado este tiempo la cubeta está llena: la entrada puede caducar
+        self.timeout = math.ceil(period) + 1
+
+    @classmethod
+    def from_rate(cls, scope, rate):
+        """
+        Cubeta para una tasa con el formato de DRF ('20/s', '100/m'...)
+        """
+        count, period = rate.split('/')
+        seconds = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}[period[0]]
+        return cls(scope, int(count), seconds)
+
+    def cache_key(self, ident):
+        return f'throttle:{self.scope}:{ident}'
+
+    def take(self, state, now):
+        """
+        Intenta sacar un token
+
+        Args:
+            state: (tokens, momento) guardado, o None para una cubeta llena
+            now: Momento actual en segundos
+
+        Returns:
+            tuple: (nuevo estado, segundos hasta el siguiente token o 0 si
+            la petición se admite)
+        """
+        tokens, updated = state if state is not None else (self.capacity, now)
+        tokens = min(self.capacity, tokens + max(0.0, now - updated) * self.rate)
+        if tokens >= 1:
+            return (tokens - 1, now), 0
+        return (tokens, now), (1 - tokens) / self.rate
+
+    def consume(self, ident, now=None):
+        """
+        Returns:
+            float: 0 si se admite la petición; si no, segundos de espera
+        """
+        key = self.cache_key(ident)
+        state, wait = self.take(cache.get(key), time.time() if now is None else now)
+        cache.set(key, state, self.timeout)
+        return wait
+
+    async def aconsume(self, ident, now=None):
+        key = self.cache_key(ident)
+        state, wait = self.take(await cache.aget(key), time.time() if now is None else now)
+        await cache.aset(key, state, self.timeout)
+        return wait
+
+
+def bucket(scope):
+    """
+    Returns:
+        TokenBucket | None: Cubeta del ámbito, o None si no tiene tasa
+    """
+    rate = api_settings.DEFAULT_THROTTLE_RATES.get(scope)
+    return TokenBucket.from_rate(scope, rate) if rate else None
+
+
+def ip_ident(request):
+    """
+    Dirección IP del cliente: la de REMOTE_ADDR, o la de X-Forwarded-For
+    según REST_FRAMEWORK['NUM_PROXIES']
+    """
+    return BaseThrottle().get_ident(request)
+
+
+def player_key(ip, player_id):
+    return f'{ip}:{player_id}'
+
+
+def player_ident(request):
+    """
+    Dirección IP y player_id del cuerpo de los POST, como make_move. None si
+    la petición no lo lleva.
+    """
+    if request.method != 'POST':
+        return None
+    try:
+        player_id = request.data.get('player_id')
+    except AttributeError:
+        # Cuerpo que no es un objeto (p. ej. una lista JSON)
+        return None
+    return player_key(ip_ident(request), player_id) if player_id else None
+
+
+# Identificador del cliente en cada ámbito, o None si la petición no
+# cuenta en él
+CLIENT_IDENTS = {
+    'ip': ip_ident,
+    'player': player_ident,
+}
+
+
+class TokenBucketThrottle(BaseThrottle):
+    """
+    Throttle de DRF sobre una TokenBucket del ámbito scope, que identifica
+    al cliente con CLIENT_IDENTS[scope]. La tasa se lee en cada petición,
+    así los cambios de settings se aplican al momento.
+
+    Como en athrottle_wait, una petición ya rechazada por un throttle
+    anterior no gasta tokens de los siguientes: DRF los consulta todos.
+    """
+    scope = None
+
+    def __init__(self):
+        self.bucket = bucket(self.scope)
+        self.wait_seconds = None
+
+    def allow_request(self, request, view):
+        if self.bucket is None or getattr(request, 'throttle_wait', 0):
+            return True
+        ident = CLIENT_IDENTS[self.scope](request)
+        if ident is None:
+            return True
+        self.wait_seconds = self.bucket.consume(ident)
+        request.throttle_wait = self.wait_seconds
+        return not self.wait_seconds
+
+    def wait(self):
+        return self.wait_seconds
+
+
+class IPThrottle(TokenBucketThrottle):
+    """
+    Todas las peticiones de una dirección IP
+    """
+    scope = 'ip'
+
+
+class PlayerThrottle(TokenBucketThrottle):
+    """
+    Las peticiones con player_id en el cuerpo, por dirección
+    """
+    scope = 'player'
+
+
+async def athrottle_wait(request, player_id=None):
+    """
+    Aplica los límites 'ip' y 'player' a una vista asíncrona. Se detiene en
+    el primer ámbito que rechaza la petición, sin gastar tokens del resto.
+
+    Returns:
+        int: 0 si se admite la petición; si no, segundos que indicar en
+        Retry-After
+    """
+    ip = ip_ident(request)
+    scopes = [('ip', ip)]
+    if player_id:
+        scopes.append(('player', player_key(ip, player_id)))
+    for scope, ident in scopes:
+        scope_bucket = bucket(scope)
+        if scope_bucket is None:
+            continue
+        wait = await scope_bucket.aconsume(ident)
+        if wait:
+            return math.ceil(wait)
+    return 0
@@ -1,6 +1,7 @@
-from django.urls import path, include
+from django.urls import path, include, re_path
 from rest_framework.routers import DefaultRouter
-from .views import PlayerViewSet, GameViewSet, create_game
+from .views import PlayerViewSet, GameViewSet, create_game, leaderboard, move_analytics
+from . import async_views, events, export
 
 router = DefaultRouter()
 router.register(r'players', PlayerViewSet)
@@ -9,4 +10,18 @@ router.register(r'games', GameViewSet)
 urlpatterns = [
     path('', include(router.urls)),
     path('create-game/', create_game, name='create-game'),
+    path('leaderboard/', leaderboard, name='leaderboard'),
+    path('analytics/', move_analytics, name='move-analytics'),
+    # Registro de eventos de un juego (también de los archivados)
+    path('games/<int:game_id>/events/', events.game_events, name='game-events'),
+    path('games/<int:game_id>/replay/', events.game_replay, name='game-replay'),
+    re_path(r'^export/(?P<kind>games|rounds)/$', export.export_history, name='export-history'),
+    # Variantes asíncronas para servir desde ASGI
+    path('async/create-game/', async_views.create_game, name='async-create-game'),
+    path('async/games/<int:game_id>/', async_views.game_detail, name='async-game-detail'),
+    path('async/games/<int:game_id>/make_move/', async_views.make_move, name='async-make-move'),
+    # Cola de emparejamiento (solo asíncrona: el emparejador corre en el
+    # bucle de eventos del proceso ASGI)
+    path('matchmaking/', async_views.matchmaking_enqueue, name='matchmaking'),
+    path('matchmaking/<int:player_id>/', async_views.matchmaking_ticket, name='matchmaking-ticket'),
 ] 
\ No newline at end of file
@@ -1,142 +1,385 @@
+from django.db import transaction
+from django.http import Http404
 from django.shortcuts import render
 from rest_framework import viewsets, status
 from rest_framework.decorators import api_view, action
+from .renderers import FastJSONRenderer
 from rest_framework.response import Response
-from .models import Player, Game, Round
-from .serializers import PlayerSerializer, GameSerializer, RoundSerializer
+from rest_framework.settings import api_settings
+from .models import ArchivedGame, Player, PlayerStats, Game
+from .serializers import PlayerSerializer, PlayerStatsSerializer, GameSerializer, GameDeltaSerializer, GameSummarySerializer, RoundSerializer
+from .realtime import broadcast_game
+from .filters import CreatedRangeFilter, GameFilter
+from . import analytics, fast_serializers, services, stats
+from .cache import cache_game, etag_matches, game_etag, get_cached_game, invalidate_game, invalidate_games, update_cached_game
 import logging
 from rest_framework.exceptions import ValidationError
 
 # Configuración del logger para el módulo
 logger = logging.getLogger(__name__)
 
+def serialize_game(game_id):
+    """
+    Serializa un juego recargándolo con sus relaciones precargadas, de modo
+    que el número de consultas no crezca con la cantidad de rondas, y deja
+    el resultado en la caché de juegos (write-through)
+    """
+    try:
+        game = Game.objects.with_details().get(pk=game_id)
+    except Game.DoesNotExist:
+        # Lectura a través del archivo de juegos terminados
+        game = ArchivedGame.objects.with_details().filter(pk=game_id).first()
+        if game is None:
+            raise
+    data = GameSerializer(game).data
+    cache_game(game.pk, game.version, data)
+    return data
+
+# Tipo de contenido con el que el cliente pide la respuesta compacta de
+# make_move (también con ?delta=1)
+DELTA_MEDIA_TYPE = 'application/vnd.rps.delta+json'
+
+
+class DeltaJSONRenderer(FastJSONRenderer):
+    media_type = DELTA_MEDIA_TYPE
+
+
+def wants_delta(request):
+    """
+    Indica si el cliente pidió la respuesta compacta de un movimiento, con
+    ?delta=1 o con Accept: application/vnd.rps.delta+json
+    """
+    return (
+        request.GET.get('delta') in ('1', 'true')
+        or DELTA_MEDIA_TYPE in request.headers.get('Accept', '')
+    )
+
+
+def serialize_move_delta(game):
+    """
+    Serializa el resultado de un movimiento como delta (GameDeltaSerializer)
+    con una sola consulta, la de los dos jugadores, sea cual sea el número
+    de rondas del juego. Deja la caché del juego al día a partir del delta.
+
+    Args:
+        game: Juego devuelto por services.apply_move, con current_round
+            cargada
+    """
+    players = Player.objects.in_bulk([game.player1_id, game.player2_id])
+    game.player1 = players[game.player1_id]
+    game.player2 = players[game.player2_id]
+    if game.winner_id:
+        game.winner = players[game.winner_id]
+    current_round = game.current_round
+    current_round.winner_name = players[current_round.winner_id].name if current_round.winner_id else None
+
+    data = GameDeltaSerializer(game).data
+    update_cached_game(game.pk, data)
+    return data
+
 # ViewSet para manejar las operaciones CRUD de jugadores
 class PlayerViewSet(viewsets.ModelViewSet):
     queryset = Player.objects.all()
     serializer_class = PlayerSerializer
+    filter_backends = [CreatedRangeFilter]
+
+    def list(self, request, *args, **kwargs):
+        # Filas de .values() serializadas sin PlayerSerializer (misma salida)
+        queryset = fast_serializers.player_values(self.filter_queryset(self.get_queryset()))
+        page = self.paginate_queryset(queryset)
+        return self.get_paginated_response(fast_serializers.player_rows(page))
+
+    def perform_update(self, serializer):
+        # Los juegos incluyen el nombre de sus jugadores: si cambia, sus
+        # payloads en caché y sus ETags dejan de valer
+        renamed = serializer.validated_data.get('name', serializer.instance.name) != serializer.instance.name
+        with transaction.atomic():
+            player = serializer.save()
+            game_ids = services.touch_player_games(player.pk) if renamed else []
+        invalidate_games(game_ids)
+
+    @action(detail=True, methods=['get'])
+    def stats(self, request, pk=None):
+        """
+        Estadísticas precalculadas del jugador (ceros si aún no terminó
+        ningún juego)
+        """
+        player = self.get_object()
+        try:
+            player_stats = PlayerStats.objects.get(player=player)
+        except PlayerStats.DoesNotExist:
+            player_stats = PlayerStats(player=player)
+        return Response(PlayerStatsSerializer(player_stats).data)
+
+    @action(detail=True, methods=['get'])
+    def analytics(self, request, pk=None):
+        """
+        Patrones de juego del jugador: frecuencia de cada movimiento,
+        transiciones entre rondas consecutivas y tasa de victoria según el
+        movimiento anterior
+        """
+        player = self.get_object()
+        result = analytics.cached(f'player:{player.id}', analytics.analyze_player, player.id)
+        return Response({"player": player.id, **result})
 
 # ViewSet para manejar las operaciones relacionadas con los juegos
 class GameViewSet(viewsets.ModelViewSet):
     queryset = Game.objects.all()
     serializer_class = GameSerializer
+    filter_backends = [GameFilter, CreatedRangeFilter]
+    # Elementos admitidos por petición en bulk y batch_move
+    MAX_BATCH_SIZE = 5000
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        # Las lecturas cargan jugadores y rondas en bloque para evitar N+1;
+        # las acciones de escritura trabajan sobre el juego sin precargar
+        if self.action == 'list':
+            queryset = queryset.with_players()
+        elif self.action == 'retrieve':
+            queryset = queryset.with_details()
+        elif self.action in ('update', 'partial_update'):
+            # Ver update: el juego se edita con su fila bloqueada
+            queryset = queryset.select_for_update()
+        return queryset
+
+    def list(self, request, *args, **kwargs):
+        # Filas de .values() serializadas sin GameSummarySerializer (misma
+        # salida); la paginación por cursor admite filas como dicts
+        queryset = fast_serializers.game_values(self.filter_queryset(self.get_queryset()))
+        page = self.paginate_queryset(queryset)
+        return self.get_paginated_response(fast_serializers.game_summary_rows(page))
+
+    def get_serializer_class(self):
+        # El listado usa la representación resumida, sin rondas anidadas
+        if self.action == 'list':
+            return GameSummarySerializer
+        return super().get_serializer_class()
+
+    def retrieve(self, request, *args, **kwargs):
+        """
+        Devuelve el estado del juego desde la caché si está disponible, con
+        un ETag basado en Game.version. Si el cliente envía If-None-Match
+        con el ETag vigente se responde 304 sin consultar la base de datos.
+        """
+        try:
+            game_id = int(kwargs[self.lookup_field])
+        except ValueError:
+            return super().retrieve(request, *args, **kwargs)
+
+        cached = get_cached_game(game_id)
+        if cached is None:
+            try:
+                game = self.get_object()
+            except Http404:
+                # Los juegos archivados se leen del archivo, con el mismo
+                # payload y ETag que tenían antes de moverse
+                game = ArchivedGame.objects.with_details().filter(pk=game_id).first()
+                if game is None:
+                    raise
+            payload = self.get_serializer(game).data
+            cache_game(game.pk, game.version, payload)
+            version = game.version
+        else:
+            version, payload = cached
+
+        etag = game_etag(game_id, version)
+        if etag_matches(request, etag):
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers={'ETag': etag})
+        return Response(payload, headers={'ETag': etag})
+
+    def update(self, request, *args, **kwargs):
+        """
+        Edita el juego en una transacción, leyéndolo con SELECT ... FOR
+        UPDATE (ver get_queryset) como services.lock_game: ni otra edición
+        ni un movimiento simultáneo pueden guardar la misma versión ni pisar
+        el marcador. La caché se borra una vez confirmada la transacción.
+        """
+        with transaction.atomic():
+            response = super().update(request, *args, **kwargs)
+        invalidate_game(response.data['id'])
+        return response
+
+    def perform_update(self, serializer):
+        serializer.save(version=serializer.instance.version + 1)
+
+    def perform_destroy(self, instance):
+        game_id = instance.pk
+        instance.delete()
+        invalidate_game(game_id)
     
-    @action(detail=True, methods=['post'])
+    @action(detail=True, methods=['post'], renderer_classes=api_settings.DEFAULT_RENDERER_CLASSES + [DeltaJSONRenderer])
     def make_move(self, request, pk=None):
         """
         Endpoint para procesar un movimiento de un jugador en una ronda
         
         Args:
-            request: Objeto Request con los datos del movimiento
+            request: Objeto Request con los datos del movimiento; con
+                ?delta=1 o Accept: application/vnd.rps.delta+json la
+                respuesta es compacta (ver GameDeltaSerializer)
             pk: ID del juego
             
         Returns:
-            Response: Estado actualizado del juego
+            Response: Estado actualizado del juego, o su delta
             
         Raises:
             ValidationError: Si el movimiento es inválido
             Game.DoesNotExist: Si el juego no existe
         """
         try:
-            # Obtener el juego actual
-            game = self.get_object()
             player_id = request.data.get('player_id')
             movement = request.data.get('movement')
             
-            # Validar el movimiento
-            if not movement in [Round.ROCK, Round.PAPER, Round.SCISSORS]:
-                logger.error(f"Movimiento inválido: {movement}")
-                raise ValidationError("Movimiento inválido. Debe ser ROCK, PAPER o SCISSORS")
+            # Validar el movimiento (las reglas del juego lo validan al aplicarlo)
+            if not isinstance(movement, str):
+                logger.error("Movimiento inválido: %s", movement)
+                raise ValidationError("Se requiere el movimiento")
             
             # Validar que se proporcionó el ID del jugador
             if not player_id:
                 logger.error("ID de jugador no proporcionado")
                 raise ValidationError("Se requiere el ID del jugador")
             
-            # Verificar si el juego sigue activo
-            if not game.is_active:
-                return Response(
-                    {"error": "El juego ya ha terminado"},
-                    status=status.HTTP_400_BAD_REQUEST
-                )
-            
-            # Obtener la última ronda del juego
-            current_round = game.rounds.order_by('-created_at').first()
-            
-            # Crear una nueva ronda si:
-            # - No hay rondas
-            # - La última ronda está completa (tiene ambos movimientos)
-            # - La última ronda tiene un ganador
-            if not current_round or \
-               (current_round.player1_move and current_round.player2_move) or \
-               current_round.winner:
-                current_round = Round.objects.create(game=game)
-                logger.info(f"Nueva ronda creada: {current_round.id}")
-            
-            # Validar el orden de los turnos
-            if current_round.player1_move is None:
-                # Si es el primer movimiento de la ronda, debe ser el jugador 1
-                if player_id != game.player1.id:
-                    return Response(
-                        {"error": "Es el turno del Jugador 1"},
-                        status=status.HTTP_400_BAD_REQUEST
-                    )
-            elif current_round.player2_move is None:
-                # Si ya hay un movimiento del jugador 1, debe ser el jugador 2
-                if player_id != game.player2.id:
-                    return Response(
-                        {"error": "Es el turno del Jugador 2"},
-                        status=status.HTTP_400_BAD_REQUEST
-                    )
-            else:
+            # Aplicar el movimiento de forma atómica sobre el juego bloqueado
+            try:
+                game = services.apply_move(pk, player_id, movement)
+            except services.MoveError as e:
                 return Response(
-                    {"error": "Esta ronda ya está completa"},
+                    {"error": str(e)},
                     status=status.HTTP_400_BAD_REQUEST
                 )
-            
-            # Registrar el movimiento del jugador correspondiente
-            if player_id == game.player1.id:
-                current_round.player1_move = movement
+
+            # Avisar al otro jugador sin que tenga que sondear la API
+            if wants_delta(request):
+                data = serialize_move_delta(game)
+                broadcast_game(game.pk, 'game.delta', data)
             else:
-                current_round.player2_move = movement
-            
-            current_round.save()
-            
-            # Si ambos jugadores han hecho su movimiento, determinar ganador
-            if current_round.player1_move and current_round.player2_move:
-                winner = current_round.determine_winner()
-                if winner:
-                    game.update_score(winner)
-                    
-                    # Verificar si hay un ganador del juego (3 victorias)
-                    if game.player1_score >= 3:
-                        game.winner = game.player1
-                        game.is_active = False
-                    elif game.player2_score >= 3:
-                        game.winner = game.player2
-                        game.is_active = False
-                    game.save()
-
-            return Response(GameSerializer(game).data)
+                data = serialize_game(game.pk)
+                broadcast_game(game.pk, 'game.update', data)
+            return Response(data, headers={'ETag': game_etag(game.pk, game.version)})
             
         except Game.DoesNotExist:
-            logger.error(f"Juego no encontrado: {pk}")
+            logger.error("Juego no encontrado: %s", pk)
             return Response(
                 {"error": "Juego no encontrado"},
                 status=status.HTTP_404_NOT_FOUND
             )
         except ValidationError as e:
-            logger.error(f"Error de validación: {str(e)}")
+            logger.error("Error de validación: %s", e)
             return Response(
                 {"error": str(e)},
                 status=status.HTTP_400_BAD_REQUEST
             )
         except Exception as e:
-            logger.critical(f"Error inesperado: {str(e)}", exc_info=True)
+            logger.critical("Error inesperado: %s", e, exc_info=True)
             return Response(
                 {"error": "Error interno del servidor"},
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
 
+    @action(detail=False, methods=['post'], url_path='bulk')
+    def bulk(self, request):
+        """
+        Endpoint para crear muchos juegos en una sola petición (torneos, bots)
+        
+        Args:
+            request: Objeto Request con la lista "games", cada elemento con
+                player1_name y player2_name
+            
+        Returns:
+            Response: Juegos creados, en representación resumida
+        """
+        items = request.data.get('games')
+        if not isinstance(items, list) or not items:
+            return Response(
+                {"error": "Se requiere una lista de juegos"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if len(items) > self.MAX_BATCH_SIZE:
+            return Response(
+                {"error": f"Como máximo {self.MAX_BATCH_SIZE} juegos por petición"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        pairs = []
+        for index, item in enumerate(items):
+            if not isinstance(item, dict) or not item.get('player1_name') or not item.get('player2_name'):
+                return Response(
+                    {"error": f"Juego {index}: se requieren los nombres de ambos jugadores"},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            pairs.append((item['player1_name'], item['player2_name']))
+
+        try:
+            games = services.create_games(pairs)
+        except services.PlayerError as e:
+            return Response(
+                {"error": str(e)},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        return Response(
+            GameSummarySerializer(games, many=True).data,
+            status=status.HTTP_201_CREATED
+        )
+
+    @action(detail=False, methods=['post'])
+    def batch_move(self, request):
+        """
+        Endpoint para aplicar muchos movimientos, de uno o varios juegos, en
+        una sola transacción
+        
+        Args:
+            request: Objeto Request con la lista "moves", cada elemento con
+                game_id, player_id y movement, en el orden en que se juegan
+            
+        Returns:
+            Response: Un resultado por movimiento, en el mismo orden, con el
+            estado del juego tras aplicarlo o el error que lo impidió
+        """
+        items = request.data.get('moves')
+        if not isinstance(items, list) or not items:
+            return Response(
+                {"error": "Se requiere una lista de movimientos"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if len(items) > self.MAX_BATCH_SIZE:
+            return Response(
+                {"error": f"Como máximo {self.MAX_BATCH_SIZE} movimientos por petición"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        # Los movimientos mal formados se rechazan aquí y el resto se aplica
+        results = [None] * len(items)
+        moves = []
+        positions = []
+        for index, item in enumerate(items):
+            # bool es subclase de int: true/false no son IDs de juego
+            if not isinstance(item, dict) or not isinstance(item.get('game_id'), int) \
+                    or isinstance(item['game_id'], bool):
+                results[index] = {"status": 400, "error": "Se requiere el ID del juego"}
+            elif not isinstance(item.get('movement'), str):
+                results[index] = {
+                    "game_id": item['game_id'], "status": 400,
+                    "error": "Se requiere el movimiento"
+                }
+            elif not item.get('player_id'):
+                results[index] = {
+                    "game_id": item['game_id'], "status": 400,
+                    "error": "Se requiere el ID del jugador"
+                }
+            else:
+                moves.append((item['game_id'], item['player_id'], item['movement']))
+                positions.append(index)
+
+        if moves:
+            for index, result in zip(positions, services.apply_moves(moves)):
+                results[index] = result
+            # Los juegos modificados se vuelven a leer de la base de datos en
+            # el próximo GET; no se serializan ni se difunden uno por uno
+            invalidate_games({game_id for game_id, _, _ in moves})
+
+        return Response({"results": results})
+
     @action(detail=True, methods=['post'])
     def restart_game(self, request, pk=None):
         """
@@ -150,31 +393,17 @@ class GameViewSet(viewsets.ModelViewSet):
             Response: Datos del nuevo juego creado
         """
         try:
-            old_game = self.get_object()
-            
-            # Asegurarnos de que el juego anterior quede inactivo
-            if old_game.is_active:
-                old_game.is_active = False
-                old_game.save()
-            
-            # Crear nuevo juego con los mismos jugadores
-            new_game = Game.objects.create(
-                player1=old_game.player1,
-                player2=old_game.player2,
-                is_active=True
-            )
-            
-            # Crear la primera ronda del nuevo juego
-            Round.objects.create(game=new_game)
-            
+            new_game = services.restart_game(pk)
+            # El juego anterior quedó inactivo: su entrada en caché ya no vale
+            invalidate_game(pk)
             # Obtener el juego actualizado con la nueva ronda
-            new_game.refresh_from_db()
-            
-            logger.info(f"Juego {old_game.id} reiniciado como {new_game.id}")
-            return Response(GameSerializer(new_game).data)
+            data = serialize_game(new_game.pk)
+            # Los clientes del juego anterior pasan al nuevo
+            broadcast_game(pk, 'game.restarted', data)
+            return Response(data)
             
         except Exception as e:
-            logger.error(f"Error al reiniciar juego: {str(e)}")
+            logger.error("Error al reiniciar juego: %s", e)
             return Response(
                 {"error": "No se pudo reiniciar el juego"},
                 status=status.HTTP_400_BAD_REQUEST
@@ -186,30 +415,73 @@ def create_game(request):
     Endpoint para crear un nuevo juego
     
     Args:
-        request: Objeto Request con los nombres de los jugadores
+        request: Objeto Request con los jugadores: player1_id/player2_id
+            para jugadores existentes o player1_name/player2_name. Con
+            bot_strategy (random, frequency o markov) el jugador 2 es la CPU;
+            rule_set elige la variante de reglas (classic o rpsls)
         
     Returns:
         Response: Datos del juego creado
     """
-    player1_name = request.data.get('player1_name')
-    player2_name = request.data.get('player2_name')
-    
-    # Validar que se proporcionaron ambos nombres
-    if not player1_name or not player2_name:
+    # Reutilizar jugadores existentes (por ID o por nombre normalizado) y
+    # crear el juego en una sola transacción
+    try:
+        game = services.create_game(request.data)
+    except services.PlayerError as e:
         return Response(
-            {"error": "Se requieren los nombres de ambos jugadores"},
+            {"error": str(e)},
             status=status.HTTP_400_BAD_REQUEST
         )
     
-    # Crear los jugadores
-    player1 = Player.objects.create(name=player1_name)
-    player2 = Player.objects.create(name=player2_name)
-    
-    # Crear el juego
-    game = Game.objects.create(
-        player1=player1,
-        player2=player2,
-        is_active=True
-    )
-    
     return Response(GameSerializer(game).data)
+
+
+# Jugadores mostrados por defecto y como máximo en la clasificación
+LEADERBOARD_SIZE = 10
+MAX_LEADERBOARD_SIZE = 100
+
+@api_view(['GET'])
+def leaderboard(request):
+    """
+    Clasificación de jugadores por juegos ganados (y, a igualdad, por rondas
+    ganadas) o, con ?by=rating, por rating Elo, leída de PlayerStats sin
+    recorrer juegos ni rondas
+
+    Args:
+        request: Objeto Request; ?limit= indica cuántos jugadores devolver
+            y ?by= el orden (wins o rating)
+
+    Returns:
+        Response: Lista ordenada con la posición y estadísticas de cada jugador
+    """
+    try:
+        limit = int(request.query_params.get('limit', LEADERBOARD_SIZE))
+    except ValueError:
+        return Response(
+            {"error": "limit debe ser un número entero"},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    limit = max(1, min(limit, MAX_LEADERBOARD_SIZE))
+    by = request.query_params.get('by', 'wins')
+    if by not in stats.LEADERBOARD_ORDERINGS:
+        return Response(
+            {"error": f"by debe ser uno de: {', '.join(stats.LEADERBOARD_ORDERINGS)}"},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+    rows = PlayerStatsSerializer(stats.leaderboard(limit, by), many=True).data
+    for rank, row in enumerate(rows, start=1):
+        row['rank'] = rank
+    return Response(rows)
+
+
+@api_view(['GET'])
+def move_analytics(request):
+    """
+    Patrones de juego agregados de todos los jugadores, calculados con
+    NumPy sobre el historial de rondas
+
+    Returns:
+        Response: Frecuencias, transiciones y tasas de victoria por movimiento
+    """
+    return Response(analytics.cached('all', analytics.analyze_all))
@@ -13,6 +13,9 @@ https://docs.djangoproject.com/en/5.1/ref/settings/
 from pathlib import Path
 import os
 
+import django
+from corsheaders.defaults import default_headers
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -32,6 +35,8 @@ ALLOWED_HOSTS = []
 # Application definition
 
 INSTALLED_APPS = [
+    # Debe ir primero: hace que runserver sirva la aplicación ASGI
+    'daphne',
     'django.contrib.admin',
     'django.contrib.auth',
     'django.contrib.contenttypes',
@@ -39,13 +44,18 @@ INSTALLED_APPS = [
     'django.contrib.messages',
     'django.contrib.staticfiles',
     'corsheaders',
+    'channels',
     'rest_framework',
     'api',
     'drf_yasg',
 ]
 
 MIDDLEWARE = [
+    # La primera, para medir la petición completa (ver api.metrics)
+    'api.metrics.MetricsMiddleware',
     'corsheaders.middleware.CorsMiddleware',
+    # 503 mientras el proceso esté saturado (ver api.shedding)
+    'api.shedding.LoadSheddingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -53,6 +63,8 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    # Reintentos con Idempotency-Key (ver api.idempotency)
+    'api.idempotency.IdempotencyMiddleware',
 ]
 
 ROOT_URLCONF = 'backend.urls'
@@ -74,6 +86,23 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'backend.wsgi.application'
+ASGI_APPLICATION = 'backend.asgi.application'
+
+# Capa de canales para los WebSockets. En memoria solo sirve con un proceso;
+# con REDIS_URL los eventos se comparten entre todos los procesos
+if os.environ.get('REDIS_URL'):
+    CHANNEL_LAYERS = {
+        'default': {
+            'BACKEND': 'channels_redis.core.RedisChannelLayer',
+            'CONFIG': {'hosts': [os.environ['REDIS_URL']]},
+        }
+    }
+else:
+    CHANNEL_LAYERS = {
+        'default': {
+            'BACKEND': 'channels.layers.InMemoryChannelLayer',
+        }
+    }
 
 
 # Database
@@ -87,9 +116,35 @@ DATABASES = {
         'PASSWORD': os.environ.get('DB_PASSWORD', ''),  # Deja vacío si no tienes contraseña
         'HOST': os.environ.get('DB_HOST', 'localhost'),
         'PORT': os.environ.get('DB_PORT', '5432'),
+        # Segundos que se reutiliza cada conexión (0 = cerrar al final de la
+        # petición). Con ASGI conviene dejarlo en 0 y usar un pool.
+        'CONN_MAX_AGE': int(os.environ.get('DB_CONN_MAX_AGE', 0)),
+        'CONN_HEALTH_CHECKS': True,
     }
 }
 
+# DB_ENGINE=sqlite permite ejecutar el proyecto (y los benchmarks) sin
+# PostgreSQL, con la base en DB_NAME o en db.sqlite3
+if os.environ.get('DB_ENGINE') == 'sqlite':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': os.environ.get('DB_NAME', BASE_DIR / 'db.sqlite3'),
+        }
+    }
+
+# Pool de conexiones de psycopg 3 (DB_POOL_MIN_SIZE/DB_POOL_MAX_SIZE). Solo
+# está disponible desde Django 5.1 y es incompatible con CONN_MAX_AGE > 0.
+if os.environ.get('DB_POOL_MAX_SIZE') and django.VERSION >= (5, 1) and \
+        DATABASES['default']['ENGINE'] == 'django.db.backends.postgresql':
+    DATABASES['default']['CONN_MAX_AGE'] = 0
+    DATABASES['default']['OPTIONS'] = {
+        'pool': {
+            'min_size': int(os.environ.get('DB_POOL_MIN_SIZE', 2)),
+            'max_size': int(os.environ['DB_POOL_MAX_SIZE']),
+        },
+    }
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
@@ -132,15 +187,109 @@ STATIC_URL = 'static/'
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
+# Caché compartida. Con REDIS_URL se usa cualquier servidor compatible con
+# el protocolo de Redis; sin ella, una caché en memoria local (tests y
+# desarrollo)
+if os.environ.get('REDIS_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.environ['REDIS_URL'],
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
+# Segundos que vive en caché la representación serializada de un juego
+GAME_CACHE_TIMEOUT = int(os.environ.get('GAME_CACHE_TIMEOUT', 300))
+
+# Segundos que vive en caché un análisis de patrones de juego (se recalcula
+# antes si el historial cambia, ver api.analytics.cached)
+ANALYTICS_CACHE_TIMEOUT = int(os.environ.get('ANALYTICS_CACHE_TIMEOUT', 300))
+
+# Oponente CPU: modelos de jugador en memoria (LRU), segundos hasta
+# reconstruirlos y rondas del historial con las que se construyen
+BOT_MODEL_CACHE_SIZE = int(os.environ.get('BOT_MODEL_CACHE_SIZE', 10000))
+BOT_MODEL_TTL = int(os.environ.get('BOT_MODEL_TTL', 300))
+BOT_HISTORY_ROUNDS = int(os.environ.get('BOT_HISTORY_ROUNDS', 500))
+
+# Cola de emparejamiento (api.matchmaking): backend de la cola (compartida
+# en Redis si hay REDIS_URL), segundos entre rondas, tickets por lote y si
+# cada proceso ASGI arranca su emparejador (0 si empareja `manage.py
+# matchmaker`)
+MATCHMAKING_BACKEND = os.environ.get(
+    'MATCHMAKING_BACKEND',
+    'api.matchmaking.RedisQueue' if os.environ.get('REDIS_URL') else 'api.matchmaking.MemoryQueue'
+)
+MATCHMAKING_INTERVAL = float(os.environ.get('MATCHMAKING_INTERVAL', 0.5))
+MATCHMAKING_BATCH_SIZE = int(os.environ.get('MATCHMAKING_BATCH_SIZE', 1000))
+MATCHMAKING_SCHEDULER = os.environ.get('MATCHMAKING_SCHEDULER', '1') == '1'
+
+# Vistas que respetan la cabecera Idempotency-Key (por nombre de URL),
+# segundos que se guarda la respuesta de cada clave y segundos que un
+# reintento espera a la petición original en curso
+IDEMPOTENT_VIEWS = [
+    'create-game', 'game-make-move', 'game-bulk', 'game-batch-move', 'game-restart-game',
+    'async-create-game', 'async-make-move',
+]
+IDEMPOTENCY_TTL = int(os.environ.get('IDEMPOTENCY_TTL', 86400))
+IDEMPOTENCY_WAIT = float(os.environ.get('IDEMPOTENCY_WAIT', 5))
+
+# Descarte de carga (api.shedding): peticiones en curso por proceso y
+# latencia media por consulta SQL a partir de las que se responde 503, y
+# segundos de Retry-After (0 desactiva cada umbral)
+SHED_MAX_INFLIGHT = int(os.environ.get('SHED_MAX_INFLIGHT', 200))
+SHED_DB_LATENCY_MS = float(os.environ.get('SHED_DB_LATENCY_MS', 250))
+SHED_RETRY_AFTER = int(os.environ.get('SHED_RETRY_AFTER', 1))
+
+# Las peticiones que tardan al menos estos milisegundos se registran en el log
+SLOW_REQUEST_MS = int(os.environ.get('SLOW_REQUEST_MS', 500))
+
+REST_FRAMEWORK = {
+    # Paginación por cursor sobre (created_at, id) para todos los listados
+    'DEFAULT_PAGINATION_CLASS': 'api.pagination.CreatedAtCursorPagination',
+    'PAGE_SIZE': 50,
+    # Mismo JSON que el JSONRenderer de DRF, generado con orjson
+    'DEFAULT_RENDERER_CLASSES': [
+        'api.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    # Cubetas de tokens por IP y por jugador (ver api.throttling): ráfagas
+    # de hasta N peticiones, rellenadas a N por periodo
+    'DEFAULT_THROTTLE_CLASSES': [
+        'api.throttling.IPThrottle',
+        'api.throttling.PlayerThrottle',
+    ],
+    'DEFAULT_THROTTLE_RATES': {
+        'ip': os.environ.get('THROTTLE_IP_RATE', '100/s'),
+        'player': os.environ.get('THROTTLE_PLAYER_RATE', '5/s'),
+    },
+    # Proxies de confianza delante del servidor: con 0 la IP del cliente es
+    # REMOTE_ADDR y X-Forwarded-For se ignora
+    'NUM_PROXIES': int(os.environ.get('NUM_PROXIES', 0)),
+}
+
 # Durante desarrollo
 CORS_ALLOW_ALL_ORIGINS = True  # Solo para desarrollo
 
+# El frontend envía Idempotency-Key en los POST (ver api.idempotency)
+CORS_ALLOW_HEADERS = (*default_headers, 'idempotency-key')
+
 # Para producción, especifica los orígenes permitidos:
 CORS_ALLOWED_ORIGINS = [
     "http://localhost:4200",  # URL del frontend
 ]
 
-# Agregar al final del archivo
+# De los logs INFO de mucho volumen (marcados con extra={'sampled': True})
+# se escribe uno de cada LOG_SAMPLE_EVERY
+LOG_SAMPLE_EVERY = int(os.environ.get('LOG_SAMPLE_EVERY', 100))
+
+# Los handlers escriben desde un hilo propio (api.log.QueuedHandler): las
+# peticiones solo encolan el registro
 LOGGING = {
     'version': 1,
     'disable_existing_loggers': False,
@@ -149,18 +298,29 @@ LOGGING = {
             'format': '{levelname} {asctime} {module} {message}',
             'style': '{',
         },
+        'json': {
+            '()': 'api.log.JsonFormatter',
+        },
+    },
+    'filters': {
+        'sample': {
+            '()': 'api.log.SampleFilter',
+        },
     },
     'handlers': {
         'file': {
             'level': 'ERROR',
-            'class': 'logging.FileHandler',
+            'class': 'api.log.QueuedHandler',
+            'handler_class': 'logging.FileHandler',
             'filename': 'debug.log',
-            'formatter': 'verbose',
+            'formatter': 'json',
         },
         'console': {
             'level': 'INFO',
-            'class': 'logging.StreamHandler',
+            'class': 'api.log.QueuedHandler',
+            'handler_class': 'logging.StreamHandler',
             'formatter': 'verbose',
+            'filters': ['sample'],
         },
     },
     'loggers': {
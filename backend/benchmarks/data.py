@@ -0,0 +1,68 @@
+"""
+Generador de datos reproducible para los benchmarks.
+
+Crea jugadores, juegos y rondas con bulk_create a partir de una semilla,
+de modo que dos ejecuciones con los mismos parámetros producen la misma
+base de datos y sus resultados son comparables.
+"""
+import random
+
+from api.models import Game, Player, Round, normalize_handle
+
+MOVES = [Round.ROCK, Round.PAPER, Round.SCISSORS]
+
+
+def seed_data(players=200, games=500, rounds_per_game=5, seed=42, batch_size=1000):
+    """
+    Puebla la base de datos actual
+
+    Args:
+        players: Jugadores a crear
+        games: Juegos a crear, entre parejas de jugadores al azar
+        rounds_per_game: Rondas completas como máximo por juego. Un juego
+            termina antes si alguien llega a Game.WINNING_SCORE.
+        seed: Semilla del generador aleatorio
+        batch_size: Filas por INSERT
+
+    Returns:
+        dict: Cantidad de filas creadas por modelo
+    """
+    rng = random.Random(seed)
+
+    player_rows = Player.objects.bulk_create(
+        [Player(name=f"Jugador {i}", handle=normalize_handle(f"Jugador {i}")) for i in range(players)],
+        batch_size=batch_size
+    )
+
+    game_rows = []
+    for _ in range(games):
+        player1, player2 = rng.sample(player_rows, 2)
+        game_rows.append(Game(player1=player1, player2=player2))
+    game_rows = Game.objects.bulk_create(game_rows, batch_size=batch_size)
+
+    # Jugar las rondas en memoria para calcular ganadores y marcadores
+    round_rows = []
+    for game in game_rows:
+        for _ in range(rounds_per_game):
+            if not game.is_active:
+                break
+            round = Round(
+                game=game,
+                player1_move=rng.choice(MOVES),
+                player2_move=rng.choice(MOVES)
+            )
+            winner_id = round.determine_winner(game)
+            if winner_id:
+                game.update_score(winner_id)
+            round_rows.append(round)
+    round_rows = Round.objects.bulk_create(round_rows, batch_size=batch_size)
+
+    for round in round_rows:
+        round.game.set_current_round(round)
+    Game.objects.bulk_update(
+        game_rows,
+        ['player1_score', 'player2_score', 'winner', 'is_active', 'current_round', 'round_count'],
+        batch_size=batch_size
+    )
+
+    return {'players': len(player_rows), 'games': len(game_rows), 'rounds': len(round_rows)}
@@ -0,0 +1,196 @@
+"""
+Prueba de carga HTTP contra un servidor en ejecución.
+
+Cada cliente virtual crea un juego y juega rondas sin pausa (creando otro
+juego cuando el anterior termina) sobre una conexión keep-alive. Al final
+informa peticiones por segundo y latencias p50/p95/p99 por endpoint.
+
+Sirve para comparar el camino WSGI (/api/...) con el asíncrono servido por
+ASGI (/api/async/...). Por ejemplo, con 1000 clientes concurrentes:
+
+    # ASGI
+    daphne -p 8001 backend.asgi:application
+    python benchmarks/http_load.py --base-url http://localhost:8001 --prefix /api/async
+
+    # WSGI
+    gunicorn -w 4 --threads 8 -b :8002 backend.wsgi
+    python benchmarks/http_load.py --base-url http://localhost:8002 --prefix /api
+
+Solo usa la biblioteca estándar, así que puede ejecutarse desde cualquier
+máquina con Python 3.10+.
+"""
+import argparse
+import asyncio
+import json
+import random
+import statistics
+import time
+from collections import defaultdict
+from urllib.parse import urlsplit
+
+MOVES = ['ROCK', 'PAPER', 'SCISSORS']
+
+
+class HTTPConnection:
+    """
+    Cliente HTTP/1.1 mínimo sobre asyncio con conexión persistente
+    """
+    def __init__(self, host, port):
+        self.host = host
+        self.port = port
+        self.reader = None
+        self.writer = None
+
+    async def request(self, method, path, body=None):
+        if self.writer is None:
+            self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+
+        payload = json.dumps(body).encode() if body is not None else b''
+        head = (
+            f'{method} {path} HTTP/1.1\r\n'
+            f'Host: {self.host}:{self.port}\r\n'
+            'Connection: keep-alive\r\n'
+            'Content-Type: application/json\r\n'
+            f'Content-Length: {len(payload)}\r\n\r\n'
+        )
+        try:
+            self.writer.write(head.encode() + payload)
+            await self.writer.drain()
+            return await self.read_response()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            await self.close()
+            raise
+
+    async def read_response(self):
+        status_line = await self.reader.readline()
+        if not status_line:
+            raise ConnectionError("Conexión cerrada por el servidor")
+        status = int(status_line.split()[1])
+
+        headers = {}
+        while True:
+            line = await self.reader.readline()
+            if line in (b'\r\n', b''):
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            headers[name.strip().lower()] = value.strip()
+
+        if headers.get('transfer-encoding') == 'chunked':
+            chunks = []
+            while True:
+                size = int((await self.reader.readline()).strip(), 16)
+                chunk = await self.reader.readexactly(size + 2)
+                if size == 0:
+                    break
+                chunks.append(chunk[:-2])
+            body = b''.join(chunks)
+        else:
+            body = await self.reader.readexactly(int(headers.get('content-length', 0)))
+
+        if headers.get('connection', '').lower() == 'close':
+            await self.close()
+        return status, body
+
+    async def close(self):
+        if self.writer is not None:
+            self.writer.close()
+            self.writer = None
+            self.reader = None
+
+
+class Stats:
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+
+    def record(self, endpoint, seconds, ok):
+        self.latencies[endpoint].append(seconds)
+        if not ok:
+            self.errors[endpoint] += 1
+
+
+async def play(client_id, args, deadline, stats):
+    """
+    Cliente virtual: crea juegos y los juega hasta que se acaba el tiempo
+    """
+    url = urlsplit(args.base_url)
+    connection = HTTPConnection(url.hostname, url.port or 80)
+    rng = random.Random(args.seed + client_id)
+
+    async def timed(endpoint, method, path, body=None):
+        started = time.perf_counter()
+        try:
+            status, content = await connection.request(method, path, body)
+        except (ConnectionError, OSError, asyncio.IncompleteReadError):
+            stats.record(endpoint, time.perf_counter() - started, False)
+            return None
+        stats.record(endpoint, time.perf_counter() - started, status == 200)
+        return json.loads(content) if status == 200 else None
+
+    try:
+        while time.monotonic() < deadline:
+            game = await timed('create_game', 'POST', f'{args.prefix}/create-game/', {
+                'player1_name': f'Bench {client_id}A',
+                'player2_name': f'Bench {client_id}B',
+            })
+            if game is None:
+                continue
+
+            move_path = f"{args.prefix}/games/{game['id']}/make_move/"
+            while game and game['is_active'] and time.monotonic() < deadline:
+                for player in ('player1', 'player2'):
+                    game = await timed('make_move', 'POST', move_path, {
+                        'player_id': game[player]['id'],
+                        'movement': rng.choice(MOVES),
+                    })
+                    if game is None:
+                        break
+
+                if game and args.read_ratio and rng.random() < args.read_ratio:
+                    await timed('retrieve', 'GET', f"{args.prefix}/games/{game['id']}/")
+    finally:
+        await connection.close()
+
+
+def percentile(values, fraction):
+    index = min(len(values) - 1, int(round(fraction * (len(values) - 1))))
+    return values[index]
+
+
+def report(stats, elapsed, concurrency):
+    total = sum(len(values) for values in stats.latencies.values())
+    print(f"Clientes concurrentes: {concurrency}")
+    print(f"Duración: {elapsed:.1f} s, peticiones: {total}, req/s: {total / elapsed:.1f}")
+    print(f"{'endpoint':<14}{'n':>8}{'errores':>9}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for endpoint, values in sorted(stats.latencies.items()):
+        values = sorted(values)
+        print(
+            f"{endpoint:<14}{len(values):>8}{stats.errors[endpoint]:>9}"
+            f"{len(values) / elapsed:>10.1f}"
+            f"{percentile(values, 0.50) * 1000:>10.1f}"
+            f"{percentile(values, 0.95) * 1000:>10.1f}"
+            f"{percentile(values, 0.99) * 1000:>10.1f}"
+        )
+    if total:
+        print(f"Latencia media global: {statistics.fmean(v for vs in stats.latencies.values() for v in vs) * 1000:.1f} ms")
+
+
+async def main(args):
+    stats = Stats()
+    started = time.monotonic()
+    deadline = started + args.duration
+    await asyncio.gather(*(
+        play(client_id, args, deadline, stats) for client_id in range(args.concurrency)
+    ))
+    report(stats, time.monotonic() - started, args.concurrency)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--base-url', default='http://localhost:8000')
+    parser.add_argument('--prefix', default='/api/async', help="/api (WSGI) o /api/async (ASGI)")
+    parser.add_argument('--concurrency', type=int, default=1000)
+    parser.add_argument('--duration', type=float, default=30, help="Segundos de carga")
+    parser.add_argument('--read-ratio', type=float, default=0.5, help="Probabilidad de consultar el juego tras cada ronda")
+    parser.add_argument('--seed', type=int, default=0)
+    asyncio.run(main(parser.parse_args()))
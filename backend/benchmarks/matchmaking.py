@@ -0,0 +1,112 @@
+"""
+Simulador de la cola de emparejamiento.
+
+Los jugadores humanos de la base de datos entran en una MemoryQueue a un
+ritmo fijo (rate por segundo, en ráfagas cada TICK segundos) con ratings
+aleatorios de una normal, mientras un Scheduler hace rondas cada interval
+segundos y crea los juegos en la base de datos. Mide el coste de entrar en
+la cola, la duración de cada ronda y la espera de cada jugador hasta tener
+juego.
+
+Se ejecuta con `python manage.py benchmark --matchmaking --players 5000`.
+"""
+import asyncio
+import random
+import time
+
+from asgiref.sync import sync_to_async
+from django.db import connections
+
+from api.matchmaking import MAX_WAIT, MemoryQueue, Scheduler, Ticket
+from api.models import Player
+
+from .suite import percentile
+
+# Segundos entre ráfagas de llegadas
+TICK = 0.01
+
+# Ratings simulados: media y desviación
+RATING_MEAN = 1000
+RATING_SPREAD = 200
+
+
+async def simulate(player_ids, rate, interval, rng):
+    queue = MemoryQueue()
+    scheduler = Scheduler(queue, interval=interval)
+    enqueued_at = {}
+    latencies = []
+    round_seconds = []
+    enqueue_seconds = 0.0
+    produced = asyncio.Event()
+
+    async def produce():
+        nonlocal enqueue_seconds
+        per_tick = max(1, round(rate * TICK))
+        started = time.monotonic()
+        for offset in range(0, len(player_ids), per_tick):
+            chunk = player_ids[offset:offset + per_tick]
+            begin = time.perf_counter()
+            for player_id in chunk:
+                now = time.time()
+                enqueued_at[player_id] = now
+                await queue.add(Ticket(player_id, round(rng.gauss(RATING_MEAN, RATING_SPREAD)), now))
+            enqueue_seconds += time.perf_counter() - begin
+            # Ritmo de llegada fijo, sin acumular el retraso de cada ráfaga
+            await asyncio.sleep(max(0.0, started + (offset + len(chunk)) / rate - time.monotonic()))
+        produced.set()
+
+    async def match():
+        # Tras la última llegada, como mucho MAX_WAIT más dos rondas
+        deadline = None
+        while True:
+            if produced.is_set():
+                if len(queue.waiting) < 2:
+                    break
+                deadline = deadline or time.monotonic() + MAX_WAIT + 2 * interval
+                if time.monotonic() > deadline:
+                    break
+            begin = time.perf_counter()
+            matches = await scheduler.run_once()
+            round_seconds.append(time.perf_counter() - begin)
+            now = time.time()
+            latencies.extend(now - enqueued_at[player_id] for player_id in matches)
+            await asyncio.sleep(max(0.0, interval - round_seconds[-1]))
+
+    started = time.perf_counter()
+    await asyncio.gather(produce(), match())
+    elapsed = time.perf_counter() - started
+    # Los juegos se crean en el hilo de sync_to_async, con su propia conexión
+    await sync_to_async(connections.close_all)()
+
+    games = len(latencies) // 2
+    latencies = latencies or [0.0]
+    return {
+        'players': len(player_ids),
+        'games': games,
+        'unmatched': len(queue.waiting),
+        'seconds': round(elapsed, 3),
+        'enqueue_per_second': round(len(player_ids) / enqueue_seconds) if enqueue_seconds else None,
+        'rounds': len(round_seconds),
+        'round_p95_ms': round(percentile(round_seconds, 0.95) * 1000, 3) if round_seconds else 0.0,
+        'wait_p50_ms': round(percentile(latencies, 0.50) * 1000, 1),
+        'wait_p95_ms': round(percentile(latencies, 0.95) * 1000, 1),
+        'wait_max_ms': round(max(latencies) * 1000, 1),
+    }
+
+
+def run_matchmaking_benchmark(rate=2000, interval=0.1, seed=42):
+    """
+    Simula la llegada de todos los jugadores humanos a la cola
+
+    Args:
+        rate: Jugadores que entran en la cola por segundo
+        interval: Segundos entre rondas del emparejador
+        seed: Semilla de los ratings simulados
+
+    Returns:
+        dict: Jugadores, juegos creados, jugadores sin pareja, duración,
+        entradas por segundo que admite la cola, rondas, p95 de la duración
+        de una ronda y espera hasta el juego (p50, p95 y máxima)
+    """
+    player_ids = list(Player.objects.filter(is_bot=False).order_by('id').values_list('id', flat=True))
+    return asyncio.run(simulate(player_ids, rate, interval, random.Random(seed)))
@@ -0,0 +1,71 @@
+"""
+Benchmark de serialización de listados.
+
+Compara, sobre los mismos juegos, el camino de DRF (GameSummarySerializer y
+JSONRenderer sobre instancias con select_related) con el rápido (filas de
+.values() con api.fast_serializers y FastJSONRenderer). Mide la consulta,
+la serialización y el renderizado por separado y comprueba que ambos
+producen los mismos bytes.
+
+Se ejecuta con `python manage.py benchmark --serialization --games 10000`.
+"""
+import statistics
+import time
+
+from rest_framework.renderers import JSONRenderer
+
+from api.fast_serializers import game_summary_rows, game_values
+from api.models import Game
+from api.renderers import FastJSONRenderer
+from api.serializers import GameSummarySerializer
+
+
+def drf_path(limit):
+    games = list(Game.objects.with_players().order_by('-created_at', '-id')[:limit])
+    fetched = time.perf_counter()
+    data = GameSummarySerializer(games, many=True).data
+    serialized = time.perf_counter()
+    return data, JSONRenderer().render(data), fetched, serialized
+
+
+def fast_path(limit):
+    rows = list(game_values(Game.objects.order_by('-created_at', '-id'))[:limit])
+    fetched = time.perf_counter()
+    data = game_summary_rows(rows)
+    serialized = time.perf_counter()
+    return data, FastJSONRenderer().render(data), fetched, serialized
+
+
+def measure(path, limit, repeat):
+    """
+    Returns:
+        tuple: (mediana por fase en ms, bytes generados)
+    """
+    phases = {'query_ms': [], 'serialize_ms': [], 'render_ms': [], 'total_ms': []}
+    for _ in range(repeat):
+        started = time.perf_counter()
+        _, output, fetched, serialized = path(limit)
+        finished = time.perf_counter()
+        phases['query_ms'].append(fetched - started)
+        phases['serialize_ms'].append(serialized - fetched)
+        phases['render_ms'].append(finished - serialized)
+        phases['total_ms'].append(finished - started)
+    return {name: round(statistics.median(values) * 1000, 3) for name, values in phases.items()}, output
+
+
+def run_serialization_benchmark(limit=10000, repeat=5):
+    """
+    Returns:
+        dict: Fases de cada camino ('drf' y 'fast'), juegos serializados,
+        tamaño de la salida y si los bytes coinciden
+    """
+    drf, drf_output = measure(drf_path, limit, repeat)
+    fast, fast_output = measure(fast_path, limit, repeat)
+    return {
+        'games': min(limit, Game.objects.count()),
+        'bytes': len(fast_output),
+        'identical': drf_output == fast_output,
+        'drf': drf,
+        'fast': fast,
+        'speedup': round(drf['total_ms'] / fast['total_ms'], 2) if fast['total_ms'] else None,
+    }
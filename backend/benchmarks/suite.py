@@ -0,0 +1,197 @@
+"""
+Suite de benchmarks de la API.
+
+Ejecuta escenarios scriptados con el cliente de pruebas de Django sobre la
+base de datos actual y mide, por petición, la latencia y las consultas SQL.
+Los resultados se comparan con un archivo de referencia (baseline.json)
+para detectar regresiones antes de desplegar.
+
+Se ejecuta con el comando `python manage.py benchmark`.
+"""
+import json
+import random
+import statistics
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from api.models import Game, Round
+
+BASELINE_PATH = Path(__file__).resolve().parent / 'baseline.json'
+
+MOVES = [Round.ROCK, Round.PAPER, Round.SCISSORS]
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    index = min(len(values) - 1, int(round(fraction * (len(values) - 1))))
+    return values[index]
+
+
+class Scenario:
+    """
+    Acumula latencias y consultas de las peticiones de un escenario
+    """
+    def __init__(self, name):
+        self.name = name
+        self.latencies = []
+        self.queries = []
+
+    def measure(self, send):
+        """
+        Ejecuta una petición midiendo su latencia y sus consultas SQL
+
+        Args:
+            send: Función sin argumentos que hace la petición
+
+        Returns:
+            La respuesta de la petición
+        """
+        with CaptureQueriesContext(connection) as context:
+            started = time.perf_counter()
+            response = send()
+            elapsed = time.perf_counter() - started
+        if response.status_code >= 400:
+            raise RuntimeError(f"{self.name}: respuesta {response.status_code} {response.content[:200]!r}")
+        self.latencies.append(elapsed)
+        self.queries.append(len(context.captured_queries))
+        return response
+
+    def summary(self):
+        return {
+            'requests': len(self.latencies),
+            'p50_ms': round(percentile(self.latencies, 0.50) * 1000, 3),
+            'p95_ms': round(percentile(self.latencies, 0.95) * 1000, 3),
+            'p99_ms': round(percentile(self.latencies, 0.99) * 1000, 3),
+            'mean_ms': round(statistics.fmean(self.latencies) * 1000, 3),
+            'queries_mean': round(statistics.fmean(self.queries), 2),
+            'queries_max': max(self.queries),
+        }
+
+
+def post(client, path, data):
+    return client.post(path, data, content_type='application/json')
+
+
+def run_create_game(client, iterations, rng):
+    scenario = Scenario('create_game')
+    for i in range(iterations):
+        scenario.measure(lambda: post(client, '/api/create-game/', {
+            'player1_name': f"Bench {i}A",
+            'player2_name': f"Bench {i}B",
+        }))
+    return scenario
+
+
+def run_game_flow(client, iterations, rng):
+    """
+    Juega partidas completas movimiento a movimiento hasta sumar
+    `iterations` movimientos
+    """
+    scenario = Scenario('make_move')
+    while len(scenario.latencies) < iterations:
+        game = post(client, '/api/create-game/', {
+            'player1_name': "Bench A",
+            'player2_name': "Bench B",
+        }).json()
+        while game['is_active'] and len(scenario.latencies) < iterations:
+            for player in ('player1', 'player2'):
+                game = scenario.measure(lambda: post(
+                    client, f"/api/games/{game['id']}/make_move/",
+                    {'player_id': game[player]['id'], 'movement': rng.choice(MOVES)}
+                )).json()
+    return scenario
+
+
+def run_retrieve(client, iterations, rng, cached):
+    scenario = Scenario('retrieve_cached' if cached else 'retrieve')
+    game_ids = list(Game.objects.values_list('id', flat=True)[:iterations])
+    for i in range(iterations):
+        game_id = game_ids[i % len(game_ids)]
+        if cached:
+            client.get(f'/api/games/{game_id}/')
+        else:
+            cache.clear()
+        scenario.measure(lambda: client.get(f'/api/games/{game_id}/'))
+    return scenario
+
+
+def run_list(client, iterations, rng, name, path):
+    """
+    Recorre las páginas de un listado siguiendo los cursores
+    """
+    scenario = Scenario(name)
+    url = path
+    for _ in range(iterations):
+        data = scenario.measure(lambda: client.get(url)).json()
+        url = data['next'] or path
+    return scenario
+
+
+def run_suite(iterations=100, seed=42):
+    """
+    Ejecuta todos los escenarios sobre la base de datos actual. Los límites
+    por cliente (ver api.throttling) se desactivan mientras tanto: todas las
+    peticiones salen del mismo cliente, mucho más rápido que un jugador.
+
+    Returns:
+        dict: Resumen por escenario
+    """
+    rng = random.Random(seed)
+    client = Client()
+    unthrottled = {**settings.REST_FRAMEWORK, 'DEFAULT_THROTTLE_RATES': {}}
+    with override_settings(REST_FRAMEWORK=unthrottled):
+        scenarios = [
+            run_create_game(client, iterations, rng),
+            run_game_flow(client, iterations, rng),
+            run_retrieve(client, iterations, rng, cached=False),
+            run_retrieve(client, iterations, rng, cached=True),
+            run_list(client, iterations, rng, 'list_games', '/api/games/'),
+            run_list(client, iterations, rng, 'list_active_games', '/api/games/?is_active=true'),
+            run_list(client, iterations, rng, 'list_players', '/api/players/'),
+        ]
+    return {scenario.name: scenario.summary() for scenario in scenarios}
+
+
+def load_baseline(path=BASELINE_PATH):
+    with open(path) as baseline_file:
+        return json.load(baseline_file)
+
+
+def save_baseline(results, path=BASELINE_PATH, **metadata):
+    with open(path, 'w') as baseline_file:
+        json.dump({'metadata': metadata, 'results': results}, baseline_file, indent=2, sort_keys=True)
+        baseline_file.write('\n')
+
+
+def compare(results, baseline, latency_tolerance=0.5):
+    """
+    Compara los resultados con la referencia.
+
+    Las consultas SQL son deterministas y no pueden aumentar. La latencia
+    depende de la máquina, así que solo es regresión si el p95 supera la
+    referencia en más de `latency_tolerance` (0.5 = un 50 %).
+
+    Returns:
+        list: Descripción de cada regresión encontrada
+    """
+    regressions = []
+    for name, expected in baseline['results'].items():
+        actual = results.get(name)
+        if actual is None:
+            continue
+        if actual['queries_max'] > expected['queries_max']:
+            regressions.append(
+                f"{name}: {actual['queries_max']} consultas por petición (referencia {expected['queries_max']})"
+            )
+        limit = expected['p95_ms'] * (1 + latency_tolerance)
+        if actual['p95_ms'] > limit:
+            regressions.append(
+                f"{name}: p95 de {actual['p95_ms']} ms (referencia {expected['p95_ms']} ms, límite {limit:.3f} ms)"
+            )
+    return regressions
@@ -1,7 +1,7 @@
 import { Component, OnInit, OnDestroy, PLATFORM_ID, Inject } from '@angular/core';
 import { ActivatedRoute, Router } from '@angular/router';
 import { GameService } from '../../services/game.service';
-import { Game } from '../../interfaces/game.interface';
+import { Game, GameDelta } from '../../interfaces/game.interface';
 import { CommonModule, isPlatformBrowser } from '@angular/common';
 import { interval, Subscription } from 'rxjs';
 import { switchMap } from 'rxjs/operators';
@@ -33,7 +33,7 @@ import { switchMap } from 'rxjs/operators';
         <div class="move-buttons" *ngIf="canMakeMove">
           <button 
             class="vintage-button"
-            *ngFor="let move of ['ROCK', 'PAPER', 'SCISSORS']"
+            *ngFor="let move of availableMoves"
             (click)="makeMove(move)"
             [disabled]="!canMakeMove">
             {{ getMoveIcon(move) }} {{ getMoveName(move) }}
@@ -292,6 +292,30 @@ export class GameBoardComponent implements OnInit, OnDestroy {
   private updateGameState() {
     if (!this.isBrowser) return;
 
+    // Las actualizaciones llegan por WebSocket; si el canal falla se vuelve
+    // a sondear la API
+    this.updateSubscription?.unsubscribe();
+    this.updateSubscription = this.gameService.watchGame(this.gameId).subscribe({
+      next: (event) => {
+        if (event.event === 'game.restarted') {
+          this.router.navigate(['/game', event.game.id]);
+          return;
+        }
+        if (event.event === 'game.delta') {
+          this.handleDelta(event.game);
+          return;
+        }
+        this.game = event.game;
+        this.updateGameStatus();
+      },
+      error: (error) => {
+        console.error('Error en el canal del juego, sondeando la API:', error);
+        this.pollGameState();
+      }
+    });
+  }
+
+  private pollGameState() {
     this.updateSubscription = interval(1000).pipe(
       switchMap(() => this.gameService.getGameState(this.gameId))
     ).subscribe({
@@ -303,6 +327,27 @@ export class GameBoardComponent implements OnInit, OnDestroy {
     });
   }
 
+  // Aplica el delta de un movimiento. Si ya se tenía esa versión (el
+  // propio movimiento llega también por WebSocket) se ignora; si falta
+  // alguno intermedio se pide el estado completo
+  private handleDelta(delta: GameDelta) {
+    if (!this.game || delta.version <= this.game.version) return;
+
+    const updated = this.gameService.applyDelta(this.game, delta);
+    if (updated) {
+      this.game = updated;
+      this.updateGameStatus();
+      return;
+    }
+    this.gameService.getGameState(this.gameId).subscribe({
+      next: (game) => {
+        this.game = game;
+        this.updateGameStatus();
+      },
+      error: (error) => console.error('Error al actualizar el estado:', error)
+    });
+  }
+
   private updateGameStatus() {
     if (!this.game) return;
     
@@ -400,20 +445,10 @@ export class GameBoardComponent implements OnInit, OnDestroy {
     });
 
     this.gameService.makeMove(this.gameId, playerId, move).subscribe({
-      next: (updatedGame) => {
-        console.log('Juego actualizado después del movimiento:', updatedGame);
-        this.game = updatedGame;
-        
-        const currentRound = updatedGame.rounds[updatedGame.rounds.length - 1];
-        
-        // Si la ronda está completa
-        if (currentRound.player1_move && currentRound.player2_move) {
-          this.isPlayer1Turn = true;  // El siguiente turno es para el jugador 1
-        } else if (currentRound.player1_move === null) {
-          this.isPlayer1Turn = true;  // Es turno del jugador 1
-        } else {
-          this.isPlayer1Turn = false; // Es turno del jugador 2
-        }
+      next: (delta) => {
+        console.log('Delta del movimiento:', delta);
+        // El turno se recalcula a partir de la ronda actualizada
+        this.handleDelta(delta);
       },
       error: (error) => {
         console.error('Error al realizar movimiento:', error);
@@ -426,11 +461,20 @@ export class GameBoardComponent implements OnInit, OnDestroy {
     });
   }
 
+  get availableMoves(): string[] {
+    // Movimientos de la variante de reglas del juego
+    return this.game?.rule_set === 'rpsls'
+      ? ['ROCK', 'PAPER', 'SCISSORS', 'LIZARD', 'SPOCK']
+      : ['ROCK', 'PAPER', 'SCISSORS'];
+  }
+
   getMoveIcon(move: string): string {
     switch (move) {
       case 'ROCK': return '✊';
       case 'PAPER': return '✋';
       case 'SCISSORS': return '✌️';
+      case 'LIZARD': return '🦎';
+      case 'SPOCK': return '🖖';
       default: return '';
     }
   }
@@ -440,6 +484,8 @@ export class GameBoardComponent implements OnInit, OnDestroy {
       case 'ROCK': return 'Piedra';
       case 'PAPER': return 'Papel';
       case 'SCISSORS': return 'Tijera';
+      case 'LIZARD': return 'Lagarto';
+      case 'SPOCK': return 'Spock';
       default: return '';
     }
   }
@@ -1,6 +1,7 @@
 export interface Player {
   id: number;
   name: string;
+  is_bot?: boolean;
   created_at: string;
 }
 
@@ -12,6 +13,9 @@ export interface Game {
   player2_score: number;
   winner: Player | null;
   is_active: boolean;
+  bot_strategy?: string;
+  rule_set?: 'classic' | 'rpsls';
+  version: number;
   status: string;
   rounds: Round[];
 }
@@ -23,4 +27,20 @@ export interface Round {
   winner: Player | null;
   created_at: string;
   result: string;
-} 
\ No newline at end of file
+}
+
+// Respuesta compacta de make_move (?delta=1): solo la ronda que cambió
+export interface GameDelta {
+  id: number;
+  version: number;
+  player1_score: number;
+  player2_score: number;
+  winner: Player | null;
+  is_active: boolean;
+  status: string;
+  round: Round;
+}
+
+export type GameEvent =
+  | { event: 'game.update' | 'game.restarted'; game: Game }
+  | { event: 'game.delta'; game: GameDelta };
@@ -1,8 +1,9 @@
 import { Injectable } from '@angular/core';
-import { HttpClient } from '@angular/common/http';
-import { Observable, tap } from 'rxjs';
+import { HttpClient, HttpErrorResponse, HttpHeaders } from '@angular/common/http';
+import { Observable, retry, tap, throwError, timer } from 'rxjs';
+import { webSocket } from 'rxjs/webSocket';
 import { environment } from '../../../environments/environment';
-import { Game } from '../interfaces/game.interface';
+import { Game, GameDelta, GameEvent } from '../interfaces/game.interface';
 
 interface Player {
   id: number;
@@ -15,9 +16,27 @@ interface Player {
 })
 export class GameService {
   private apiUrl = environment.apiUrl;
+  private wsUrl = environment.wsUrl;
 
   constructor(private http: HttpClient) { }
 
+  // POST con una Idempotency-Key nueva: los reintentos tras un fallo de red,
+  // un 5xx o un 409 (la petición original sigue en curso) llevan la misma
+  // clave y el servidor devuelve la respuesta original sin repetir la
+  // escritura
+  private postIdempotent<T>(url: string, body: unknown): Observable<T> {
+    const headers = new HttpHeaders({ 'Idempotency-Key': crypto.randomUUID() });
+    return this.http.post<T>(url, body, { headers }).pipe(
+      retry({
+        count: 2,
+        delay: (error: HttpErrorResponse) =>
+          error.status === 0 || error.status === 409 || error.status >= 500
+            ? timer(500)
+            : throwError(() => error)
+      })
+    );
+  }
+
   private createPlayer(name: string): Observable<Player> {
     return this.http.post<Player>(`${this.apiUrl}/players/`, { name });
   }
@@ -28,28 +47,54 @@ export class GameService {
       player2_name: player2Name
     };
     
-    return this.http.post(`${this.apiUrl}/create-game/`, payload).pipe(
+    return this.postIdempotent(`${this.apiUrl}/create-game/`, payload).pipe(
       tap(response => console.log('Juego creado:', response))
     );
   }
 
-  makeMove(gameId: number, playerId: number, movement: string): Observable<Game> {
+  // La respuesta es el delta del movimiento, no el juego completo: su
+  // tamaño no crece con las rondas. Se aplica con applyDelta
+  makeMove(gameId: number, playerId: number, movement: string): Observable<GameDelta> {
     const payload = {
       player_id: playerId,
       movement: movement
     };
     
-    return this.http.post<Game>(`${this.apiUrl}/games/${gameId}/make_move/`, payload).pipe(
+    return this.postIdempotent<GameDelta>(`${this.apiUrl}/games/${gameId}/make_move/?delta=1`, payload).pipe(
       tap(response => console.log('Movimiento realizado:', response))
     );
   }
 
+  // Estado del juego tras aplicar un delta, o null si el delta no es el
+  // siguiente a la versión que se tiene (hay que pedir el estado completo)
+  applyDelta(game: Game, delta: GameDelta): Game | null {
+    if (delta.id !== game.id || delta.version !== game.version + 1) {
+      return null;
+    }
+    const { round, ...changes } = delta;
+    const rounds = [...game.rounds];
+    if (rounds.length && rounds[rounds.length - 1].id === round.id) {
+      rounds[rounds.length - 1] = round;
+    } else {
+      rounds.push(round);
+    }
+    return { ...game, ...changes, rounds };
+  }
+
   getGameState(gameId: number): Observable<Game> {
     return this.http.get<Game>(`${this.apiUrl}/games/${gameId}/`).pipe(
       tap(game => console.log('Estado del juego:', game))
     );
   }
 
+  // Canal WebSocket del juego: emite el estado actual al conectarse y
+  // luego cada movimiento o reinicio, sin necesidad de sondear la API
+  watchGame(gameId: number): Observable<GameEvent> {
+    return webSocket<GameEvent>(`${this.wsUrl}/games/${gameId}/`).pipe(
+      tap(event => console.log('Evento del juego:', event))
+    );
+  }
+
   restartGame(gameId: number): Observable<Game> {
     return this.http.post<Game>(`${this.apiUrl}/games/${gameId}/restart_game/`, {}).pipe(
       tap(response => console.log('Juego reiniciado:', response))
@@ -1,6 +1,7 @@
 import { Injectable } from '@angular/core';
 import { HttpClient } from '@angular/common/http';
 import { environment } from '../../environments/environment';
+import { GameDelta } from '../game/interfaces/game.interface';
 
 @Injectable({
   providedIn: 'root'
@@ -17,8 +18,9 @@ export class ApiService {
     });
   }
 
+  // Respuesta compacta (GameDelta): ver GameService.applyDelta
   makeMove(gameId: number, playerId: number, movement: string) {
-    return this.http.post(`${this.apiUrl}/games/${gameId}/make_move/`, {
+    return this.http.post<GameDelta>(`${this.apiUrl}/games/${gameId}/make_move/?delta=1`, {
       player_id: playerId,
       movement: movement
     });
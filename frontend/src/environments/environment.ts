@@ -1,4 +1,5 @@
 export const environment = {
   production: false,
-  apiUrl: 'http://localhost:8000/api'
+  apiUrl: 'http://localhost:8000/api',
+  wsUrl: 'ws://localhost:8000/ws'
 }; 
\ No newline at end of file